@@ -40,6 +40,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "core",
     "rest_framework",
     "rest_framework.authtoken",
@@ -49,6 +50,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # first, so its timings include all other middleware
+    "core.middleware.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -82,16 +85,108 @@ WSGI_APPLICATION = "app.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
+# Connections are kept open for DB_CONN_MAX_AGE seconds and checked before
+# reuse. With DB_POOL=1 they are instead shared by the threads of each
+# process through a pool, and returned to it at the end of every request.
+DB_POOL = {
+    "ENABLED": os.environ.get("DB_POOL", "0") == "1",
+    "MAX_SIZE": int(os.environ.get("DB_POOL_MAX_SIZE", 10)),
+    "MAX_OVERFLOW": int(os.environ.get("DB_POOL_MAX_OVERFLOW", 10)),
+    "TIMEOUT": float(os.environ.get("DB_POOL_TIMEOUT", 30)),
+    "IDLE_TIMEOUT": float(os.environ.get("DB_POOL_IDLE_TIMEOUT", 300)),
+}
+
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        "ENGINE": "core.db.backends.postgresql",
         "HOST": os.environ.get("DB_HOST"),
         "NAME": os.environ.get("DB_NAME"),
         "USER": os.environ.get("DB_USER"),
         "PASSWORD": os.environ.get("DB_PASSWORD"),
+        "CONN_MAX_AGE": (
+            0
+            if DB_POOL["ENABLED"]
+            else int(os.environ.get("DB_CONN_MAX_AGE", 60))
+        ),
+        "CONN_HEALTH_CHECKS": (
+            os.environ.get("DB_CONN_HEALTH_CHECKS", "1") == "1"
+        ),
+        "POOL": DB_POOL,
     }
 }
 
+# Safe requests of the recipe, tag, ingredient and user views read from
+# one of these replicas. Tests mirror them onto the default database.
+REPLICA_DATABASES = []
+for index, host in enumerate(
+    filter(None, os.environ.get("DB_REPLICA_HOSTS", "").split(","))
+):
+    alias = f"replica_{index}"
+    DATABASES[alias] = dict(
+        DATABASES["default"], HOST=host.strip(), TEST={"MIRROR": "default"}
+    )
+    REPLICA_DATABASES.append(alias)
+
+DATABASE_ROUTERS = ["core.db.routers.PrimaryReplicaRouter"]
+
+# After any write a user reads from the primary for PIN_SECONDS, which
+# should exceed the replication lag. The pin is kept in this CACHES alias,
+# which must be shared between processes, as the core.E001 check enforces.
+REPLICA_READS = {
+    "PIN_SECONDS": int(os.environ.get("DB_REPLICA_PIN_SECONDS", 5)),
+    "CACHE_ALIAS": os.environ.get("DB_REPLICA_PIN_CACHE_ALIAS", "default"),
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.environ.get("CACHE_LOCATION", ""),
+    }
+}
+
+# the default local memory cache is private to each process
+CACHE_IS_SHARED = not CACHES["default"]["BACKEND"].endswith(
+    (".LocMemCache", ".DummyCache")
+)
+
+
+# Password hashing
+# https://docs.djangoproject.com/en/3.2/topics/auth/passwords/
+#
+# PASSWORD_HASHER picks the hasher for new passwords. The others still
+# verify existing hashes, which are rehashed with it on the next login.
+
+PASSWORD_HASHER_CHOICES = {
+    "argon2": "core.hashers.Argon2PasswordHasher",
+    "bcrypt": "core.hashers.BCryptSHA256PasswordHasher",
+    "pbkdf2": "core.hashers.PBKDF2PasswordHasher",
+}
+PASSWORD_HASHER = os.environ.get("PASSWORD_HASHER", "argon2")
+PASSWORD_HASHERS = [PASSWORD_HASHER_CHOICES[PASSWORD_HASHER]] + [
+    hasher
+    for name, hasher in PASSWORD_HASHER_CHOICES.items()
+    if name != PASSWORD_HASHER
+]
+
+# Costs of each hasher, and the pool running them: MAX_WORKERS threads
+# per process and at most MAX_PENDING logins in flight before a 503.
+PASSWORD_HASHING = {
+    "ARGON2_TIME_COST": int(os.environ.get("ARGON2_TIME_COST", 2)),
+    "ARGON2_MEMORY_COST": int(os.environ.get("ARGON2_MEMORY_COST", 19456)),
+    "ARGON2_PARALLELISM": int(os.environ.get("ARGON2_PARALLELISM", 1)),
+    "BCRYPT_ROUNDS": int(os.environ.get("BCRYPT_ROUNDS", 12)),
+    "PBKDF2_ITERATIONS": int(os.environ.get("PBKDF2_ITERATIONS", 260000)),
+    "MAX_WORKERS": int(
+        os.environ.get("PASSWORD_HASHING_WORKERS", os.cpu_count() or 1)
+    ),
+    "MAX_PENDING": int(os.environ.get("PASSWORD_HASHING_MAX_PENDING", 64)),
+}
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -130,6 +225,8 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/3.2/howto/static-files/
 
 STATIC_URL = "/static/"
+MEDIA_URL = "/static/media/"
+MEDIA_ROOT = os.environ.get("MEDIA_ROOT", "/vol/web/media")
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
@@ -138,6 +235,107 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 AUTH_USER_MODEL = "core.User"
 
+# JSON_BACKEND picks the JSON renderer and parser of the API. "orjson"
+# renders the same bytes as the standard library "json" backend, faster.
+JSON_BACKEND_CHOICES = {
+    "json": (
+        "rest_framework.renderers.JSONRenderer",
+        "rest_framework.parsers.JSONParser",
+    ),
+    "orjson": ("core.renderers.ORJSONRenderer", "core.parsers.ORJSONParser"),
+}
+JSON_BACKEND = os.environ.get("JSON_BACKEND", "json")
+JSON_RENDERER, JSON_PARSER = JSON_BACKEND_CHOICES[JSON_BACKEND]
+
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "DEFAULT_RENDERER_CLASSES": [
+        JSON_RENDERER,
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        JSON_PARSER,
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
+}
+
+# Token lookups are cached per process for TTL seconds and, when an alias
+# from CACHES is given, in that shared cache as well.
+TOKEN_AUTH_CACHE = {
+    "MAX_SIZE": int(os.environ.get("TOKEN_AUTH_CACHE_SIZE", 10000)),
+    "TTL": int(os.environ.get("TOKEN_AUTH_CACHE_TTL", 60)),
+    "CACHE_ALIAS": os.environ.get("TOKEN_AUTH_CACHE_ALIAS") or None,
+}
+
+# Tokens unused for TTL seconds expire. Use slides the expiry forward, with
+# at most one write per token every REFRESH_INTERVAL seconds. Expired tokens
+# are deleted in batches by the purge_tokens command.
+TOKEN_EXPIRY = {
+    "TTL": int(os.environ.get("TOKEN_TTL", 7 * 24 * 60 * 60)),
+    "REFRESH_INTERVAL": int(os.environ.get("TOKEN_REFRESH_INTERVAL", 60 * 60)),
+    "PURGE_BATCH_SIZE": int(os.environ.get("TOKEN_PURGE_BATCH_SIZE", 1000)),
+}
+
+# Recipe and tag GET responses are cached per user in this CACHES alias
+# until the user's data changes. Writes must invalidate the responses of
+# every process, so the cache is on by default only with a shared backend.
+RECIPE_RESPONSE_CACHE = {
+    "ENABLED": os.environ.get(
+        "RECIPE_RESPONSE_CACHE", "1" if CACHE_IS_SHARED else "0"
+    )
+    == "1",
+    "CACHE_ALIAS": os.environ.get("RECIPE_RESPONSE_CACHE_ALIAS", "default"),
+    "TIMEOUT": int(os.environ.get("RECIPE_RESPONSE_CACHE_TIMEOUT", 300)),
+}
+
+# Uploaded recipe images of up to MAX_BYTES are stored once per content
+# hash. Thumbnails fitting THUMBNAIL_SIZE pixels are generated by a queued
+# task after the upload.
+RECIPE_IMAGES = {
+    "MAX_BYTES": int(os.environ.get("RECIPE_IMAGE_MAX_BYTES", 10 * 1024**2)),
+    "THUMBNAIL_SIZE": int(os.environ.get("RECIPE_THUMBNAIL_SIZE", 320)),
+}
+
+# Deferred work is queued in the database and run by the run_worker
+# command, BATCH_SIZE tasks per transaction. Idle workers check for due
+# tasks every POLL_INTERVAL seconds. Failing tasks are retried after
+# RETRY_DELAY seconds, doubling each time, up to MAX_ATTEMPTS attempts.
+TASK_QUEUE = {
+    "BATCH_SIZE": int(os.environ.get("TASK_BATCH_SIZE", 10)),
+    "POLL_INTERVAL": float(os.environ.get("TASK_POLL_INTERVAL", 1)),
+    "MAX_ATTEMPTS": int(os.environ.get("TASK_MAX_ATTEMPTS", 5)),
+    "RETRY_DELAY": float(os.environ.get("TASK_RETRY_DELAY", 10)),
+}
+
+# Requests record durations and response sizes for the Prometheus metrics
+# at /metrics. SAMPLE_RATE of them also count SQL queries, database and
+# serializer time, returned to clients in a Server-Timing header when
+# SERVER_TIMING is on. Requests slower than SLOW_REQUEST_MS or with
+# SLOW_REQUEST_QUERIES queries are logged. /metrics needs TOKEN as a bearer
+# token, or a staff session when no TOKEN is set.
+REQUEST_METRICS = {
+    "ENABLED": os.environ.get("REQUEST_METRICS", "1") == "1",
+    "SAMPLE_RATE": float(os.environ.get("REQUEST_METRICS_SAMPLE_RATE", 1)),
+    "SERVER_TIMING": os.environ.get("SERVER_TIMING", "0") == "1",
+    "SLOW_REQUEST_MS": float(os.environ.get("SLOW_REQUEST_MS", 500)),
+    "SLOW_REQUEST_QUERIES": int(os.environ.get("SLOW_REQUEST_QUERIES", 50)),
+    "SLOW_QUERIES_LOGGED": int(os.environ.get("SLOW_QUERIES_LOGGED", 3)),
+    "TOKEN": os.environ.get("METRICS_TOKEN", ""),
+}
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {
+        "core": {"handlers": ["console"], "level": "INFO"},
+    },
+}
+
+# Async recipe reads run on a pool of MAX_WORKERS threads per process.
+# Requests beyond MAX_PENDING in flight are rejected with a 503.
+RECIPE_ASYNC_READS = {
+    "MAX_WORKERS": int(os.environ.get("RECIPE_ASYNC_READ_WORKERS", 8)),
+    "MAX_PENDING": int(os.environ.get("RECIPE_ASYNC_READ_MAX_PENDING", 256)),
 }
@@ -47,8 +47,14 @@ class UserAdmin(BaseUserAdmin):
         ),
     )
 
+    def delete_queryset(self, request, queryset):
+        """Delete users one at a time, so their recipes go in bulk"""
+        for user in queryset:
+            user.delete()
+
 
 admin.site.register(models.User, UserAdmin)
 admin.site.register(models.Recipe)
 admin.site.register(models.Tag)
 admin.site.register(models.Ingredient)
+admin.site.register(models.Task)
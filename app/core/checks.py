@@ -0,0 +1,41 @@
+"""
+System checks of the deployment settings.
+"""
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils.module_loading import import_string
+
+from core.db import replicas
+
+# backends keeping separate data in every process
+LOCAL_CACHE_BACKENDS = (LocMemCache, DummyCache)
+
+
+def is_process_local(alias):
+    """Return whether a CACHES alias is private to each process"""
+    backend = import_string(settings.CACHES[alias]["BACKEND"])
+    return issubclass(backend, LOCAL_CACHE_BACKENDS)
+
+
+@checks.register(checks.Tags.database, checks.Tags.caches)
+def check_replica_pin_cache(app_configs, **kwargs):
+    """Require a shared cache for pinning users who wrote to the primary"""
+    alias = replicas.get_options()["CACHE_ALIAS"]
+    if not replicas.get_replicas() or not is_process_local(alias):
+        return []
+    return [
+        checks.Error(
+            "Replica reads pin writers to the primary in a cache private to "
+            "each process, so other processes may serve a user's reads "
+            "from a replica that lacks their writes.",
+            hint=(
+                "Set REPLICA_READS['CACHE_ALIAS'] to a shared cache, such as "
+                "one with CACHE_BACKEND set, or silence core.E001 if the app "
+                "runs in a single process."
+            ),
+            id="core.E001",
+        )
+    ]
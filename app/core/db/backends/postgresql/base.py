@@ -0,0 +1,192 @@
+"""
+PostgreSQL backend with connection health checks and an optional pool.
+
+Settings read from the DATABASES entry, besides Django's own:
+
+``CONN_HEALTH_CHECKS``
+    Check a persistent connection with ``SELECT 1`` before its first use
+    in each request and reconnect if it is broken.
+``POOL``
+    ``{"ENABLED": True, "MAX_SIZE": ..., "MAX_OVERFLOW": ...,
+    "TIMEOUT": ..., "IDLE_TIMEOUT": ...}`` shares connections between the
+    threads of a process. A closed Django connection goes back to the pool
+    instead of being torn down, so CONN_MAX_AGE should be 0.
+"""
+
+import os
+import threading
+import time
+
+from django.db import OperationalError
+from django.db.backends.postgresql import base
+from psycopg2 import extensions
+
+from core.db.pool import ConnectionPool, ConnectionStats, PoolTimeout
+
+DEFAULT_POOL = {
+    "ENABLED": False,
+    "MAX_SIZE": 10,
+    "MAX_OVERFLOW": 10,
+    "TIMEOUT": 30.0,
+    "IDLE_TIMEOUT": 300.0,
+}
+
+_pools = {}
+_pools_lock = threading.Lock()
+_stats = {}
+
+
+def get_stats(alias):
+    """Return the acquire statistics of a database alias"""
+    with _pools_lock:
+        return _stats.setdefault(alias, ConnectionStats())
+
+
+def get_pool(alias, conn_params, options):
+    """Return the pool of this process for an alias and its parameters"""
+    # the test runner points aliases at other databases, which must not
+    # be handed connections opened for the original ones
+    key = (os.getpid(), alias, repr(sorted(conn_params.items())))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(
+                max_size=options["MAX_SIZE"],
+                max_overflow=options["MAX_OVERFLOW"],
+                timeout=options["TIMEOUT"],
+                idle_timeout=options["IDLE_TIMEOUT"],
+            )
+        return pool
+
+
+def pool_status(alias):
+    """Return idle and checked out counts of the alias' pools in process"""
+    pid = os.getpid()
+    with _pools_lock:
+        pools = [
+            pool
+            for (pool_pid, pool_alias, _), pool in _pools.items()
+            if pool_pid == pid and pool_alias == alias
+        ]
+    status = {"idle": 0, "checked_out": 0}
+    for pool in pools:
+        for name, value in pool.status().items():
+            status[name] += value
+    return status
+
+
+def close_pools(alias=None):
+    """Close idle pooled connections, of one alias or all"""
+    with _pools_lock:
+        pools = [
+            pool
+            for (_, pool_alias, _), pool in _pools.items()
+            if alias is None or pool_alias == alias
+        ]
+    for pool in pools:
+        pool.close()
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL connection with health checks, pooling and statistics"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool = None
+        self.stats = get_stats(self.alias)
+        self._acquire_pending = True
+        self._reused = False
+
+    @property
+    def pool_options(self):
+        """Return the POOL settings merged with the defaults"""
+        options = dict(DEFAULT_POOL)
+        options.update(self.settings_dict.get("POOL") or {})
+        return options
+
+    def get_new_connection(self, conn_params):
+        """Open a connection, or take one from the pool if enabled"""
+        options = self.pool_options
+        if not options["ENABLED"]:
+            self.pool = None
+            self._reused = False
+            return super().get_new_connection(conn_params)
+
+        self.pool = get_pool(self.alias, conn_params, options)
+        while True:
+            try:
+                connection, reused = self.pool.acquire(
+                    lambda: super(DatabaseWrapper, self).get_new_connection(
+                        conn_params
+                    )
+                )
+            except PoolTimeout as exc:
+                raise OperationalError(str(exc)) from exc
+            if not reused or not self.settings_dict.get("CONN_HEALTH_CHECKS"):
+                break
+            if self._check(connection):
+                break
+            self.stats.record_health_check_failure()
+            self.pool.release(connection, discard=True)
+        self._reused = reused
+        return connection
+
+    def ensure_connection(self):
+        """Connect if needed, checking a reused connection once per request"""
+        if not self._acquire_pending:
+            return super().ensure_connection()
+
+        self._acquire_pending = False
+        if self.connection is not None:
+            if self.settings_dict.get(
+                "CONN_HEALTH_CHECKS"
+            ) and not self._check(self.connection):
+                self.stats.record_health_check_failure()
+                # never hand a broken connection back to the pool
+                self.errors_occurred = True
+                self.close()
+            else:
+                self.stats.record_acquire(0.0, True)
+                return
+
+        start = time.perf_counter()
+        super().ensure_connection()
+        self.stats.record_acquire(time.perf_counter() - start, self._reused)
+
+    def close_if_unusable_or_obsolete(self):
+        """Close a bad or expired connection at request boundaries"""
+        super().close_if_unusable_or_obsolete()
+        self._acquire_pending = True
+
+    def _close(self):
+        """Return the connection to the pool instead of closing it"""
+        self._acquire_pending = True
+        if self.pool is None or self.connection is None:
+            return super()._close()
+
+        connection = self.connection
+        discard = self.errors_occurred or not self._reset(connection)
+        self.pool.release(connection, discard=discard)
+
+    def _check(self, connection):
+        """Return whether a raw connection still answers queries"""
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+        except base.Database.Error:
+            return False
+        return True
+
+    def _reset(self, connection):
+        """Leave a connection idle outside any transaction"""
+        if connection.closed:
+            return False
+        try:
+            if (
+                connection.info.transaction_status
+                != extensions.TRANSACTION_STATUS_IDLE
+            ):
+                connection.rollback()
+        except base.Database.Error:
+            return False
+        return True
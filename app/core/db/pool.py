@@ -0,0 +1,163 @@
+"""
+In-process database connection pool and connection statistics.
+"""
+
+import collections
+import threading
+import time
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection became free within the pool timeout"""
+
+
+class ConnectionStats:
+    """Thread safe counters describing how connections were acquired"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Set all counters back to zero"""
+        with self._lock:
+            self.acquired = 0
+            self.reused = 0
+            self.health_check_failures = 0
+            self.wait_seconds = 0.0
+            self.max_wait_seconds = 0.0
+
+    def record_acquire(self, wait, reused):
+        """Record a connection handed to a request"""
+        with self._lock:
+            self.acquired += 1
+            self.reused += reused
+            self.wait_seconds += wait
+            self.max_wait_seconds = max(self.max_wait_seconds, wait)
+
+    def record_health_check_failure(self):
+        """Record a reused connection found to be broken"""
+        with self._lock:
+            self.health_check_failures += 1
+
+    def snapshot(self):
+        """Return the counters and derived ratios as a dict"""
+        with self._lock:
+            acquired = self.acquired
+            return {
+                "acquired": acquired,
+                "reused": self.reused,
+                "created": acquired - self.reused,
+                "reuse_ratio": self.reused / acquired if acquired else 0.0,
+                "health_check_failures": self.health_check_failures,
+                "wait_seconds_total": self.wait_seconds,
+                "wait_seconds_avg": (
+                    self.wait_seconds / acquired if acquired else 0.0
+                ),
+                "wait_seconds_max": self.max_wait_seconds,
+            }
+
+
+class ConnectionPool:
+    """Bounded pool of DB-API connections shared by the threads of a process.
+
+    Up to ``max_size`` connections are kept idle for reuse, another
+    ``max_overflow`` may be opened under load and are closed when returned.
+    Idle connections older than ``idle_timeout`` seconds are closed.
+    """
+
+    def __init__(
+        self, max_size=10, max_overflow=10, timeout=30.0, idle_timeout=300.0
+    ):
+        self.max_size = max_size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self._idle = collections.deque()
+        self._checked_out = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, connect):
+        """Return (connection, reused), calling connect to open a new one"""
+        deadline = time.monotonic() + self.timeout
+        stale = []
+        try:
+            with self._condition:
+                while True:
+                    stale.extend(self._reap())
+                    if self._idle:
+                        # the most recently returned connection is warmest
+                        connection, _ = self._idle.pop()
+                        self._checked_out += 1
+                        break
+                    if self._checked_out < self.max_size + self.max_overflow:
+                        connection = None
+                        self._checked_out += 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeout(
+                            f"No connection available within {self.timeout}s"
+                        )
+                    self._condition.wait(remaining)
+        finally:
+            self._close_all(stale)
+
+        if connection is not None:
+            return connection, True
+        try:
+            return connect(), False
+        except BaseException:
+            self.release(None, discard=True)
+            raise
+
+    def release(self, connection, discard=False):
+        """Return a connection, closing it if broken or above max_size"""
+        with self._condition:
+            self._checked_out -= 1
+            keep = (
+                not discard
+                and connection is not None
+                and not connection.closed
+                and len(self._idle) < self.max_size
+            )
+            if keep:
+                self._idle.append((connection, time.monotonic()))
+            stale = self._reap()
+            self._condition.notify()
+        if not keep and connection is not None:
+            stale.append(connection)
+        self._close_all(stale)
+
+    def close(self):
+        """Close all idle connections"""
+        with self._condition:
+            stale = [connection for connection, _ in self._idle]
+            self._idle.clear()
+        self._close_all(stale)
+
+    def status(self):
+        """Return the number of idle and checked out connections"""
+        with self._condition:
+            return {"idle": len(self._idle), "checked_out": self._checked_out}
+
+    def _reap(self):
+        """Remove connections idle for too long, returning them"""
+        stale = []
+        if self.idle_timeout is None:
+            return stale
+        limit = time.monotonic() - self.idle_timeout
+        # returned connections are appended, so the oldest are on the left
+        while self._idle and self._idle[0][1] <= limit:
+            stale.append(self._idle.popleft()[0])
+        return stale
+
+    @staticmethod
+    def _close_all(connections):
+        """Close connections outside of the pool lock"""
+        for connection in connections:
+            try:
+                connection.close()
+            except Exception:
+                pass
+        connections.clear()
@@ -0,0 +1,98 @@
+"""
+Read replica selection with read-your-writes stickiness.
+
+Views opt in to replica reads for safe requests. After a user writes, the
+user is pinned to the primary for PIN_SECONDS so their next reads do not
+miss their own changes while the replicas catch up.
+"""
+
+import contextvars
+import random
+
+from django.conf import settings
+from django.core.cache import caches
+
+from rest_framework.permissions import SAFE_METHODS
+
+DEFAULT_REPLICA_READS = {
+    "PIN_SECONDS": 5,
+    "CACHE_ALIAS": "default",
+}
+
+# replica alias used for reads in the current request, if any
+_read_alias = contextvars.ContextVar("replica_read_alias", default=None)
+
+
+def get_options():
+    """Return the configured options merged with the defaults"""
+    options = dict(DEFAULT_REPLICA_READS)
+    options.update(getattr(settings, "REPLICA_READS", {}))
+    return options
+
+
+def get_replicas():
+    """Return the aliases of the configured replicas"""
+    return getattr(settings, "REPLICA_DATABASES", [])
+
+
+def get_read_alias():
+    """Return the replica reads should use, or None for the primary"""
+    return _read_alias.get()
+
+
+def _pin_key(user_id):
+    """Return the cache key pinning a user to the primary"""
+    return f"db:pin:{user_id}"
+
+
+def pin_to_primary(user_id):
+    """Send the user's reads to the primary for the pin window"""
+    options = get_options()
+    caches[options["CACHE_ALIAS"]].set(
+        _pin_key(user_id), True, options["PIN_SECONDS"]
+    )
+
+
+def is_pinned(user_id):
+    """Return whether the user wrote within the pin window"""
+    cache = caches[get_options()["CACHE_ALIAS"]]
+    return cache.get(_pin_key(user_id), False)
+
+
+def start_replica_reads(user_id):
+    """Route this request's reads to one replica unless the user is pinned"""
+    replicas = get_replicas()
+    if not replicas or is_pinned(user_id):
+        return None
+    # one replica per request, so all its queries see the same snapshot
+    return _read_alias.set(random.choice(replicas))
+
+
+def stop_replica_reads(token):
+    """Send reads back to the primary"""
+    if token is not None:
+        _read_alias.reset(token)
+
+
+class ReplicaReadMixin:
+    """Serve safe requests of authenticated users from a read replica.
+
+    Authentication runs against the primary, only the view's own queries
+    go to the replica. Unsafe requests pin the user to the primary.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS and request.user.is_authenticated:
+            self._replica_token = start_replica_reads(request.user.id)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        stop_replica_reads(getattr(self, "_replica_token", None))
+        self._replica_token = None
+        if (
+            request.method not in SAFE_METHODS
+            and request.user.is_authenticated
+            and get_replicas()
+        ):
+            pin_to_primary(request.user.id)
+        return super().finalize_response(request, response, *args, **kwargs)
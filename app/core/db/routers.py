@@ -0,0 +1,28 @@
+"""
+Database routers.
+"""
+
+from core.db.replicas import get_read_alias, get_replicas
+
+
+class PrimaryReplicaRouter:
+    """Send writes to the primary and opted in reads to a replica"""
+
+    def db_for_read(self, model, **hints):
+        """Return the request's replica, or None to use the primary"""
+        return get_read_alias()
+
+    def db_for_write(self, model, **hints):
+        """Always write to the primary"""
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """Allow relations between objects read from any copy"""
+        databases = {"default", *get_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        """Only migrate the primary, replicas follow it"""
+        return db not in get_replicas()
@@ -0,0 +1,75 @@
+"""
+Bounded thread pools for offloading blocking work.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connections
+
+
+class ExecutorBusy(Exception):
+    """Raised when an executor already has its maximum of pending calls"""
+
+
+def _close_connections(barrier):
+    """Close this pool thread's connections once every thread is here"""
+    barrier.wait()
+    connections.close_all()
+
+
+class BoundedExecutor:
+    """Thread pool that rejects work beyond a number of pending calls.
+
+    ``get_options`` returns ``MAX_WORKERS`` and ``MAX_PENDING``. It is read
+    when the pool is first used, and again after ``shutdown``.
+    """
+
+    def __init__(self, name, get_options):
+        self.name = name
+        self.get_options = get_options
+        self._lock = threading.Lock()
+        self._executor = None
+        self._slots = None
+
+    def _get_pool(self):
+        """Return the executor and the semaphore bounding its backlog"""
+        with self._lock:
+            if self._executor is None:
+                options = self.get_options()
+                self._executor = ThreadPoolExecutor(
+                    max_workers=options["MAX_WORKERS"],
+                    thread_name_prefix=self.name,
+                )
+                self._slots = threading.BoundedSemaphore(
+                    options["MAX_PENDING"]
+                )
+            return self._executor, self._slots
+
+    def submit(self, fn, *args, **kwargs):
+        """Schedule a call and return its future, or raise ExecutorBusy"""
+        executor, slots = self._get_pool()
+        if not slots.acquire(blocking=False):
+            raise ExecutorBusy(f"{self.name} has too many pending calls")
+        try:
+            future = executor.submit(fn, *args, **kwargs)
+        except BaseException:
+            slots.release()
+            raise
+        future.add_done_callback(lambda _: slots.release())
+        return future
+
+    def shutdown(self):
+        """Stop the pool, a new one is created when next used"""
+        with self._lock:
+            executor, self._executor, self._slots = self._executor, None, None
+        if executor is None:
+            return
+
+        # persistent connections belong to the pool threads, so each thread
+        # has to close its own before the executor goes away
+        workers = executor._max_workers
+        barrier = threading.Barrier(workers)
+        for _ in range(workers):
+            executor.submit(_close_connections, barrier)
+        executor.shutdown(wait=True)
@@ -0,0 +1,114 @@
+"""
+Password hashers with configurable cost, run on a bounded thread pool.
+
+Hashing is CPU bound and argon2, bcrypt and hashlib release the GIL, so
+running it on a pool of about one thread per core keeps a login storm
+from taking every core and every request worker. Calls beyond the pool's
+backlog fail fast with a 503 instead of queueing.
+"""
+
+import os
+import threading
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from core.executors import BoundedExecutor, ExecutorBusy
+
+DEFAULT_PASSWORD_HASHING = {
+    "ARGON2_TIME_COST": 2,
+    "ARGON2_MEMORY_COST": 19456,
+    "ARGON2_PARALLELISM": 1,
+    "BCRYPT_ROUNDS": 12,
+    "PBKDF2_ITERATIONS": hashers.PBKDF2PasswordHasher.iterations,
+    "MAX_WORKERS": os.cpu_count() or 1,
+    "MAX_PENDING": 64,
+}
+
+
+class HashingUnavailable(APIException):
+    """Raised when too many password hashes are already pending"""
+
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Too many logins in progress, try again later."
+    default_code = "hashing_unavailable"
+
+
+def get_options():
+    """Return the configured options merged with the defaults"""
+    options = dict(DEFAULT_PASSWORD_HASHING)
+    options.update(getattr(settings, "PASSWORD_HASHING", {}))
+    return options
+
+
+executor = BoundedExecutor("password-hash", get_options)
+_pool_thread = threading.local()
+
+
+def _run_in_pool(fn):
+    """Call fn, marking the current thread as a pool thread"""
+    _pool_thread.active = True
+    return fn()
+
+
+class BoundedHasherMixin:
+    """Run encode and verify on the hashing pool"""
+
+    def _offload(self, fn):
+        """Run fn on the pool and wait for its result"""
+        # verify calls encode, which must not queue behind itself
+        if getattr(_pool_thread, "active", False):
+            return fn()
+        try:
+            return executor.submit(_run_in_pool, fn).result()
+        except ExecutorBusy:
+            raise HashingUnavailable()
+
+    def encode(self, password, salt, *args, **kwargs):
+        return self._offload(
+            lambda: super(BoundedHasherMixin, self).encode(
+                password, salt, *args, **kwargs
+            )
+        )
+
+    def verify(self, password, encoded):
+        return self._offload(
+            lambda: super(BoundedHasherMixin, self).verify(password, encoded)
+        )
+
+
+class Argon2PasswordHasher(BoundedHasherMixin, hashers.Argon2PasswordHasher):
+    """Argon2id with costs from PASSWORD_HASHING"""
+
+    @property
+    def time_cost(self):
+        return get_options()["ARGON2_TIME_COST"]
+
+    @property
+    def memory_cost(self):
+        return get_options()["ARGON2_MEMORY_COST"]
+
+    @property
+    def parallelism(self):
+        return get_options()["ARGON2_PARALLELISM"]
+
+
+class BCryptSHA256PasswordHasher(
+    BoundedHasherMixin, hashers.BCryptSHA256PasswordHasher
+):
+    """bcrypt of the SHA-256 digest with rounds from PASSWORD_HASHING"""
+
+    @property
+    def rounds(self):
+        return get_options()["BCRYPT_ROUNDS"]
+
+
+class PBKDF2PasswordHasher(BoundedHasherMixin, hashers.PBKDF2PasswordHasher):
+    """PBKDF2-SHA256 with iterations from PASSWORD_HASHING"""
+
+    @property
+    def iterations(self):
+        return get_options()["PBKDF2_ITERATIONS"]
@@ -0,0 +1,652 @@
+"""
+Django command to benchmark every API route through the test client
+"""
+
+import collections
+import datetime
+import io
+import json
+import platform
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+import django
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLPattern, get_resolver, reverse
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from PIL import Image
+
+from core.models import Ingredient, Recipe, RecipeImage, Tag, Task
+from recipe import async_views, images, stats
+from user.authentication import token_cache
+
+EMAIL_PREFIX = "benchmark-api-"
+# users signing up during the run, removed even when keeping the data
+NEW_USER_PREFIX = f"{EMAIL_PREFIX}new-"
+PASSWORD = "benchmark-password-123"
+TITLE_WORDS = ("pasta", "soup", "salad", "curry", "stew")
+NAMES_PER_USER = 50
+RELATIONS_PER_RECIPE = 3
+# URL namespaces and top level names covered by the routes below
+NAMESPACES = ("user", "recipe")
+TOP_LEVEL_ROUTES = ("api-schema", "api-docs", "db-stats", "metrics")
+
+# name, method, client, path(state), data(iteration), what to create
+# before each request and the request format
+Route = collections.namedtuple(
+    "Route",
+    "name method client path data prepare format",
+    defaults=(None, None, "json"),
+)
+
+
+def _recipe_url(name, key="recipe_id", suffix=""):
+    """Return a path function for a recipe app detail route"""
+    return lambda state: reverse(f"recipe:{name}", args=[state[key]]) + suffix
+
+
+def _image_upload(iteration):
+    """Return an upload of a photo sized JPEG, distinct per iteration"""
+    output = io.BytesIO()
+    Image.new("RGB", (1600, 1200), (iteration % 256, 120, 80)).save(
+        output, "JPEG"
+    )
+    return {
+        "image": SimpleUploadedFile(
+            f"recipe-{iteration}.jpg", output.getvalue(), "image/jpeg"
+        )
+    }
+
+
+ROUTES = (
+    Route(
+        "user:create",
+        "post",
+        "anon",
+        lambda state: reverse("user:create"),
+        lambda i: {
+            "email": f"{NEW_USER_PREFIX}{i}@example.com",
+            "password": PASSWORD,
+            "name": "New",
+        },
+    ),
+    Route(
+        "user:token",
+        "post",
+        "anon",
+        lambda state: reverse("user:token"),
+        lambda i: {
+            "email": f"{EMAIL_PREFIX}0@example.com",
+            "password": PASSWORD,
+        },
+    ),
+    Route("user:me", "get", "user", lambda state: reverse("user:me")),
+    Route(
+        "user:me:patch",
+        "patch",
+        "user",
+        lambda state: reverse("user:me"),
+        lambda i: {"name": f"Benchmark {i}"},
+    ),
+    Route(
+        "recipe:api-root",
+        "get",
+        "user",
+        lambda state: reverse("recipe:api-root"),
+    ),
+    Route(
+        "recipe:recipe-list",
+        "get",
+        "user",
+        lambda state: reverse("recipe:recipe-list"),
+    ),
+    Route(
+        "recipe:recipe-list:page",
+        "get",
+        "user",
+        lambda state: reverse("recipe:recipe-list") + "?page_size=100",
+    ),
+    Route(
+        "recipe:recipe-list:tags",
+        "get",
+        "user",
+        lambda state: reverse("recipe:recipe-list")
+        + f"?tags={state['tag_ids']}&page_size=100",
+    ),
+    Route(
+        "recipe:recipe-list:sparse",
+        "get",
+        "user",
+        lambda state: reverse("recipe:recipe-list")
+        + "?fields=id,title&page_size=100",
+    ),
+    Route(
+        "recipe:recipe-list:search",
+        "get",
+        "user",
+        lambda state: reverse("recipe:recipe-list")
+        + "?search=curry&page_size=100",
+    ),
+    Route(
+        "recipe:recipe-list:post",
+        "post",
+        "user",
+        lambda state: reverse("recipe:recipe-list"),
+        lambda i: {
+            "title": f"Created {i}",
+            "time_minutes": 10,
+            "price": "5.25",
+            "tags": [{"name": f"Tag {n}"} for n in range(3)],
+            "ingredients": [{"name": f"Ingredient {n}"} for n in range(3)],
+        },
+    ),
+    Route("recipe:recipe-detail", "get", "user", _recipe_url("recipe-detail")),
+    Route(
+        "recipe:recipe-detail:patch",
+        "patch",
+        "user",
+        _recipe_url("recipe-detail"),
+        lambda i: {"title": f"Renamed {i}"},
+    ),
+    Route(
+        "recipe:recipe-detail:delete",
+        "delete",
+        "user",
+        _recipe_url("recipe-detail", "new_recipe_id"),
+        prepare="create_recipe",
+    ),
+    Route(
+        "recipe:recipe-upload-image",
+        "post",
+        "user",
+        _recipe_url("recipe-upload-image", "new_recipe_id"),
+        _image_upload,
+        prepare="create_recipe",
+        format="multipart",
+    ),
+    Route(
+        "recipe:recipe-bulk",
+        "post",
+        "user",
+        lambda state: reverse("recipe:recipe-bulk"),
+        lambda i: [
+            {"title": f"Bulk {i}-{n}", "time_minutes": 5, "price": "1.00"}
+            for n in range(10)
+        ],
+    ),
+    Route(
+        "recipe:recipe-export",
+        "get",
+        "user",
+        lambda state: reverse("recipe:recipe-export"),
+    ),
+    Route(
+        "recipe:recipe-stats",
+        "get",
+        "user",
+        lambda state: reverse("recipe:recipe-stats"),
+    ),
+    Route(
+        "recipe:tag-list",
+        "get",
+        "user",
+        lambda state: reverse("recipe:tag-list"),
+    ),
+    Route(
+        "recipe:tag-list:by-usage",
+        "get",
+        "user",
+        lambda state: reverse("recipe:tag-list")
+        + "?ordering=-recipe_count&assigned_only=1",
+    ),
+    Route(
+        "recipe:tag-detail",
+        "patch",
+        "user",
+        _recipe_url("tag-detail", "new_tag_id"),
+        lambda i: {"name": f"Renamed tag {i}"},
+        prepare="create_tag",
+    ),
+    Route(
+        "recipe:tag-detail:delete",
+        "delete",
+        "user",
+        _recipe_url("tag-detail", "new_tag_id"),
+        prepare="create_tag",
+    ),
+    Route(
+        "recipe:ingredient-list",
+        "get",
+        "user",
+        lambda state: reverse("recipe:ingredient-list"),
+    ),
+    Route(
+        "recipe:ingredient-detail",
+        "patch",
+        "user",
+        _recipe_url("ingredient-detail", "new_ingredient_id"),
+        lambda i: {"name": f"Renamed ingredient {i}"},
+        prepare="create_ingredient",
+    ),
+    Route(
+        "recipe:ingredient-detail:delete",
+        "delete",
+        "user",
+        _recipe_url("ingredient-detail", "new_ingredient_id"),
+        prepare="create_ingredient",
+    ),
+    Route(
+        "recipe:async-recipe-list",
+        "get",
+        "user",
+        lambda state: reverse("recipe:async-recipe-list"),
+    ),
+    Route(
+        "recipe:async-recipe-detail",
+        "get",
+        "user",
+        _recipe_url("async-recipe-detail"),
+    ),
+    Route(
+        "recipe:async-tag-list",
+        "get",
+        "user",
+        lambda state: reverse("recipe:async-tag-list"),
+    ),
+    Route("db-stats", "get", "staff", lambda state: reverse("db-stats")),
+    Route("api-schema", "get", "anon", lambda state: reverse("api-schema")),
+    Route("api-docs", "get", "anon", lambda state: reverse("api-docs")),
+    Route("metrics", "get", "staff", lambda state: reverse("metrics")),
+)
+
+
+def api_route_names():
+    """Return the names of all API routes that should be benchmarked"""
+    names = set()
+    resolver = get_resolver()
+    for namespace in NAMESPACES:
+        _, sub_resolver = resolver.namespace_dict[namespace]
+        names.update(
+            f"{namespace}:{name}"
+            for name in _pattern_names(sub_resolver.url_patterns)
+        )
+    return names | set(TOP_LEVEL_ROUTES)
+
+
+def _pattern_names(patterns):
+    """Yield the names of URL patterns, following includes"""
+    for pattern in patterns:
+        if isinstance(pattern, URLPattern):
+            if pattern.name:
+                yield pattern.name
+        else:
+            yield from _pattern_names(pattern.url_patterns)
+
+
+def route_name(route):
+    """Return the URL name a route exercises"""
+    parts = route.name.split(":")
+    return ":".join(parts[:2]) if parts[0] in NAMESPACES else parts[0]
+
+
+def percentile(values, fraction):
+    """Return a percentile of sorted values"""
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class Command(BaseCommand):
+    """Django command recording query counts, latency and allocations"""
+
+    help = (
+        "Seed synthetic users, recipes, tags and ingredients, drive every "
+        "API route through the test client and report SQL queries, p50 and "
+        "p95 latency and allocations, optionally as JSON for comparing "
+        "commits."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--recipes",
+            type=int,
+            default=1000,
+            help="Total synthetic recipes, e.g. 1000, 100000 or 1000000.",
+        )
+        parser.add_argument("--users", type=int, default=10)
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument(
+            "--routes",
+            nargs="+",
+            choices=[route.name for route in ROUTES],
+            help="Only benchmark these routes.",
+        )
+        parser.add_argument("--output", help="Write a JSON report here.")
+        parser.add_argument(
+            "--compare",
+            help="JSON report of an earlier run to check for regressions.",
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.25,
+            help="Allowed relative p95 increase when comparing.",
+        )
+        parser.add_argument(
+            "--cache",
+            action="store_true",
+            help="Keep the response cache enabled.",
+        )
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Keep the synthetic data for later runs.",
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        if options["users"] < 1 or options["recipes"] < options["users"]:
+            raise CommandError("Expected at least one recipe per user")
+        routes = [
+            route
+            for route in ROUTES
+            if not options["routes"] or route.name in options["routes"]
+        ]
+        users = self.seed(options["users"], options["recipes"])
+        overrides = {
+            "ALLOWED_HOSTS": ["testserver"],
+            # query logging is measured explicitly, not on every request
+            "DEBUG": False,
+        }
+        if not options["cache"]:
+            overrides["RECIPE_RESPONSE_CACHE"] = {"ENABLED": False}
+        # uploaded images and their thumbnails are thrown away
+        overrides["MEDIA_ROOT"] = tempfile.mkdtemp()
+
+        try:
+            with override_settings(**overrides):
+                results = self.run_routes(users[0], routes, options)
+        finally:
+            # uploaded images are removed with their files and thumbnail
+            # tasks, even when keeping the data
+            uploaded = RecipeImage.objects.filter(
+                recipes__user__email__startswith=EMAIL_PREFIX
+            )
+            Task.objects.filter(
+                name=images.generate_thumbnail.task_name,
+                args__0__in=list(uploaded.values_list("id", flat=True)),
+            ).delete()
+            uploaded.delete()
+            shutil.rmtree(overrides["MEDIA_ROOT"])
+            async_views.shutdown()
+            token_cache.local.clear()
+            prefix = EMAIL_PREFIX if not options["keep"] else NEW_USER_PREFIX
+            self.stdout.write("Removing synthetic data.....")
+            self.remove(
+                get_user_model().objects.filter(email__startswith=prefix)
+            )
+
+        report = {
+            "meta": {
+                "recipes": options["recipes"],
+                "users": options["users"],
+                "iterations": options["iterations"],
+                "cache": options["cache"],
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "created": datetime.datetime.now(
+                    datetime.timezone.utc
+                ).isoformat(),
+            },
+            "routes": results,
+        }
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(report, output, indent=2, sort_keys=True)
+        if options["compare"]:
+            self.compare(options["compare"], report, options["tolerance"])
+
+    def seed(self, user_count, recipe_count):
+        """Create synthetic users and data unless it already exists"""
+        User = get_user_model()
+        emails = [f"{EMAIL_PREFIX}{i}@example.com" for i in range(user_count)]
+        users = list(User.objects.filter(email__in=emails).order_by("id"))
+        per_user = recipe_count // user_count
+        if (
+            len(users) == user_count
+            and Recipe.objects.filter(user__in=users).count()
+            == per_user * user_count
+        ):
+            return users
+
+        self.remove(User.objects.filter(email__startswith=EMAIL_PREFIX))
+        self.stdout.write(
+            f"Seeding {user_count} users with {per_user} recipes each....."
+        )
+        password = make_password(PASSWORD)
+        users = User.objects.bulk_create(
+            User(email=email, name="Benchmark", password=password)
+            for email in emails
+        )
+        # the first user makes all requests, including database stats
+        User.objects.filter(id=users[0].id).update(is_staff=True)
+        ids = [user.id for user in users]
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            for model in (Tag, Ingredient):
+                cursor.execute(
+                    f"INSERT INTO {model._meta.db_table} "
+                    "(user_id, name, recipe_count) "
+                    "SELECT u, %s || ' ' || n, 0 "
+                    "FROM unnest(%s::bigint[]) u, generate_series(0, %s) n",
+                    [model.__name__, ids, NAMES_PER_USER - 1],
+                )
+            cursor.execute(
+                f"INSERT INTO {Recipe._meta.db_table} (user_id, title, "
+                "description, time_minutes, price, link, search_vector) "
+                "SELECT u, title, description, 5 + n %% 120, "
+                "(100 + n %% 9900) / 100.0, '', "
+                "setweight(to_tsvector(%s::regconfig, title), 'A') || "
+                "setweight(to_tsvector(%s::regconfig, description), 'B') "
+                "FROM unnest(%s::bigint[]) u, generate_series(1, %s) n, "
+                "LATERAL (SELECT "
+                "(%s::text[])[1 + n %% 5] || ' ' || n AS title, "
+                "'Synthetic recipe number ' || n AS description) t",
+                [
+                    Recipe.SEARCH_CONFIG,
+                    Recipe.SEARCH_CONFIG,
+                    ids,
+                    per_user,
+                    list(TITLE_WORDS),
+                ],
+            )
+            for model, field in ((Tag, "tags"), (Ingredient, "ingredient")):
+                through = getattr(Recipe, field).through
+                column = f"{model._meta.model_name}_id"
+                cursor.execute(
+                    f"INSERT INTO {through._meta.db_table} "
+                    f"(recipe_id, {column}) "
+                    f"SELECT r.id, named.id FROM {Recipe._meta.db_table} r "
+                    "CROSS JOIN generate_series(0, %s) k "
+                    f"JOIN {model._meta.db_table} named "
+                    "ON named.user_id = r.user_id "
+                    "AND named.name = %s || ' ' || ((r.id + k) %% %s) "
+                    "WHERE r.user_id = ANY(%s)",
+                    [
+                        RELATIONS_PER_RECIPE - 1,
+                        model.__name__,
+                        NAMES_PER_USER,
+                        ids,
+                    ],
+                )
+            # set based inserts send no signals to maintain the rollups
+            stats.rebuild(ids)
+            for model in (Recipe, Tag, Ingredient):
+                cursor.execute(f"ANALYZE {model._meta.db_table}")
+        return list(User.objects.filter(id__in=ids).order_by("id"))
+
+    def remove(self, users):
+        """Delete users and their data with set based queries"""
+        ids = list(users.values_list("id", flat=True))
+        if not ids:
+            return
+        recipes = (
+            f"SELECT id FROM {Recipe._meta.db_table} WHERE user_id = ANY(%s)"
+        )
+        with transaction.atomic(), connection.cursor() as cursor:
+            for through in (Recipe.tags.through, Recipe.ingredient.through):
+                cursor.execute(
+                    f"DELETE FROM {through._meta.db_table} "
+                    f"WHERE recipe_id IN ({recipes})",
+                    [ids],
+                )
+            for model in (Recipe, Tag, Ingredient):
+                cursor.execute(
+                    f"DELETE FROM {model._meta.db_table} "
+                    "WHERE user_id = ANY(%s)",
+                    [ids],
+                )
+            get_user_model().objects.filter(id__in=ids).delete()
+
+    def run_routes(self, user, routes, options):
+        """Benchmark each route, returning results keyed by route name"""
+        token, _ = Token.objects.get_or_create(user=user)
+        clients = {"anon": APIClient(), "user": APIClient()}
+        clients["user"].credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+        # the stats view only takes session and basic authentication, and
+        # the metrics view is a plain Django view reading the session
+        clients["staff"] = APIClient()
+        clients["staff"].force_authenticate(user)
+        clients["staff"].force_login(user)
+        recipe = Recipe.objects.filter(user=user).order_by("id").first()
+        context = {
+            "user": user,
+            "recipe_id": recipe.id,
+            "tag_ids": ",".join(
+                str(pk) for pk in recipe.tags.values_list("id", flat=True)[:2]
+            ),
+        }
+
+        results = {}
+        for route in routes:
+            results[route.name] = self.measure(
+                route, clients[route.client], context, options["iterations"]
+            )
+            self.report(route.name, results[route.name])
+        return results
+
+    def prepare(self, route, context, iteration):
+        """Return the path state of a request, creating what it needs"""
+        state = dict(context)
+        user = context["user"]
+        if route.prepare == "create_recipe":
+            state["new_recipe_id"] = Recipe.objects.create(
+                user=user, title="Deleted", time_minutes=1, price="1.00"
+            ).id
+        elif route.prepare == "create_tag":
+            state["new_tag_id"] = Tag.objects.create(
+                user=user, name=f"Benchmark tag {route.name} {iteration}"
+            ).id
+        elif route.prepare == "create_ingredient":
+            state["new_ingredient_id"] = Ingredient.objects.create(
+                user=user,
+                name=f"Benchmark ingredient {route.name} {iteration}",
+            ).id
+        return state
+
+    def send(self, route, client, state, iteration):
+        """Make one request and read its whole body"""
+        kwargs = {"format": route.format}
+        if route.data is not None:
+            kwargs["data"] = route.data(iteration)
+        response = getattr(client, route.method)(route.path(state), **kwargs)
+        if response.streaming:
+            size = sum(len(chunk) for chunk in response.streaming_content)
+        else:
+            size = len(response.content)
+        return response.status_code, size
+
+    def measure(self, route, client, context, iterations):
+        """Time a route, then count its queries and allocations once"""
+        timings = []
+        # the first request warms up caches and is not timed
+        for iteration in range(iterations + 1):
+            state = self.prepare(route, context, iteration)
+            start = time.perf_counter()
+            status, size = self.send(route, client, state, iteration)
+            if iteration:
+                timings.append((time.perf_counter() - start) * 1000)
+
+        state = self.prepare(route, context, iterations + 1)
+        tracemalloc.start()
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                status, size = self.send(route, client, state, iterations + 1)
+            allocated, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        timings.sort()
+        return {
+            "status": status,
+            "response_bytes": size,
+            # async views query from pool threads, which are not captured
+            "queries": None if "async" in route.name else len(queries),
+            "mean_ms": round(statistics.mean(timings), 3),
+            "p50_ms": round(statistics.median(timings), 3),
+            "p95_ms": round(percentile(timings, 0.95), 3),
+            "peak_alloc_kib": round(peak / 1024, 1),
+        }
+
+    def report(self, name, result):
+        """Write the results of one route"""
+        style = (
+            self.style.SUCCESS if result["status"] < 400 else self.style.ERROR
+        )
+        queries = "-" if result["queries"] is None else result["queries"]
+        self.stdout.write(
+            style(
+                f"{name}: {result['status']}, {queries} queries, "
+                f"p50 {result['p50_ms']:.2f} ms, "
+                f"p95 {result['p95_ms']:.2f} ms, "
+                f"peak {result['peak_alloc_kib']:.0f} KiB"
+            )
+        )
+
+    def compare(self, path, report, tolerance):
+        """Report regressions against an earlier run, failing if any"""
+        with open(path) as baseline_file:
+            baseline = json.load(baseline_file)["routes"]
+        regressions = []
+        for name, result in report["routes"].items():
+            before = baseline.get(name)
+            if before is None:
+                continue
+            if (result["queries"] or 0) > (before["queries"] or 0):
+                regressions.append(
+                    f"{name}: {before['queries']} -> {result['queries']} "
+                    "queries"
+                )
+            if result["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+                regressions.append(
+                    f"{name}: p95 {before['p95_ms']:.2f} -> "
+                    f"{result['p95_ms']:.2f} ms"
+                )
+            if result["status"] != before["status"]:
+                regressions.append(
+                    f"{name}: status {before['status']} -> "
+                    f"{result['status']}"
+                )
+        for regression in regressions:
+            self.stdout.write(self.style.ERROR(regression))
+        if regressions:
+            raise CommandError(f"{len(regressions)} regressions")
+        self.stdout.write(self.style.SUCCESS(f"No regressions against {path}"))
@@ -0,0 +1,113 @@
+"""
+Django command to benchmark the JSON renderers and parsers
+"""
+
+import io
+import statistics
+import time
+from collections import OrderedDict
+
+from django.core.management.base import BaseCommand, CommandError
+
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.parsers import ORJSONParser
+from core.renderers import ORJSONRenderer
+
+BACKENDS = (
+    ("json", JSONRenderer, JSONParser),
+    ("orjson", ORJSONRenderer, ORJSONParser),
+)
+
+
+def recipe_page(count):
+    """Return serializer output shaped like a page of recipe details"""
+    return [
+        OrderedDict(
+            [
+                ("id", index),
+                ("title", f"Recipe {index} crème brûlée"),
+                (
+                    "ingredient",
+                    [
+                        OrderedDict(id=n, name=f"Ingredient {n}")
+                        for n in range(index % 7, index % 7 + 5)
+                    ],
+                ),
+                (
+                    "tags",
+                    [
+                        OrderedDict(id=n, name=f"Tag {n}")
+                        for n in range(index % 3, index % 3 + 3)
+                    ],
+                ),
+                ("time_minutes", 10 + index % 50),
+                ("price", f"{index % 1000}.{index % 100:02d}"),
+                ("link", f"https://example.com/recipes/{index}"),
+                ("description", "Whisk, fold and bake until golden. " * 4),
+            ]
+        )
+        for index in range(count)
+    ]
+
+
+class Command(BaseCommand):
+    """Django command comparing JSON rendering and parsing backends"""
+
+    help = (
+        "Render and parse a synthetic page of recipes with each JSON "
+        "backend, check they produce the same bytes and report MB/s."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--items", type=int, default=1000)
+        parser.add_argument("--iterations", type=int, default=50)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        data = recipe_page(options["items"])
+        bodies = {
+            name: renderer().render(data) for name, renderer, _ in BACKENDS
+        }
+        if len(set(bodies.values())) != 1:
+            raise CommandError("The renderers produced different JSON")
+        body = bodies["json"]
+        context = {"encoding": "utf-8"}
+
+        for name, renderer_class, parser_class in BACKENDS:
+            renderer = renderer_class()
+            parser = parser_class()
+            self.report(
+                f"{name} render",
+                self.measure(lambda: renderer.render(data), options),
+                len(body),
+            )
+            self.report(
+                f"{name} parse",
+                self.measure(
+                    lambda: parser.parse(io.BytesIO(body), None, context),
+                    options,
+                ),
+                len(body),
+            )
+
+    def measure(self, work, options):
+        """Return the sorted milliseconds of each run of work"""
+        timings = []
+        for _ in range(options["iterations"]):
+            start = time.perf_counter()
+            work()
+            timings.append((time.perf_counter() - start) * 1000)
+        return sorted(timings)
+
+    def report(self, name, timings, size):
+        """Write throughput and latency statistics"""
+        p50 = statistics.median(timings)
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{name}: {size / p50 / 1000:.0f} MB/s, p50 {p50:.2f} ms, "
+                f"p95 {p95:.2f} ms per {size} byte body"
+            )
+        )
@@ -0,0 +1,330 @@
+"""
+Django command to bulk import recipes from CSV or NDJSON files
+"""
+
+import csv
+import hashlib
+import io
+import json
+import os
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core.models import Ingredient, Recipe, RecipeImport, Tag
+from recipe import stats
+from recipe.cache import bump_version
+
+# separates the names in the tags and ingredients columns of CSV files
+LIST_SEPARATOR = ";"
+MAX_LENGTH = 255
+MAX_PRICE = Decimal("999.99")
+MAX_MINUTES = 2**31 - 1
+
+# record key, model and the through table linking it to recipes
+RELATIONS = (
+    ("tags", Tag, Recipe.tags.through, "tag_id"),
+    ("ingredients", Ingredient, Recipe.ingredient.through, "ingredient_id"),
+)
+
+# staging tables live for one chunk's transaction
+STAGING_SQL = (
+    "CREATE TEMPORARY TABLE IF NOT EXISTS import_recipe_stage ("
+    "line bigint PRIMARY KEY, recipe_id bigint, "
+    "title varchar(255) NOT NULL, time_minutes integer NOT NULL, "
+    "price numeric(5, 2) NOT NULL, link varchar(255) NOT NULL, "
+    "description text NOT NULL) ON COMMIT DROP",
+    "CREATE TEMPORARY TABLE IF NOT EXISTS import_name_stage ("
+    "line bigint NOT NULL, kind varchar(16) NOT NULL, "
+    "name varchar(255) NOT NULL) ON COMMIT DROP",
+    "TRUNCATE import_recipe_stage, import_name_stage",
+)
+COPY_RECIPES_SQL = (
+    "COPY import_recipe_stage "
+    "(line, title, time_minutes, price, link, description) "
+    "FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL (link, description))"
+)
+COPY_NAMES_SQL = (
+    "COPY import_name_stage (line, kind, name) FROM STDIN WITH (FORMAT csv)"
+)
+# ids are drawn up front so relations can be joined through the line number
+ASSIGN_IDS_SQL = (
+    "UPDATE import_recipe_stage "
+    "SET recipe_id = nextval(pg_get_serial_sequence(%s, 'id'))"
+)
+
+
+class InvalidRecord(ValueError):
+    """Raised for an input record that cannot be imported"""
+
+
+def file_checksum(path):
+    """Return the SHA-256 of a file, identifying it across runs"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as source:
+        for block in iter(lambda: source.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_records(path, file_format):
+    """Yield (line, record) pairs from a CSV or NDJSON file"""
+    with open(path, newline="", encoding="utf-8") as source:
+        if file_format == "csv":
+            reader = csv.DictReader(source)
+            missing = {"title", "time_minutes", "price"} - set(
+                reader.fieldnames or ()
+            )
+            if missing:
+                raise CommandError(
+                    f"CSV header is missing {', '.join(sorted(missing))}"
+                )
+            for record in reader:
+                yield reader.line_num, record
+        else:
+            for number, line in enumerate(source, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield number, json.loads(line)
+                except ValueError:
+                    yield number, None
+
+
+def _text(record, key, required=False):
+    """Return a stripped text field of a record"""
+    value = record.get(key)
+    value = "" if value is None else str(value).strip()
+    if required and not value:
+        raise InvalidRecord(f"{key} is required")
+    if key != "description" and len(value) > MAX_LENGTH:
+        raise InvalidRecord(f"{key} is longer than {MAX_LENGTH}")
+    return value
+
+
+def _names(value):
+    """Return the distinct names of a tags or ingredients field"""
+    if value is None or value == "":
+        return []
+    if isinstance(value, str):
+        value = value.split(LIST_SEPARATOR)
+    if not isinstance(value, list):
+        raise InvalidRecord("expected a list of names")
+    names = []
+    for item in value:
+        name = item.get("name") if isinstance(item, dict) else item
+        name = "" if name is None else str(name).strip()
+        if len(name) > MAX_LENGTH:
+            raise InvalidRecord(f"name is longer than {MAX_LENGTH}")
+        if name:
+            names.append(name)
+    return list(dict.fromkeys(names))
+
+
+def clean_record(record):
+    """Return the recipe columns and relations of a record"""
+    if not isinstance(record, dict):
+        raise InvalidRecord("not a JSON object")
+    try:
+        minutes = int(str(record.get("time_minutes")).strip())
+        price = Decimal(str(record.get("price")).strip()).quantize(
+            Decimal("0.01")
+        )
+    except (InvalidOperation, ValueError):
+        raise InvalidRecord("time_minutes and price must be numbers")
+    if not 0 <= minutes <= MAX_MINUTES:
+        raise InvalidRecord("time_minutes is out of range")
+    if not -MAX_PRICE <= price <= MAX_PRICE:
+        raise InvalidRecord("price is out of range")
+
+    columns = (
+        _text(record, "title", required=True),
+        minutes,
+        price,
+        _text(record, "link"),
+        _text(record, "description"),
+    )
+    return columns, {key: _names(record.get(key)) for key, *_ in RELATIONS}
+
+
+class Command(BaseCommand):
+    """Django command importing recipes with COPY and set based upserts"""
+
+    help = (
+        "Import recipes with their tags and ingredients for a user from a "
+        "CSV or NDJSON file. Each chunk is committed with the position "
+        "reached, so an interrupted import resumes where it stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--email", required=True)
+        parser.add_argument(
+            "--format",
+            choices=("csv", "ndjson"),
+            help="Defaults to csv for .csv files, ndjson otherwise.",
+        )
+        parser.add_argument("--chunk-size", type=int, default=5000)
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Import the file again from the start.",
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        path = options["path"]
+        if not os.path.isfile(path):
+            raise CommandError(f"No such file {path}")
+        try:
+            user = get_user_model().objects.get(email=options["email"])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No user with email {options['email']}")
+        file_format = options["format"] or (
+            "csv" if path.lower().endswith(".csv") else "ndjson"
+        )
+
+        job = self.get_job(user, path, options["restart"])
+        if job.completed:
+            self.stdout.write(
+                f"{path} was already imported, use --restart to import it "
+                "again."
+            )
+            return
+        if job.rows_done:
+            self.stdout.write(f"Resuming after {job.rows_done} rows.....")
+
+        start = time.perf_counter()
+        imported = 0
+        records = read_records(path, file_format)
+        for _ in zip(range(job.rows_done), records):
+            pass
+        while True:
+            chunk = [
+                record
+                for _, record in zip(range(options["chunk_size"]), records)
+            ]
+            if not chunk:
+                break
+            chunk_start = time.perf_counter()
+            self.import_chunk(job, user, chunk)
+            imported += len(chunk)
+            self.stdout.write(
+                f"{job.rows_done} rows done, "
+                f"{len(chunk) / (time.perf_counter() - chunk_start):.0f} "
+                "rows/s"
+            )
+
+        job.completed = True
+        job.save(update_fields=["completed", "updated"])
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {imported} rows in {elapsed:.2f} s, "
+                f"{imported / elapsed if elapsed else 0:.0f} rows/s, "
+                f"{job.rows_skipped} skipped in total"
+            )
+        )
+
+    def get_job(self, user, path, restart):
+        """Return the progress record of importing the file"""
+        job, _ = RecipeImport.objects.get_or_create(
+            user=user,
+            checksum=file_checksum(path),
+            defaults={"source": os.path.abspath(path)[-MAX_LENGTH:]},
+        )
+        if restart:
+            job.rows_done = job.rows_skipped = 0
+            job.completed = False
+            job.save()
+        return job
+
+    def import_chunk(self, job, user, chunk):
+        """Write one chunk and its checkpoint in a single transaction"""
+        recipes = io.StringIO()
+        names = io.StringIO()
+        recipe_writer = csv.writer(recipes)
+        name_writer = csv.writer(names)
+        skipped = 0
+        for line, record in chunk:
+            try:
+                columns, relations = clean_record(record)
+            except InvalidRecord as exc:
+                skipped += 1
+                self.stderr.write(f"Skipping line {line}: {exc}")
+                continue
+            recipe_writer.writerow((line,) + columns)
+            for key, values in relations.items():
+                name_writer.writerows((line, key, name) for name in values)
+
+        with transaction.atomic():
+            locked = RecipeImport.objects.select_for_update().get(id=job.id)
+            if locked.rows_done != job.rows_done:
+                raise CommandError("The file is being imported elsewhere")
+
+            with connection.cursor() as cursor:
+                self.write_rows(cursor, user, recipes, names)
+
+            job.rows_done += len(chunk)
+            job.rows_skipped += skipped
+            job.save(update_fields=["rows_done", "rows_skipped", "updated"])
+            # bulk writes send no model signals
+            transaction.on_commit(lambda: bump_version(user.id))
+
+    def write_rows(self, cursor, user, recipes, names):
+        """Copy a chunk into staging tables and upsert it"""
+        for sql in STAGING_SQL:
+            cursor.execute(sql)
+        recipes.seek(0)
+        cursor.copy_expert(COPY_RECIPES_SQL, recipes)
+        names.seek(0)
+        cursor.copy_expert(COPY_NAMES_SQL, names)
+        # temporary tables have no statistics until analyzed, which leaves
+        # the planner joining them with nested loops
+        cursor.execute("ANALYZE import_recipe_stage, import_name_stage")
+
+        cursor.execute(ASSIGN_IDS_SQL, [Recipe._meta.db_table])
+        cursor.execute(
+            f"INSERT INTO {Recipe._meta.db_table} "
+            "(id, user_id, title, time_minutes, price, link, description, "
+            "search_vector) "
+            "SELECT recipe_id, %s, title, time_minutes, price, link, "
+            "description, "
+            "setweight(to_tsvector(%s::regconfig, title), 'A') || "
+            "setweight(to_tsvector(%s::regconfig, description), 'B') "
+            "FROM import_recipe_stage",
+            [user.id, Recipe.SEARCH_CONFIG, Recipe.SEARCH_CONFIG],
+        )
+        stats.apply_query(
+            user.id, "SELECT time_minutes, price, 1 FROM import_recipe_stage"
+        )
+        for key, model, through, column in RELATIONS:
+            table = model._meta.db_table
+            cursor.execute(
+                f"INSERT INTO {table} (user_id, name, recipe_count) "
+                "SELECT DISTINCT %s, name, 0 FROM import_name_stage "
+                "WHERE kind = %s "
+                "ON CONFLICT (user_id, name) DO NOTHING",
+                [user.id, key],
+            )
+            # usage counts are raised by the links actually inserted
+            cursor.execute(
+                "WITH added AS ("
+                f"INSERT INTO {through._meta.db_table} (recipe_id, {column}) "
+                "SELECT DISTINCT recipe.recipe_id, named.id "
+                "FROM import_name_stage stage "
+                "JOIN import_recipe_stage recipe USING (line) "
+                f"JOIN {table} named "
+                "ON named.user_id = %s AND named.name = stage.name "
+                "WHERE stage.kind = %s "
+                f"ON CONFLICT DO NOTHING RETURNING {column}) "
+                f"UPDATE {table} named "
+                "SET recipe_count = named.recipe_count + usage.recipe_count "
+                f"FROM (SELECT {column} AS id, count(*) AS recipe_count "
+                "FROM added GROUP BY 1) usage "
+                "WHERE named.id = usage.id",
+                [user.id, key],
+            )
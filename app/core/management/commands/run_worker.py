@@ -0,0 +1,120 @@
+"""
+Django command to run queued tasks
+"""
+
+import multiprocessing
+import signal
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core import tasks
+
+
+class Command(BaseCommand):
+    """Django command running tasks from the database queue"""
+
+    help = (
+        "Run tasks queued in the database until interrupted, on a number "
+        "of processes with a number of threads each. Any number of workers "
+        "may run against the same database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=1)
+        parser.add_argument("--threads", type=int, default=1)
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            help="Tasks claimed per transaction.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            help="Seconds to wait when the queue is empty.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once no task is due.",
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        if options["processes"] < 1 or options["threads"] < 1:
+            raise CommandError("Expected at least one process and thread")
+        kwargs = {
+            "threads": options["threads"],
+            "batch_size": options["batch_size"],
+            "poll_interval": options["poll_interval"],
+            "once": options["once"],
+        }
+        self.stdout.write(
+            f"Running tasks on {options['processes']} processes with "
+            f"{options['threads']} threads each....."
+        )
+        start = time.perf_counter()
+
+        handlers = {
+            signum: signal.getsignal(signum)
+            for signum in (signal.SIGINT, signal.SIGTERM)
+        }
+        try:
+            ran = self.run(options["processes"], kwargs)
+        finally:
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Ran {ran} tasks in {time.perf_counter() - start:.2f} s"
+            )
+        )
+
+    def run(self, processes, kwargs):
+        """Run tasks on the worker processes, returning how many ran"""
+        if processes == 1:
+            stop = threading.Event()
+            self.stop_on_signals(stop)
+            return tasks.run_workers(stop, **kwargs)
+
+        # children must not share the parent's database connections
+        connections.close_all()
+        context = multiprocessing.get_context("fork")
+        stop = context.Event()
+        ran = context.Value("L", 0)
+        children = [
+            context.Process(target=_run_child, args=(stop, ran, kwargs))
+            for _ in range(processes)
+        ]
+        for child in children:
+            child.start()
+        self.stop_on_signals(stop)
+        for child in children:
+            child.join()
+        return ran.value
+
+    def stop_on_signals(self, stop):
+        """Finish the running batches and exit on SIGINT or SIGTERM"""
+        signums = (signal.SIGINT, signal.SIGTERM)
+
+        def handle_signal(*args):
+            # later signals must not reenter set(), which takes a lock
+            for signum in signums:
+                signal.signal(signum, lambda *args: None)
+            stop.set()
+
+        for signum in signums:
+            signal.signal(signum, handle_signal)
+
+
+def _run_child(stop, ran, kwargs):
+    """Run tasks in a worker process, adding to the shared count"""
+    # the parent sets stop, so running batches finish on a signal
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, signal.SIG_IGN)
+    count = tasks.run_workers(stop, **kwargs)
+    with ran.get_lock():
+        ran.value += count
@@ -0,0 +1,226 @@
+"""
+Per request SQL, serializer and response metrics.
+
+Sampled requests count and time their SQL queries through connection
+execute wrappers and their serializer time through TimedSerializerMixin.
+Every request adds its duration and response size to in process totals
+exported in the Prometheus text format. Totals are kept per process, so
+each worker is scraped on its own.
+"""
+
+import bisect
+import contextvars
+import heapq
+import threading
+import time
+
+from django.conf import settings
+
+DEFAULT_REQUEST_METRICS = {
+    "ENABLED": True,
+    "SAMPLE_RATE": 1.0,
+    "SERVER_TIMING": False,
+    "SLOW_REQUEST_MS": 500,
+    "SLOW_REQUEST_QUERIES": 50,
+    "SLOW_QUERIES_LOGGED": 3,
+    "TOKEN": "",
+}
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# counters of sampled requests, in the order Registry.sampled stores them
+SAMPLED_METRICS = (
+    ("http_requests_sampled_total", "Requests measured in detail."),
+    ("http_request_db_queries_total", "SQL queries of sampled requests."),
+    ("http_request_db_seconds_total", "SQL time of sampled requests."),
+    (
+        "http_request_serialize_seconds_total",
+        "Serializer time of sampled requests.",
+    ),
+)
+
+_current = contextvars.ContextVar("request_metrics", default=None)
+
+
+def get_options():
+    """Return the configured options merged with the defaults"""
+    options = dict(DEFAULT_REQUEST_METRICS)
+    options.update(getattr(settings, "REQUEST_METRICS", {}))
+    return options
+
+
+class RequestMetrics:
+    """SQL and serializer measurements of one sampled request"""
+
+    def __init__(self, slow_queries_kept):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+        self.serializing = False
+        self.slowest = []
+        self.slow_queries_kept = slow_queries_kept
+
+    def __call__(self, execute, sql, params, many, context):
+        """Execute wrapper timing each query"""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.queries += 1
+            self.db_time += duration
+            if len(self.slowest) < self.slow_queries_kept:
+                heapq.heappush(self.slowest, (duration, sql))
+            elif self.slowest and duration > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, (duration, sql))
+
+    def slowest_queries(self):
+        """Return (seconds, sql) of the slowest queries, slowest first"""
+        return sorted(self.slowest, reverse=True)
+
+
+def start_request(metrics):
+    """Make metrics the current request's, returning a reset token"""
+    return _current.set(metrics)
+
+
+def stop_request(token):
+    """Restore the metrics of the enclosing context"""
+    _current.reset(token)
+
+
+class TimedSerializerMixin:
+    """Add time spent in to_representation to the request's metrics.
+
+    Only the outermost serializer is timed, so nested serializers and
+    list items are not counted twice.
+    """
+
+    def to_representation(self, instance):
+        metrics = _current.get()
+        if metrics is None or metrics.serializing:
+            return super().to_representation(instance)
+        metrics.serializing = True
+        start = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            metrics.serialize_time += time.perf_counter() - start
+            metrics.serializing = False
+
+
+class Registry:
+    """Counters and duration histograms of requests in this process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        """Forget everything recorded so far"""
+        with self._lock:
+            self.requests = {}
+            self.durations = {}
+            self.sampled = {}
+
+    def record(self, method, route, status, duration, size, metrics=None):
+        """Record a finished request"""
+        bucket = bisect.bisect_left(DURATION_BUCKETS, duration)
+        with self._lock:
+            key = (method, route, str(status))
+            self.requests[key] = self.requests.get(key, 0) + 1
+
+            counts, total, response_bytes = self.durations.get(
+                route, ([0] * (len(DURATION_BUCKETS) + 1), 0.0, 0)
+            )
+            counts[bucket] += 1
+            self.durations[route] = (
+                counts,
+                total + duration,
+                response_bytes + size,
+            )
+
+            if metrics is not None:
+                sampled, queries, db_time, serialize_time = self.sampled.get(
+                    route, (0, 0, 0.0, 0.0)
+                )
+                self.sampled[route] = (
+                    sampled + 1,
+                    queries + metrics.queries,
+                    db_time + metrics.db_time,
+                    serialize_time + metrics.serialize_time,
+                )
+
+    def render(self):
+        """Return all metrics in the Prometheus text format"""
+        with self._lock:
+            requests = dict(self.requests)
+            durations = {
+                route: (list(counts), total, size)
+                for route, (counts, total, size) in self.durations.items()
+            }
+            sampled = dict(self.sampled)
+
+        lines = [
+            "# HELP http_requests_total Requests by method, route and "
+            "status.",
+            "# TYPE http_requests_total counter",
+        ]
+        for (method, route, status), count in sorted(requests.items()):
+            lines.append(
+                f"http_requests_total{{method={_quote(method)},"
+                f"route={_quote(route)},status={_quote(status)}}} {count}"
+            )
+
+        lines += [
+            "# HELP http_request_duration_seconds Request durations.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for route, (counts, total, _) in sorted(durations.items()):
+            label = f"route={_quote(route)}"
+            cumulative = 0
+            for bound, count in zip(DURATION_BUCKETS + ("+Inf",), counts):
+                cumulative += count
+                lines.append(
+                    f"http_request_duration_seconds_bucket{{{label},"
+                    f'le="{bound}"}} {cumulative}'
+                )
+            lines.append(
+                f"http_request_duration_seconds_sum{{{label}}} {total}"
+            )
+            lines.append(
+                f"http_request_duration_seconds_count{{{label}}} "
+                f"{cumulative}"
+            )
+
+        lines += [
+            "# HELP http_response_size_bytes_total Bytes of non streaming "
+            "response bodies.",
+            "# TYPE http_response_size_bytes_total counter",
+        ]
+        for route, (_, _, size) in sorted(durations.items()):
+            lines.append(
+                f"http_response_size_bytes_total{{route={_quote(route)}}} "
+                f"{size}"
+            )
+
+        for index, (name, help_text) in enumerate(SAMPLED_METRICS):
+            lines += [
+                f"# HELP {name} {help_text}",
+                f"# TYPE {name} counter",
+            ]
+            for route, values in sorted(sampled.items()):
+                lines.append(
+                    f"{name}{{route={_quote(route)}}} {values[index]}"
+                )
+        return "\n".join(lines) + "\n"
+
+
+def _quote(value):
+    """Return a quoted Prometheus label value"""
+    escaped = (
+        value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    )
+    return f'"{escaped}"'
+
+
+registry = Registry()
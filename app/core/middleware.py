@@ -0,0 +1,133 @@
+"""
+Middleware for the API.
+"""
+
+import asyncio
+import contextlib
+import logging
+import random
+import time
+
+from django.db import connections
+
+from core import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class RequestMetricsMiddleware:
+    """Measure requests and report them as headers, metrics and logs.
+
+    Every request records its duration, status and response size. A
+    SAMPLE_RATE share of them also counts SQL queries, database and
+    serializer time, which are sent back in a Server-Timing header. Slow
+    requests are logged with their slowest queries.
+
+    Under ASGI, async views query from pool threads whose connections are
+    not wrapped, so only durations and sizes are recorded for them.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # lets Django call this middleware without a thread hop
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+
+        options = metrics.get_options()
+        if not options["ENABLED"]:
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        sampled = self._sample(options)
+        if sampled is None:
+            response = self.get_response(request)
+        else:
+            token = metrics.start_request(sampled)
+            try:
+                with contextlib.ExitStack() as stack:
+                    for connection in connections.all():
+                        stack.enter_context(
+                            connection.execute_wrapper(sampled)
+                        )
+                    response = self.get_response(request)
+            finally:
+                metrics.stop_request(token)
+        self._finish(request, response, start, sampled, options)
+        return response
+
+    async def __acall__(self, request):
+        options = metrics.get_options()
+        if not options["ENABLED"]:
+            return await self.get_response(request)
+
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self._finish(request, response, start, None, options)
+        return response
+
+    def _sample(self, options):
+        """Return metrics for a sampled request, otherwise None"""
+        rate = options["SAMPLE_RATE"]
+        if rate >= 1 or (rate > 0 and random.random() < rate):
+            return metrics.RequestMetrics(options["SLOW_QUERIES_LOGGED"])
+        return None
+
+    def _finish(self, request, response, start, sampled, options):
+        """Record a response and add its Server-Timing header"""
+        duration = time.perf_counter() - start
+        match = request.resolver_match
+        route = match.view_name if match else "unmatched"
+        size = 0 if response.streaming else len(response.content)
+        metrics.registry.record(
+            request.method,
+            route,
+            response.status_code,
+            duration,
+            size,
+            sampled,
+        )
+
+        if options["SERVER_TIMING"]:
+            timings = [f"app;dur={duration * 1000:.1f}"]
+            if sampled is not None:
+                timings += [
+                    f'db;dur={sampled.db_time * 1000:.1f};desc="'
+                    f'{sampled.queries} queries"',
+                    f"serialize;dur={sampled.serialize_time * 1000:.1f}",
+                ]
+            response["Server-Timing"] = ", ".join(timings)
+
+        slow = duration * 1000 >= options["SLOW_REQUEST_MS"] or (
+            sampled is not None
+            and sampled.queries >= options["SLOW_REQUEST_QUERIES"]
+        )
+        if slow:
+            self._log_slow(request, response, duration, sampled)
+
+    def _log_slow(self, request, response, duration, sampled):
+        """Log a slow request with its slowest queries"""
+        message = "Slow request %s %s %s took %.1f ms"
+        args = [
+            request.method,
+            request.path,
+            response.status_code,
+            duration * 1000,
+        ]
+        if sampled is not None:
+            message += ", %d queries in %.1f ms, %.1f ms serializing"
+            args += [
+                sampled.queries,
+                sampled.db_time * 1000,
+                sampled.serialize_time * 1000,
+            ]
+            for seconds, sql in sampled.slowest_queries():
+                message += "\n  %.1f ms: %s"
+                args += [seconds * 1000, sql]
+        logger.warning(message, *args)
@@ -0,0 +1,25 @@
+# Generated by Django 3.2.25 on 2026-10-18 17:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0006_auto_20241130_0546"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(
+                fields=["user", "id"], name="recipe_user_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tag",
+            index=models.Index(
+                fields=["user", "name"], name="tag_user_name_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 3.2.25 on 2026-10-18 17:19
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def merge_duplicate_tags(apps, schema_editor):
+    """Point recipes at the oldest of each duplicate tag and drop the rest"""
+    Tag = apps.get_model("core", "Tag")
+    Recipe = apps.get_model("core", "Recipe")
+    RecipeTag = Recipe.tags.through
+
+    duplicates = (
+        Tag.objects.values("user_id", "name")
+        .annotate(keep_id=Min("id"), total=Count("id"))
+        .filter(total__gt=1)
+    )
+    for group in duplicates:
+        extra_ids = list(
+            Tag.objects.filter(user_id=group["user_id"], name=group["name"])
+            .exclude(id=group["keep_id"])
+            .values_list("id", flat=True)
+        )
+        tagged = RecipeTag.objects.filter(tag_id__in=extra_ids)
+        recipe_ids = set(tagged.values_list("recipe_id", flat=True))
+        recipe_ids -= set(
+            RecipeTag.objects.filter(
+                tag_id=group["keep_id"], recipe_id__in=recipe_ids
+            ).values_list("recipe_id", flat=True)
+        )
+        RecipeTag.objects.bulk_create(
+            RecipeTag(recipe_id=recipe_id, tag_id=group["keep_id"])
+            for recipe_id in recipe_ids
+        )
+        Tag.objects.filter(id__in=extra_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0007_recipe_tag_user_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_tags, migrations.RunPython.noop),
+    ]
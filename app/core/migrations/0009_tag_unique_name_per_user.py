@@ -0,0 +1,23 @@
+# Generated by Django 3.2.25 on 2026-10-18 17:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0008_merge_duplicate_tags"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="tag",
+            name="tag_user_name_idx",
+        ),
+        migrations.AddConstraint(
+            model_name="tag",
+            constraint=models.UniqueConstraint(
+                fields=("user", "name"), name="unique_tag_name_per_user"
+            ),
+        ),
+    ]
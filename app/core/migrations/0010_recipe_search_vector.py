@@ -0,0 +1,42 @@
+# Generated by Django 3.2.25 on 2026-10-18 17:27
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+def fill_search_vectors(apps, schema_editor):
+    """Compute the search vector of existing recipes"""
+    Recipe = apps.get_model("core", "Recipe")
+    Recipe.objects.update(
+        search_vector=django.contrib.postgres.search.SearchVector(
+            "title", weight="A", config="english"
+        )
+        + django.contrib.postgres.search.SearchVector(
+            "description", weight="B", config="english"
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0009_tag_unique_name_per_user"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="recipe_search_idx"
+            ),
+        ),
+        migrations.RunPython(fill_search_vectors, migrations.RunPython.noop),
+    ]
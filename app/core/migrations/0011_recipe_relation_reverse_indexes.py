@@ -0,0 +1,34 @@
+# Generated by Django 3.2.25 on 2026-10-18 17:40
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """Index the recipe through tables from the tag and ingredient side.
+
+    The tables are created by Django for the many to many fields, so the
+    indexes are managed here. They are built concurrently to avoid
+    locking large tables.
+    """
+
+    atomic = False
+
+    dependencies = [
+        ("core", "0010_recipe_search_vector"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS "
+            "recipe_tags_tag_recipe_idx "
+            "ON core_recipe_tags (tag_id, recipe_id)",
+            "DROP INDEX CONCURRENTLY IF EXISTS recipe_tags_tag_recipe_idx",
+        ),
+        migrations.RunSQL(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS "
+            "recipe_ingredient_ingredient_recipe_idx "
+            "ON core_recipe_ingredient (ingredient_id, recipe_id)",
+            "DROP INDEX CONCURRENTLY IF EXISTS "
+            "recipe_ingredient_ingredient_recipe_idx",
+        ),
+    ]
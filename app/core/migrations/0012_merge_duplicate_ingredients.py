@@ -0,0 +1,52 @@
+# Generated by Django 3.2.25 on 2026-10-18 17:45
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    """Point recipes at the oldest duplicate ingredient and drop the rest"""
+    Ingredient = apps.get_model("core", "Ingredient")
+    Recipe = apps.get_model("core", "Recipe")
+    RecipeIngredient = Recipe.ingredient.through
+
+    duplicates = (
+        Ingredient.objects.values("user_id", "name")
+        .annotate(keep_id=Min("id"), total=Count("id"))
+        .filter(total__gt=1)
+    )
+    for group in duplicates:
+        extra_ids = list(
+            Ingredient.objects.filter(
+                user_id=group["user_id"], name=group["name"]
+            )
+            .exclude(id=group["keep_id"])
+            .values_list("id", flat=True)
+        )
+        linked = RecipeIngredient.objects.filter(ingredient_id__in=extra_ids)
+        recipe_ids = set(linked.values_list("recipe_id", flat=True))
+        recipe_ids -= set(
+            RecipeIngredient.objects.filter(
+                ingredient_id=group["keep_id"], recipe_id__in=recipe_ids
+            ).values_list("recipe_id", flat=True)
+        )
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe_id=recipe_id, ingredient_id=group["keep_id"]
+            )
+            for recipe_id in recipe_ids
+        )
+        Ingredient.objects.filter(id__in=extra_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0011_recipe_relation_reverse_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_ingredients, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 3.2.25 on 2026-10-18 17:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0012_merge_duplicate_ingredients"),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name="ingredient",
+            constraint=models.UniqueConstraint(
+                fields=("user", "name"), name="unique_ingredient_name_per_user"
+            ),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 3.2.25 on 2026-10-18 19:05
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """Index auth tokens by their last refresh time.
+
+    The authtoken table belongs to rest_framework, so the index used to
+    find expired tokens is managed here. It is built concurrently to avoid
+    locking the table logins write to.
+    """
+
+    atomic = False
+
+    dependencies = [
+        ("authtoken", "0003_tokenproxy"),
+        ("core", "0013_ingredient_unique_name_per_user"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS "
+            "authtoken_token_created_idx ON authtoken_token (created)",
+            "DROP INDEX CONCURRENTLY IF EXISTS authtoken_token_created_idx",
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 3.2.25 on 2026-10-18 17:54
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0014_token_created_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RecipeImport",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("checksum", models.CharField(max_length=64)),
+                ("source", models.CharField(max_length=255)),
+                ("rows_done", models.BigIntegerField(default=0)),
+                ("rows_skipped", models.BigIntegerField(default=0)),
+                ("completed", models.BooleanField(default=False)),
+                ("updated", models.DateTimeField(auto_now=True)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="recipeimport",
+            constraint=models.UniqueConstraint(
+                fields=("user", "checksum"), name="unique_import_per_user"
+            ),
+        ),
+    ]
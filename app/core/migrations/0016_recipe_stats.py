@@ -0,0 +1,124 @@
+# Generated by Django 3.2.25 on 2026-10-18 18:18
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    """Add the recipe statistics rollups.
+
+    They start empty; run rebuild_recipe_stats to count existing recipes.
+    """
+
+    dependencies = [
+        ("core", "0015_recipeimport"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RecipePriceCount",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("bucket", models.SmallIntegerField()),
+                ("recipe_count", models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="RecipeStats",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        serialize=False,
+                        to="core.user",
+                    ),
+                ),
+                ("recipe_count", models.BigIntegerField(default=0)),
+                ("time_minutes_total", models.BigIntegerField(default=0)),
+                (
+                    "price_total",
+                    models.DecimalField(
+                        decimal_places=2, default=0, max_digits=19
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="RecipeTimeCount",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("time_minutes", models.IntegerField()),
+                ("recipe_count", models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="ingredient",
+            name="recipe_count",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="tag",
+            name="recipe_count",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name="ingredient",
+            index=models.Index(
+                fields=["user", "-recipe_count"],
+                name="ingredient_user_usage_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tag",
+            index=models.Index(
+                fields=["user", "-recipe_count"], name="tag_user_usage_idx"
+            ),
+        ),
+        migrations.AddField(
+            model_name="recipetimecount",
+            name="user",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddField(
+            model_name="recipepricecount",
+            name="user",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="recipetimecount",
+            constraint=models.UniqueConstraint(
+                fields=("user", "time_minutes"), name="unique_time_per_user"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="recipepricecount",
+            constraint=models.UniqueConstraint(
+                fields=("user", "bucket"), name="unique_price_bucket_per_user"
+            ),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 3.2.25 on 2026-10-18 18:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0016_recipe_stats"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RecipeImage",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("sha256", models.CharField(max_length=64, unique=True)),
+                ("image", models.ImageField(max_length=255, upload_to="")),
+                ("width", models.PositiveIntegerField()),
+                ("height", models.PositiveIntegerField()),
+                (
+                    "thumbnail",
+                    models.ImageField(
+                        blank=True, max_length=255, upload_to=""
+                    ),
+                ),
+                ("created", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="image",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="recipes",
+                to="core.recipeimage",
+            ),
+        ),
+    ]
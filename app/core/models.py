@@ -3,7 +3,10 @@ Database Models
 """
 
 from django.conf import settings
-from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.db import connections, models, router, transaction
+from django.utils import timezone
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
@@ -35,6 +38,34 @@ class UserManager(BaseUserManager):
         return user
 
 
+class UserNamedManager(models.Manager):
+    """Manager for objects whose name is unique per user"""
+
+    def get_or_create_many(self, user, names):
+        """Return objects for all names, creating missing ones in bulk"""
+        names = list(dict.fromkeys(names))
+        if not names:
+            return []
+
+        found = {
+            obj.name: obj for obj in self.filter(user=user, name__in=names)
+        }
+        missing = [name for name in names if name not in found]
+        if missing:
+            # rows created concurrently are skipped by the unique constraint
+            # and picked up by the query below
+            self.bulk_create(
+                [self.model(user=user, name=name) for name in missing],
+                ignore_conflicts=True,
+            )
+            found.update(
+                (obj.name, obj)
+                for obj in self.filter(user=user, name__in=missing)
+            )
+
+        return [found[name] for name in names]
+
+
 class User(AbstractBaseUser, PermissionsMixin):
     """User in the system"""
 
@@ -48,6 +79,46 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     USERNAME_FIELD = "email"
 
+    def delete(self, using=None, keep_parents=False):
+        """Delete the user, deleting their recipes in bulk first"""
+        using = using or router.db_for_write(type(self), instance=self)
+        # the rollups, tags and ingredients the recipes count into go with
+        # the user, so the recipes need none of their delete signals
+        with transaction.atomic(using=using):
+            recipes = Recipe.objects.db_manager(using)
+            recipes.delete_rows(
+                recipes.filter(user=self).values_list("id", flat=True)
+            )
+            return super().delete(using=using, keep_parents=keep_parents)
+
+
+class RecipeManager(models.Manager):
+    """Manager for recipes"""
+
+    def delete_rows(self, ids):
+        """Delete recipes and their links by id, returning how many.
+
+        Rows are deleted without being loaded and no signals are sent, so
+        callers keep the statistics and cached responses in step.
+        """
+        ids = list(ids)
+        if not ids:
+            return 0
+        using = self._db or router.db_for_write(self.model)
+        statements = [
+            f"DELETE FROM {field.remote_field.through._meta.db_table} "
+            f"WHERE {field.m2m_column_name()} = ANY(%s)"
+            for field in self.model._meta.many_to_many
+        ]
+        statements.append(
+            f"DELETE FROM {self.model._meta.db_table} WHERE id = ANY(%s)"
+        )
+        connection = connections[using]
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql, [ids])
+            return cursor.rowcount
+
 
 class Recipe(models.Model):
     """Recipe model"""
@@ -62,10 +133,55 @@ class Recipe(models.Model):
     link = models.CharField(max_length=255, blank=True)
     tags = models.ManyToManyField("Tag")
     ingredient = models.ManyToManyField("Ingredient")
+    search_vector = SearchVectorField(null=True, editable=False)
+    image = models.ForeignKey(
+        "RecipeImage",
+        null=True,
+        blank=True,
+        editable=False,
+        on_delete=models.SET_NULL,
+        related_name="recipes",
+    )
+
+    objects = RecipeManager()
+
+    SEARCH_CONFIG = "english"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "id"], name="recipe_user_id_idx"),
+            GinIndex(fields=["search_vector"], name="recipe_search_idx"),
+        ]
 
     def __str__(self):
         return self.title
 
+    def get_search_vector(self):
+        """Return an expression for the search vector of the recipe"""
+        return SearchVector(
+            models.Value(self.title),
+            weight="A",
+            config=self.SEARCH_CONFIG,
+        ) + SearchVector(
+            models.Value(self.description),
+            weight="B",
+            config=self.SEARCH_CONFIG,
+        )
+
+    def save(self, *args, using=None, update_fields=None, **kwargs):
+        """Save the recipe, writing its search vector in the same query"""
+        if update_fields is None:
+            self.search_vector = self.get_search_vector()
+        elif not {"title", "description"}.isdisjoint(update_fields):
+            self.search_vector = self.get_search_vector()
+            update_fields = set(update_fields) | {"search_vector"}
+        using = using or router.db_for_write(type(self), instance=self)
+        # one transaction, so the statistics signals can lock the row
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(
+                *args, using=using, update_fields=update_fields, **kwargs
+            )
+
 
 class Tag(models.Model):
     """Tag to filter recipes"""
@@ -75,6 +191,23 @@ class Tag(models.Model):
         settings.AUTH_USER_MODEL, on_delete=models.CASCADE
     )
 
+    # recipes using it, kept up to date by recipe.stats
+    recipe_count = models.IntegerField(default=0, editable=False)
+
+    objects = UserNamedManager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["user", "-recipe_count"], name="tag_user_usage_idx"
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "name"], name="unique_tag_name_per_user"
+            ),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -87,5 +220,134 @@ class Ingredient(models.Model):
         settings.AUTH_USER_MODEL, on_delete=models.CASCADE
     )
 
+    # recipes using it, kept up to date by recipe.stats
+    recipe_count = models.IntegerField(default=0, editable=False)
+
+    objects = UserNamedManager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["user", "-recipe_count"],
+                name="ingredient_user_usage_idx",
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "name"], name="unique_ingredient_name_per_user"
+            ),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class RecipeStats(models.Model):
+    """Running totals of a user's recipes, kept up to date by recipe.stats"""
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True
+    )
+    recipe_count = models.BigIntegerField(default=0)
+    time_minutes_total = models.BigIntegerField(default=0)
+    price_total = models.DecimalField(
+        max_digits=19, decimal_places=2, default=0
+    )
+
+
+class RecipeTimeCount(models.Model):
+    """Number of a user's recipes taking a given time"""
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE
+    )
+    time_minutes = models.IntegerField()
+    recipe_count = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "time_minutes"], name="unique_time_per_user"
+            ),
+        ]
+
+
+class RecipePriceCount(models.Model):
+    """Number of a user's recipes in a price bucket of recipe.stats"""
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE
+    )
+    bucket = models.SmallIntegerField()
+    recipe_count = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "bucket"], name="unique_price_bucket_per_user"
+            ),
+        ]
+
+
+class RecipeImport(models.Model):
+    """Progress of a recipe file import, for resuming after a crash"""
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE
+    )
+    checksum = models.CharField(max_length=64)
+    source = models.CharField(max_length=255)
+    rows_done = models.BigIntegerField(default=0)
+    rows_skipped = models.BigIntegerField(default=0)
+    completed = models.BooleanField(default=False)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "checksum"], name="unique_import_per_user"
+            ),
+        ]
+
+    def __str__(self):
+        return self.source
+
+
+class RecipeImage(models.Model):
+    """Uploaded recipe image, stored once per distinct content"""
+
+    sha256 = models.CharField(max_length=64, unique=True)
+    image = models.ImageField(max_length=255)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    # empty until the thumbnail has been generated in the background
+    thumbnail = models.ImageField(max_length=255, blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.image.name
+
+
+class Task(models.Model):
+    """Deferred call waiting for the run_worker command"""
+
+    name = models.CharField(max_length=255)
+    args = models.JSONField(default=list)
+    attempts = models.PositiveIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    # set once the last attempt failed, such tasks are kept for inspection
+    failed = models.BooleanField(default=False)
+    last_error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["run_after", "id"],
+                name="task_due_idx",
+                condition=models.Q(failed=False),
+            ),
+        ]
+
     def __str__(self):
         return self.name
@@ -0,0 +1,48 @@
+"""
+JSON parser backed by orjson.
+"""
+
+import codecs
+import io
+import re
+
+import orjson
+
+from django.conf import settings
+
+from rest_framework.parsers import JSONParser
+
+from core.renderers import ORJSONRenderer
+
+# digit runs long enough to be integers beyond 64 bits, which orjson
+# parses as floats
+_LONG_DIGITS = {
+    bytes: re.compile(rb"[0-9]{19}"),
+    str: re.compile(r"[0-9]{19}"),
+}
+
+
+class ORJSONParser(JSONParser):
+    """JSONParser parsing with orjson.
+
+    Bodies orjson rejects are parsed again by JSONParser, so invalid JSON
+    gets the same error and anything the standard library accepts, such
+    as lone surrogate escapes, still parses. Bodies that may hold integers
+    beyond 64 bits are parsed by JSONParser too, so they stay exact.
+    """
+
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        body = stream.read()
+        try:
+            document = body
+            if codecs.lookup(encoding).name != "utf-8":
+                document = body.decode(encoding)
+            if not _LONG_DIGITS[type(document)].search(document):
+                return orjson.loads(document)
+        except ValueError:
+            pass
+        return super().parse(io.BytesIO(body), media_type, parser_context)
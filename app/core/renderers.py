@@ -0,0 +1,43 @@
+"""
+JSON renderer backed by orjson.
+
+ORJSONRenderer renders the same bytes as DRF's JSONRenderer for the data
+this API returns. Types orjson does not handle itself, such as Decimal,
+dates and lazy strings, are converted by DRF's encoder, so a bare Decimal
+still renders as a float while serializer fields such as Recipe.price stay
+exact strings. Output orjson cannot produce, such as indented or ASCII only
+JSON, and data it rejects, like integers beyond 64 bits or non string
+keys, are rendered by JSONRenderer itself.
+
+Two differences remain: floats in exponent form render as 1e16 rather than
+1e+16, and NaN and infinities render as null instead of raising.
+"""
+
+import orjson
+
+from rest_framework.renderers import JSONRenderer
+
+# dates are left to DRF's encoder, which writes UTC as Z like it always has
+OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSONRenderer serializing with orjson"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent or self.ensure_ascii or not self.compact or not self.strict:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data, default=self.encoder_class().default, option=OPTIONS
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # escaped like JSONRenderer so the output is a javascript subset
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+            b"\xe2\x80\xa9", b"\\u2029"
+        )
@@ -0,0 +1,163 @@
+"""
+Database backed queue for work deferred out of requests.
+
+Functions decorated with ``task`` get an ``enqueue`` method inserting a
+Task row, in the caller's transaction, so a task exists exactly when the
+write that needed it commits. The run_worker command claims due tasks in
+batches with ``SELECT ... FOR UPDATE SKIP LOCKED``, so any number of
+workers share the queue without a broker and without claiming a task
+twice. A task runs in the claiming transaction: if the worker dies, its
+locks are released and the task is run again, so tasks must be
+idempotent. Failed tasks are retried with exponential backoff.
+"""
+
+import logging
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from core.models import Task
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TASK_QUEUE = {
+    "BATCH_SIZE": 10,
+    "POLL_INTERVAL": 1.0,
+    "MAX_ATTEMPTS": 5,
+    "RETRY_DELAY": 10.0,
+}
+
+_registry = {}
+
+
+def get_options():
+    """Return the configured options merged with the defaults"""
+    options = dict(DEFAULT_TASK_QUEUE)
+    options.update(getattr(settings, "TASK_QUEUE", {}))
+    return options
+
+
+def task(fn=None, *, max_attempts=None):
+    """Register a function as a task with JSON serializable arguments"""
+
+    def register(fn):
+        name = f"{fn.__module__}.{fn.__qualname__}"
+
+        def enqueue(*args, delay=None, using=DEFAULT_DB_ALIAS):
+            """Queue a call of the task, optionally delayed in seconds"""
+            run_after = timezone.now()
+            if delay:
+                run_after += timedelta(seconds=delay)
+            return Task.objects.using(using).create(
+                name=name, args=list(args), run_after=run_after
+            )
+
+        fn.task_name = name
+        fn.max_attempts = max_attempts
+        fn.enqueue = enqueue
+        _registry[name] = fn
+        return fn
+
+    return register(fn) if fn is not None else register
+
+
+def get_task(name):
+    """Return the function of a task, importing its module if needed"""
+    if name not in _registry:
+        # importing the module registers its tasks
+        import_string(name)
+    return _registry[name]
+
+
+def run_batch(batch_size=None, using=DEFAULT_DB_ALIAS):
+    """Claim and run up to batch_size due tasks, returning how many"""
+    options = get_options()
+    limit = batch_size or options["BATCH_SIZE"]
+    with transaction.atomic(using=using):
+        due = (
+            Task.objects.using(using)
+            .select_for_update(skip_locked=True)
+            .filter(failed=False, run_after__lte=timezone.now())
+            .order_by("run_after", "id")
+        )
+        claimed = list(due[:limit])
+        done = [
+            claimed_task.id
+            for claimed_task in claimed
+            if _run(claimed_task, options, using)
+        ]
+        Task.objects.using(using).filter(id__in=done).delete()
+    return len(claimed)
+
+
+def _run(claimed, options, using):
+    """Run one claimed task, scheduling a retry if it fails"""
+    fn = None
+    try:
+        fn = get_task(claimed.name)
+        # a savepoint, so a failing task leaves the batch usable
+        with transaction.atomic(using=using):
+            fn(*claimed.args)
+        return True
+    except Exception:
+        logger.exception("Task %s %s failed", claimed.name, claimed.id)
+        max_attempts = getattr(fn, "max_attempts", None)
+        claimed.attempts += 1
+        claimed.last_error = traceback.format_exc()
+        claimed.failed = claimed.attempts >= (
+            max_attempts or options["MAX_ATTEMPTS"]
+        )
+        claimed.run_after = timezone.now() + timedelta(
+            seconds=options["RETRY_DELAY"] * 2 ** (claimed.attempts - 1)
+        )
+        claimed.save(
+            using=using,
+            update_fields=["attempts", "last_error", "failed", "run_after"],
+        )
+        return False
+
+
+def run_worker(stop, batch_size=None, poll_interval=None, once=False):
+    """Run tasks until stop is set, or the queue is empty when once"""
+    options = get_options()
+    poll_interval = poll_interval or options["POLL_INTERVAL"]
+    ran = 0
+    while not stop.is_set():
+        close_old_connections()
+        try:
+            count = run_batch(batch_size)
+        finally:
+            close_old_connections()
+        ran += count
+        if count:
+            continue
+        if once:
+            break
+        stop.wait(poll_interval)
+    return ran
+
+
+def run_workers(stop, threads, **kwargs):
+    """Run tasks on a number of threads, returning how many ran"""
+    if threads == 1:
+        return run_worker(stop, **kwargs)
+
+    counts = []
+
+    def work():
+        counts.append(run_worker(stop, **kwargs))
+
+    workers = [
+        threading.Thread(target=work, name=f"task-worker-{index}")
+        for index in range(threads)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return sum(counts)
@@ -0,0 +1,98 @@
+"""
+Tests for the API benchmark command.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, TransactionTestCase
+
+from core.management.commands import benchmark_api
+from core.models import Recipe
+
+
+class RouteCoverageTests(SimpleTestCase):
+    """Test the benchmark keeps up with the URL configuration."""
+
+    def test_every_api_route_benchmarked(self):
+        """Test each named API route has a benchmark route."""
+        covered = {
+            benchmark_api.route_name(route) for route in benchmark_api.ROUTES
+        }
+
+        self.assertEqual(covered, benchmark_api.api_route_names())
+
+
+class BenchmarkApiCommandTests(TransactionTestCase):
+    """Test running the benchmark at a small scale.
+
+    Async routes read from pool threads, so the seeded data is committed.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def run_benchmark(self, **options):
+        """Run the command and return its output."""
+        out = StringIO()
+        call_command(
+            "benchmark_api",
+            recipes=20,
+            users=2,
+            iterations=2,
+            stdout=out,
+            stderr=StringIO(),
+            **options,
+        )
+        return out.getvalue()
+
+    def test_report_written_and_data_removed(self):
+        """Test every route succeeds and is in the JSON report."""
+        path = os.path.join(self.directory, "report.json")
+
+        self.run_benchmark(output=path)
+
+        with open(path) as report_file:
+            report = json.load(report_file)
+        self.assertEqual(report["meta"]["recipes"], 20)
+        self.assertEqual(
+            set(report["routes"]),
+            {route.name for route in benchmark_api.ROUTES},
+        )
+        for name, result in report["routes"].items():
+            self.assertLess(result["status"], 400, name)
+            self.assertLessEqual(result["p50_ms"], result["p95_ms"])
+        self.assertEqual(report["routes"]["recipe:recipe-list"]["queries"], 3)
+        self.assertFalse(get_user_model().objects.exists())
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_compare_flags_regressions(self):
+        """Test more queries than the baseline fail the comparison."""
+        path = os.path.join(self.directory, "baseline.json")
+        routes = ["recipe:recipe-list", "recipe:tag-list"]
+        self.run_benchmark(output=path, routes=routes)
+        with open(path) as report_file:
+            report = json.load(report_file)
+        report["routes"]["recipe:tag-list"]["p95_ms"] = 1e6
+        with open(path, "w") as report_file:
+            json.dump(report, report_file)
+
+        out = self.run_benchmark(compare=path, routes=["recipe:tag-list"])
+
+        self.assertIn("No regressions", out)
+
+        report["routes"]["recipe:tag-list"]["queries"] = 0
+        with open(path, "w") as report_file:
+            json.dump(report, report_file)
+
+        with self.assertRaises(CommandError):
+            self.run_benchmark(compare=path, routes=["recipe:tag-list"])
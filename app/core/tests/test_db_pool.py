@@ -0,0 +1,205 @@
+"""
+Tests for the database connection pool and backend.
+"""
+
+from unittest.mock import MagicMock, patch
+
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from psycopg2 import extensions
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.db.backends.postgresql.base import close_pools
+from core.db.pool import ConnectionPool, ConnectionStats, PoolTimeout
+
+
+DB_STATS_URL = reverse("db-stats")
+
+
+def fake_connection():
+    """Return a stand-in for a DB-API connection"""
+    connection = MagicMock()
+    connection.closed = 0
+    return connection
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """Test the in-process connection pool."""
+
+    def test_released_connection_reused(self):
+        """Test a returned connection is handed out again."""
+        pool = ConnectionPool(max_size=2)
+        connection, reused = pool.acquire(fake_connection)
+        pool.release(connection)
+
+        again, reused_again = pool.acquire(fake_connection)
+
+        self.assertFalse(reused)
+        self.assertTrue(reused_again)
+        self.assertIs(again, connection)
+
+    def test_overflow_closed_on_release(self):
+        """Test connections beyond max_size are not kept idle."""
+        pool = ConnectionPool(max_size=1, max_overflow=1)
+        first, _ = pool.acquire(fake_connection)
+        second, _ = pool.acquire(fake_connection)
+
+        pool.release(first)
+        pool.release(second)
+
+        self.assertEqual(pool.status(), {"idle": 1, "checked_out": 0})
+        second.close.assert_called_once()
+
+    def test_exhausted_pool_times_out(self):
+        """Test acquiring beyond max_size + max_overflow times out."""
+        pool = ConnectionPool(max_size=1, max_overflow=0, timeout=0.01)
+        pool.acquire(fake_connection)
+
+        with self.assertRaises(PoolTimeout):
+            pool.acquire(fake_connection)
+
+    def test_failed_connect_frees_slot(self):
+        """Test a failed connect does not leak a pool slot."""
+        pool = ConnectionPool(max_size=1, max_overflow=0, timeout=0.01)
+
+        with self.assertRaises(OSError):
+            pool.acquire(MagicMock(side_effect=OSError))
+
+        connection, _ = pool.acquire(fake_connection)
+        self.assertIsNotNone(connection)
+
+    def test_discarded_connection_closed(self):
+        """Test a broken connection is closed instead of kept."""
+        pool = ConnectionPool()
+        connection, _ = pool.acquire(fake_connection)
+
+        pool.release(connection, discard=True)
+
+        connection.close.assert_called_once()
+        self.assertEqual(pool.status(), {"idle": 0, "checked_out": 0})
+
+    @patch("core.db.pool.time.monotonic")
+    def test_idle_connections_reaped(self, patched_monotonic):
+        """Test connections idle longer than idle_timeout are closed."""
+        patched_monotonic.return_value = 100
+        pool = ConnectionPool(idle_timeout=60)
+        connection, _ = pool.acquire(fake_connection)
+        pool.release(connection)
+
+        patched_monotonic.return_value = 161
+        again, reused = pool.acquire(fake_connection)
+
+        connection.close.assert_called_once()
+        self.assertFalse(reused)
+        self.assertIsNot(again, connection)
+
+    def test_stats_reuse_ratio(self):
+        """Test the statistics report reuse ratio and waits."""
+        stats = ConnectionStats()
+        stats.record_acquire(0.5, False)
+        stats.record_acquire(0.0, True)
+        stats.record_acquire(0.0, True)
+        stats.record_acquire(0.0, True)
+
+        snapshot = stats.snapshot()
+
+        self.assertEqual(snapshot["created"], 1)
+        self.assertEqual(snapshot["reuse_ratio"], 0.75)
+        self.assertEqual(snapshot["wait_seconds_max"], 0.5)
+
+
+class PooledBackendTests(SimpleTestCase):
+    """Test the backend against the database with pooling enabled."""
+
+    alias = "pool_test"
+
+    def setUp(self):
+        settings_dict = dict(connections["default"].settings_dict)
+        settings_dict["CONN_HEALTH_CHECKS"] = True
+        settings_dict["POOL"] = {"ENABLED": True, "MAX_SIZE": 1}
+        connections.settings[self.alias] = settings_dict
+        self.connection = connections[self.alias]
+        self.connection.stats.reset()
+
+    def tearDown(self):
+        self.connection.close()
+        del connections[self.alias]
+        del connections.settings[self.alias]
+        close_pools(self.alias)
+
+    def query(self):
+        """Run one query as a request would, then end the request"""
+        self.connection.close_if_unusable_or_obsolete()
+        with self.connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        self.connection.close()
+
+    def test_connection_returned_to_pool(self):
+        """Test closing a connection keeps it open for the next request."""
+        self.query()
+        raw = self.connection.pool._idle[0][0]
+        self.query()
+
+        self.assertFalse(raw.closed)
+        self.assertIs(self.connection.pool._idle[0][0], raw)
+        snapshot = self.connection.stats.snapshot()
+        self.assertEqual(snapshot["acquired"], 2)
+        self.assertEqual(snapshot["reused"], 1)
+
+    def test_broken_connection_replaced(self):
+        """Test a pooled connection failing its health check is replaced."""
+        self.query()
+        raw = self.connection.pool._idle[0][0]
+        raw.close()
+
+        self.query()
+
+        self.assertIsNot(self.connection.pool._idle[0][0], raw)
+        snapshot = self.connection.stats.snapshot()
+        self.assertEqual(snapshot["health_check_failures"], 1)
+
+    def test_open_transaction_rolled_back(self):
+        """Test a connection is returned outside any transaction."""
+        self.connection.set_autocommit(False)
+        with self.connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        self.connection.close()
+
+        raw = self.connection.pool._idle[0][0]
+        self.assertEqual(
+            raw.info.transaction_status, extensions.TRANSACTION_STATUS_IDLE
+        )
+
+
+class DatabaseStatsApiTests(TestCase):
+    """Test the connection statistics endpoint."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_staff_required(self):
+        """Test statistics are only shown to staff users."""
+        user = get_user_model().objects.create_user(
+            email="user@example.com", password="test123"
+        )
+        self.client.force_authenticate(user)
+
+        res = self.client.get(DB_STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_stats_listed(self):
+        """Test statistics are returned per database alias."""
+        admin = get_user_model().objects.create_superuser(
+            email="admin@example.com", password="test123"
+        )
+        self.client.force_authenticate(admin)
+
+        res = self.client.get(DB_STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn("reuse_ratio", res.data["default"])
@@ -0,0 +1,177 @@
+"""
+Tests for the import_recipes command.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchQuery
+from django.core.management import call_command
+from django.test import TestCase
+
+from core.management.commands.import_recipes import Command
+from core.models import Recipe, RecipeImport, Tag
+from recipe import cache
+
+CSV_CONTENT = (
+    "title,time_minutes,price,link,description,tags,ingredients\n"
+    "Pasta,20,5.50,,Boiled noodles,Dinner;Quick,Flour;Egg\n"
+    'Soup,30,4.00,http://example.com,"Hot, tasty",Dinner,Water\n'
+    "Broken,soon,1.00,,,,\n"
+    "Salad,5,3.25,,,Quick;Quick,\n"
+)
+
+
+class ImportRecipesTests(TestCase):
+    """Test importing recipe files."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="user@example.com", password="test123"
+        )
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, content):
+        """Write a file in the test directory and return its path."""
+        path = os.path.join(self.directory, name)
+        with open(path, "w", encoding="utf-8") as output:
+            output.write(content)
+        return path
+
+    def run_import(self, path, **options):
+        """Run the command and return its output."""
+        out = StringIO()
+        err = StringIO()
+        call_command(
+            "import_recipes",
+            path,
+            email="user@example.com",
+            stdout=out,
+            stderr=err,
+            **options,
+        )
+        return out.getvalue(), err.getvalue()
+
+    def test_import_csv(self):
+        """Test recipes are imported with their tags and ingredients."""
+        Tag.objects.create(user=self.user, name="Dinner")
+        path = self.write("recipes.csv", CSV_CONTENT)
+
+        out, err = self.run_import(path, chunk_size=2)
+
+        self.assertIn("rows/s", out)
+        self.assertIn("Skipping line 4", err)
+        recipes = {r.title: r for r in Recipe.objects.filter(user=self.user)}
+        self.assertEqual(sorted(recipes), ["Pasta", "Salad", "Soup"])
+        pasta = recipes["Pasta"]
+        self.assertEqual(pasta.price, Decimal("5.50"))
+        self.assertEqual(pasta.description, "Boiled noodles")
+        self.assertEqual(
+            sorted(pasta.tags.values_list("name", flat=True)),
+            ["Dinner", "Quick"],
+        )
+        self.assertEqual(
+            sorted(pasta.ingredient.values_list("name", flat=True)),
+            ["Egg", "Flour"],
+        )
+        self.assertEqual(recipes["Soup"].link, "http://example.com")
+        self.assertEqual(recipes["Salad"].tags.count(), 1)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+        self.assertTrue(
+            Recipe.objects.filter(
+                search_vector=SearchQuery("noodle", config="english")
+            ).exists()
+        )
+        job = RecipeImport.objects.get()
+        self.assertTrue(job.completed)
+        self.assertEqual((job.rows_done, job.rows_skipped), (4, 1))
+
+    def test_import_ndjson_export(self):
+        """Test the export format can be imported."""
+        lines = [
+            {
+                "id": 7,
+                "title": "Pasta",
+                "time_minutes": 20,
+                "price": "5.50",
+                "link": "",
+                "description": "",
+                "tags": [{"id": 1, "name": "Dinner"}],
+                "ingredients": [{"id": 2, "name": "Flour"}],
+            },
+            {"title": "No price", "time_minutes": 1},
+        ]
+        path = self.write(
+            "recipes.ndjson",
+            "\n".join(json.dumps(line) for line in lines) + "\n\nnot json\n",
+        )
+
+        out, err = self.run_import(path)
+
+        recipe = Recipe.objects.get()
+        self.assertEqual(recipe.title, "Pasta")
+        self.assertNotEqual(recipe.id, 7)
+        self.assertEqual(recipe.tags.get().name, "Dinner")
+        self.assertEqual(recipe.ingredient.get().name, "Flour")
+        self.assertIn("Skipping line 2", err)
+        self.assertIn("Skipping line 4", err)
+
+    def test_resume_after_crash(self):
+        """Test an interrupted import continues after the last chunk."""
+        path = self.write("recipes.csv", CSV_CONTENT)
+        write_rows = Command.write_rows
+        calls = []
+
+        def crash_on_second_chunk(command, *args):
+            calls.append(args)
+            if len(calls) == 2:
+                raise RuntimeError("Crashed")
+            return write_rows(command, *args)
+
+        with patch.object(Command, "write_rows", crash_on_second_chunk):
+            with self.assertRaises(RuntimeError):
+                self.run_import(path, chunk_size=2)
+
+        self.assertEqual(RecipeImport.objects.get().rows_done, 2)
+        self.assertEqual(Recipe.objects.count(), 2)
+
+        out, _ = self.run_import(path, chunk_size=2)
+
+        self.assertIn("Resuming after 2 rows", out)
+        self.assertEqual(
+            sorted(Recipe.objects.values_list("title", flat=True)),
+            ["Pasta", "Salad", "Soup"],
+        )
+
+    def test_completed_import_not_repeated(self):
+        """Test a finished file is only imported again with --restart."""
+        path = self.write("recipes.csv", CSV_CONTENT)
+        self.run_import(path)
+
+        out, _ = self.run_import(path)
+
+        self.assertIn("already imported", out)
+        self.assertEqual(Recipe.objects.count(), 3)
+
+        self.run_import(path, restart=True)
+
+        self.assertEqual(Recipe.objects.count(), 6)
+
+    def test_cached_responses_invalidated(self):
+        """Test importing bumps the user's response cache version."""
+        path = self.write("recipes.csv", CSV_CONTENT)
+        version = cache.get_version(self.user.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.run_import(path)
+
+        self.assertNotEqual(cache.get_version(self.user.id), version)
@@ -0,0 +1,172 @@
+"""
+Tests for the request metrics middleware.
+"""
+
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import metrics
+from core.models import Recipe
+
+RECIPES_URL = reverse("recipe:recipe-list")
+METRICS_URL = reverse("metrics")
+
+
+def server_timing(response):
+    """Return the Server-Timing metrics of a response by name"""
+    timings = {}
+    for metric in response["Server-Timing"].split(", "):
+        name, *params = metric.split(";")
+        timings[name] = dict(param.split("=", 1) for param in params)
+    return timings
+
+
+class RegistryTests(SimpleTestCase):
+    """Test the Prometheus exposition of recorded requests."""
+
+    def test_duration_histogram_cumulative(self):
+        """Test durations fall into cumulative buckets."""
+        registry = metrics.Registry()
+        registry.record("GET", "recipe:recipe-list", 200, 0.004, 10)
+        registry.record("GET", "recipe:recipe-list", 200, 0.3, 20)
+
+        text = registry.render()
+
+        route = 'route="recipe:recipe-list"'
+        self.assertIn(
+            f'http_request_duration_seconds_bucket{{{route},le="0.005"}} 1',
+            text,
+        )
+        self.assertIn(
+            f'http_request_duration_seconds_bucket{{{route},le="0.5"}} 2',
+            text,
+        )
+        self.assertIn(
+            f'http_request_duration_seconds_bucket{{{route},le="+Inf"}} 2',
+            text,
+        )
+        self.assertIn(f"http_response_size_bytes_total{{{route}}} 30", text)
+        self.assertIn(
+            'http_requests_total{method="GET",route="recipe:recipe-list",'
+            'status="200"} 2',
+            text,
+        )
+
+
+class RequestMetricsMiddlewareTests(TestCase):
+    """Test requests are measured and reported."""
+
+    def setUp(self):
+        metrics.registry.clear()
+        self.user = get_user_model().objects.create_user(
+            email="user@example.com", password="test123"
+        )
+        Recipe.objects.create(
+            user=self.user,
+            title="Sample recipe",
+            time_minutes=10,
+            price=Decimal("5.25"),
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    @override_settings(
+        REQUEST_METRICS={"SERVER_TIMING": True},
+        RECIPE_RESPONSE_CACHE={"ENABLED": False},
+    )
+    def test_server_timing_header(self):
+        """Test sampled requests report queries and timings."""
+        res = self.client.get(RECIPES_URL)
+
+        timings = server_timing(res)
+        self.assertEqual(timings["db"]["desc"], '"3 queries"')
+        self.assertIn("serialize", timings)
+        self.assertGreater(float(timings["app"]["dur"]), 0)
+
+    def test_server_timing_off_by_default(self):
+        """Test timings are not sent to clients unless enabled."""
+        res = self.client.get(RECIPES_URL)
+
+        self.assertFalse(res.has_header("Server-Timing"))
+        self.assertIn("http_requests_total{", metrics.registry.render())
+
+    @override_settings(RECIPE_RESPONSE_CACHE={"ENABLED": False})
+    def test_metrics_endpoint(self):
+        """Test /metrics exports counters of recorded requests."""
+        self.client.get(RECIPES_URL)
+        self.user.is_staff = True
+        self.user.save()
+        self.client.force_login(self.user)
+
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res["Content-Type"].startswith("text/plain"))
+        text = res.content.decode()
+        self.assertIn(
+            'http_requests_total{method="GET",route="recipe:recipe-list",'
+            'status="200"} 1',
+            text,
+        )
+        self.assertIn(
+            'http_request_db_queries_total{route="recipe:recipe-list"} 3',
+            text,
+        )
+
+    @override_settings(
+        REQUEST_METRICS={"SAMPLE_RATE": 0, "SERVER_TIMING": True}
+    )
+    def test_unsampled_requests_not_instrumented(self):
+        """Test requests outside the sample only report their duration."""
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(list(server_timing(res)), ["app"])
+        self.assertNotIn(
+            "http_requests_sampled_total{", metrics.registry.render()
+        )
+
+    @override_settings(REQUEST_METRICS={"ENABLED": False})
+    def test_disabled(self):
+        """Test nothing is recorded when disabled."""
+        res = self.client.get(RECIPES_URL)
+
+        self.assertFalse(res.has_header("Server-Timing"))
+        self.assertEqual(metrics.registry.requests, {})
+
+    @override_settings(
+        REQUEST_METRICS={"SLOW_REQUEST_QUERIES": 1},
+        RECIPE_RESPONSE_CACHE={"ENABLED": False},
+    )
+    def test_slow_request_logged(self):
+        """Test requests over a threshold are logged with their queries."""
+        with self.assertLogs("core.middleware", "WARNING") as logs:
+            self.client.get(RECIPES_URL)
+
+        self.assertIn(f"Slow request GET {RECIPES_URL} 200", logs.output[0])
+        self.assertIn("core_recipe", logs.output[0])
+
+    def test_metrics_staff_only_without_token(self):
+        """Test only staff sessions read metrics when no token is set."""
+        self.client.force_login(self.user)
+
+        for client in (APIClient(), self.client):
+            res = client.get(METRICS_URL)
+
+            self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    @override_settings(REQUEST_METRICS={"TOKEN": "secret"})
+    def test_metrics_token_required(self):
+        """Test a configured token is needed to read metrics."""
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+        res = self.client.get(METRICS_URL, HTTP_AUTHORIZATION="Bearer secret")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
@@ -84,6 +84,20 @@ class ModelTests(TestCase):
 
         self.assertEqual(str(tag), tag.name)
 
+    def test_tag_get_or_create_many(self):
+        """Test resolving tag names creates only the missing tags"""
+        user = create_user()
+        existing = models.Tag.objects.create(name="Vegan", user=user)
+
+        tags = models.Tag.objects.get_or_create_many(
+            user, ["Vegan", "Dessert", "Vegan"]
+        )
+
+        self.assertEqual([tag.name for tag in tags], ["Vegan", "Dessert"])
+        self.assertEqual(tags[0].id, existing.id)
+        self.assertIsNotNone(tags[1].id)
+        self.assertEqual(models.Tag.objects.filter(user=user).count(), 2)
+
     def test_create_ingredient(self):
         """Test creating an ingredient is successful"""
         user = create_user()
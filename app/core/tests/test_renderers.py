@@ -0,0 +1,247 @@
+"""
+Tests for the orjson renderer and parser.
+"""
+
+import datetime
+import io
+import json
+import uuid
+from collections import OrderedDict
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils.module_loading import import_string
+from django.utils.translation import gettext_lazy
+
+from rest_framework.exceptions import ErrorDetail, ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+from core.parsers import ORJSONParser
+from core.renderers import ORJSONRenderer
+
+UTC = datetime.timezone.utc
+
+# values whose rendering must not change with the backend
+PAYLOADS = {
+    "empty": {},
+    "scalars": [0, -1, 2**63 - 1, 1.5, -0.25, True, False, None, ""],
+    "unicode": {"title": "Crème brûlée 🍮", "quote": '"\\/\n\t\x00'},
+    "line separators": "one\u2028two\u2029three",
+    "nested": {"a": [{"b": {"c": [1, [2, [3]]]}}], "d": ()},
+    "ordered": OrderedDict([("z", 1), ("a", 2)]),
+    "decimal price": {"price": Decimal("5.25")},
+    "decimal string": {"price": "999.99"},
+    "aware datetime": datetime.datetime(2021, 5, 1, 12, 30, tzinfo=UTC),
+    "offset datetime": datetime.datetime(
+        2021,
+        5,
+        1,
+        12,
+        30,
+        0,
+        15,
+        datetime.timezone(datetime.timedelta(hours=-5)),
+    ),
+    "naive datetime": datetime.datetime(2021, 5, 1, 12, 30, 0, 1),
+    "date": datetime.date(2021, 5, 1),
+    "time": datetime.time(8, 15, 30, 500),
+    "timedelta": datetime.timedelta(minutes=90),
+    "uuid": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+    "lazy string": gettext_lazy("This field is required."),
+    "error detail": {"title": [ErrorDetail("Required.", code="required")]},
+    "bytes": b"raw",
+    "generator": (n for n in range(3)),
+    "big integer": 2**70,
+    "integer keys": {1: "one", 2: "two"},
+}
+
+
+def create_recipe(user, **params):
+    """Create and return a recipe with a tag and an ingredient"""
+    defaults = {
+        "title": "Crème brûlée",
+        "time_minutes": 45,
+        "price": Decimal("0.10"),
+    }
+    defaults.update(params)
+    recipe = Recipe.objects.create(user=user, **defaults)
+    recipe.tags.add(Tag.objects.get_or_create(user=user, name="Dessert")[0])
+    recipe.ingredient.add(
+        Ingredient.objects.get_or_create(user=user, name="Sugar")[0]
+    )
+    return recipe
+
+
+class RendererCompatibilityTests(SimpleTestCase):
+    """Test ORJSONRenderer renders the same bytes as JSONRenderer."""
+
+    def assertSameRendering(self, data, *args):
+        if hasattr(data, "__next__"):
+            items = list(data)
+            data, copy = iter(items), iter(items)
+        else:
+            copy = data
+        self.assertEqual(
+            ORJSONRenderer().render(copy, *args),
+            JSONRenderer().render(data, *args),
+        )
+
+    def test_payloads(self):
+        """Test every sample payload renders identically."""
+        for name, data in PAYLOADS.items():
+            with self.subTest(name):
+                self.assertSameRendering(data)
+
+    def test_backend_choices_importable(self):
+        """Test every JSON backend names a renderer and a parser."""
+        for name, paths in settings.JSON_BACKEND_CHOICES.items():
+            with self.subTest(name):
+                renderer, parser = map(import_string, paths)
+                self.assertEqual(renderer.media_type, "application/json")
+                self.assertEqual(parser.media_type, "application/json")
+
+    def test_none_renders_empty(self):
+        """Test None renders an empty body."""
+        self.assertEqual(ORJSONRenderer().render(None), b"")
+
+    def test_indent_requested(self):
+        """Test indented output is identical."""
+        data = {"recipes": [{"id": 1, "tags": []}]}
+
+        self.assertSameRendering(data, "application/json; indent=4")
+        self.assertSameRendering(data, None, {"indent": 2})
+
+    def test_aware_time_rejected(self):
+        """Test aware times raise like JSONRenderer."""
+        value = datetime.time(8, tzinfo=UTC)
+
+        with self.assertRaises(ValueError):
+            ORJSONRenderer().render(value)
+
+    def test_unsupported_type_rejected(self):
+        """Test objects JSON cannot represent raise a TypeError."""
+        with self.assertRaises(TypeError):
+            ORJSONRenderer().render({"value": object()})
+
+    def test_exponent_floats_equal_values(self):
+        """Test floats in exponent form differ only in notation."""
+        data = [1e16, 1e-7, 5e-324]
+
+        rendered = ORJSONRenderer().render(data)
+
+        self.assertEqual(json.loads(rendered), data)
+
+
+class ResponseCompatibilityTests(TestCase):
+    """Test API responses render identically with orjson."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="user@example.com", password="test123"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_recipe_responses(self):
+        """Test recipe list, detail and error bodies are identical."""
+        recipe = create_recipe(self.user, description="Line\u2028break")
+        create_recipe(self.user, title="Tarte", price=Decimal("999.99"))
+        urls = (
+            reverse("recipe:recipe-list"),
+            reverse("recipe:recipe-detail", args=[recipe.id]),
+            reverse("recipe:tag-list"),
+            reverse("recipe:ingredient-list"),
+            reverse("user:me"),
+        )
+
+        for url in urls:
+            with self.subTest(url):
+                res = self.client.get(url)
+                self.assertEqual(
+                    ORJSONRenderer().render(res.data), res.content
+                )
+
+        res = self.client.post(reverse("recipe:recipe-list"), {})
+        self.assertEqual(ORJSONRenderer().render(res.data), res.content)
+
+    def test_price_rendered_exactly(self):
+        """Test recipe prices render as exact decimal strings."""
+        recipe = create_recipe(self.user, price=Decimal("0.10"))
+
+        res = self.client.get(
+            reverse("recipe:recipe-detail", args=[recipe.id])
+        )
+
+        self.assertIn(b'"price":"0.10"', ORJSONRenderer().render(res.data))
+
+
+class ParserCompatibilityTests(SimpleTestCase):
+    """Test ORJSONParser parses like JSONParser."""
+
+    def parse(self, parser, body, encoding="utf-8"):
+        return parser.parse(io.BytesIO(body), None, {"encoding": encoding})
+
+    def test_documents(self):
+        """Test sample documents parse to the same values."""
+        bodies = (
+            b'{"title": "Cr\xc3\xa8me", "price": 5.25, "tags": [1, 2]}',
+            b'[1, -2.5, true, false, null, "\\u2028"]',
+            b'"\\ud800"',
+            b"  {}  ",
+        )
+
+        for body in bodies:
+            with self.subTest(body):
+                self.assertEqual(
+                    self.parse(ORJSONParser(), body),
+                    self.parse(JSONParser(), body),
+                )
+
+    def test_other_encoding(self):
+        """Test bodies in a declared charset are decoded first."""
+        body = '{"title": "Crème"}'.encode("latin-1")
+
+        data = self.parse(ORJSONParser(), body, "latin-1")
+
+        self.assertEqual(data, {"title": "Crème"})
+
+    def test_large_integers_exact(self):
+        """Test integers beyond 64 bits are not parsed as floats."""
+        expected = {"ids": [2**64, -(2**63) - 1, 2**64 - 1], "phone": "1" * 19}
+        body = json.dumps(expected).encode()
+
+        for encoding in ("utf-8", "latin-1"):
+            with self.subTest(encoding):
+                data = self.parse(ORJSONParser(), body, encoding)
+
+                self.assertEqual(repr(data), repr(expected))
+
+    def test_invalid_documents_rejected(self):
+        """Test invalid JSON and NaN raise the same parse error."""
+        for body in (b'{"title": ', b"[NaN]", b"\xff"):
+            with self.subTest(body):
+                with self.assertRaises(ParseError) as expected:
+                    self.parse(JSONParser(), body)
+                with self.assertRaises(ParseError) as error:
+                    self.parse(ORJSONParser(), body)
+                self.assertEqual(str(error.exception), str(expected.exception))
+
+
+class BenchmarkRenderersTests(SimpleTestCase):
+    """Test the renderer benchmark command."""
+
+    def test_reports_each_backend(self):
+        """Test render and parse timings are reported per backend."""
+        out = io.StringIO()
+
+        call_command("benchmark_renderers", items=5, iterations=2, stdout=out)
+
+        for name in ("json render", "json parse", "orjson render"):
+            self.assertIn(f"{name}: ", out.getvalue())
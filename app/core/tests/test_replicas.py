@@ -0,0 +1,209 @@
+"""
+Tests for routing reads to replicas.
+"""
+
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.checks import check_replica_pin_cache
+from core.db import replicas
+from core.db.routers import PrimaryReplicaRouter
+from core.models import Recipe, Tag
+
+
+RECIPES_URL = reverse("recipe:recipe-list")
+TAGS_URL = reverse("recipe:tag-list")
+ME_URL = reverse("user:me")
+REPLICA = "replica_test"
+
+
+def detail_url(recipe_id):
+    """Create and return a recipe detail URL."""
+    return reverse("recipe:recipe-detail", args=[recipe_id])
+
+
+class RouterTests(SimpleTestCase):
+    """Test the router outside of requests."""
+
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+
+    def test_reads_use_primary_by_default(self):
+        """Test reads go to the primary unless a view opted in."""
+        self.assertIsNone(self.router.db_for_read(Recipe))
+
+    @override_settings(REPLICA_DATABASES=[REPLICA])
+    def test_writes_use_primary_in_replica_reads(self):
+        """Test writes go to the primary while reads use the replica."""
+        token = replicas.start_replica_reads(user_id=1)
+        try:
+            self.assertEqual(self.router.db_for_read(Recipe), REPLICA)
+            self.assertEqual(self.router.db_for_write(Recipe), "default")
+        finally:
+            replicas.stop_replica_reads(token)
+
+        self.assertIsNone(self.router.db_for_read(Recipe))
+
+    @override_settings(REPLICA_DATABASES=[REPLICA])
+    def test_replicas_not_migrated(self):
+        """Test migrations only run on the primary."""
+        self.assertTrue(self.router.allow_migrate("default", "core"))
+        self.assertFalse(self.router.allow_migrate(REPLICA, "core"))
+
+
+class ReplicaPinCacheCheckTests(SimpleTestCase):
+    """Test the system check of the pin cache."""
+
+    def test_local_cache_rejected(self):
+        """Test replicas with a pin cache private to each process fail."""
+        with override_settings(REPLICA_DATABASES=[REPLICA]):
+            errors = check_replica_pin_cache(None)
+
+        self.assertEqual([error.id for error in errors], ["core.E001"])
+
+    def test_shared_cache_accepted(self):
+        """Test a shared pin cache, or no replicas, pass."""
+        shared = {
+            "default": {
+                "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+                "LOCATION": "pin_cache",
+            }
+        }
+        for options in (
+            {"REPLICA_DATABASES": []},
+            {"REPLICA_DATABASES": [REPLICA], "CACHES": shared},
+        ):
+            with self.subTest(options), override_settings(**options):
+                self.assertEqual(check_replica_pin_cache(None), [])
+
+
+@override_settings(REPLICA_DATABASES=[REPLICA])
+class ReplicaReadTests(TransactionTestCase):
+    """Test API requests against a primary and a replica alias.
+
+    The replica alias is a second connection to the test database, so
+    committed writes are visible through it as with a caught up replica.
+    """
+
+    def setUp(self):
+        cache.clear()
+        connections.settings[REPLICA] = dict(
+            connections["default"].settings_dict
+        )
+        self.user = get_user_model().objects.create_user(
+            email="user@example.com", password="test123"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def tearDown(self):
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.settings[REPLICA]
+
+    def create_recipe(self):
+        """Create and return a sample recipe."""
+        return Recipe.objects.create(
+            user=self.user,
+            title="Sample recipe",
+            time_minutes=10,
+            price=Decimal("5.25"),
+        )
+
+    def capture(self, method, *args, **kwargs):
+        """Make a request, returning it with queries per alias"""
+        with CaptureQueriesContext(
+            connections["default"]
+        ) as primary, CaptureQueriesContext(connections[REPLICA]) as replica:
+            res = getattr(self.client, method)(*args, **kwargs)
+        return res, primary.captured_queries, replica.captured_queries
+
+    def test_safe_reads_use_replica(self):
+        """Test list and detail reads are served by the replica."""
+        recipe = self.create_recipe()
+        Tag.objects.create(user=self.user, name="Vegan")
+
+        for url in (RECIPES_URL, detail_url(recipe.id), TAGS_URL):
+            res, primary, replica = self.capture("get", url)
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(primary, [])
+            self.assertNotEqual(replica, [])
+
+    def test_writes_never_hit_replica(self):
+        """Test creating, updating and deleting only use the primary."""
+        payload = {
+            "title": "New",
+            "time_minutes": 5,
+            "price": "1.00",
+            "tags": [{"name": "Lunch"}],
+        }
+        res, primary, replica = self.capture(
+            "post", RECIPES_URL, payload, format="json"
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(replica, [])
+        recipe_id = res.data["id"]
+
+        res, primary, replica = self.capture(
+            "patch", detail_url(recipe_id), {"title": "Renamed"}
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(replica, [])
+
+        res, primary, replica = self.capture(
+            "patch",
+            reverse("recipe:recipe-bulk"),
+            [{"id": recipe_id, "title": "Bulk"}],
+            format="json",
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(replica, [])
+
+        res, primary, replica = self.capture("patch", ME_URL, {"name": "Me"})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(replica, [])
+
+        res, primary, replica = self.capture("delete", detail_url(recipe_id))
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(replica, [])
+
+    def test_reads_pinned_to_primary_after_write(self):
+        """Test a user reads from the primary within the pin window."""
+        payload = {"title": "New", "time_minutes": 5, "price": "1.00"}
+        self.client.post(RECIPES_URL, payload)
+
+        res, primary, replica = self.capture("get", RECIPES_URL)
+
+        self.assertEqual(len(res.data), 1)
+        self.assertNotEqual(primary, [])
+        self.assertEqual(replica, [])
+
+        cache.delete(replicas._pin_key(self.user.id))
+        res, primary, replica = self.capture("get", TAGS_URL)
+
+        self.assertNotEqual(replica, [])
+
+    def test_write_pins_only_the_writer(self):
+        """Test one user's write does not pin other users."""
+        other = get_user_model().objects.create_user(
+            email="other@example.com", password="test123"
+        )
+        payload = {"title": "New", "time_minutes": 5, "price": "1.00"}
+        self.client.post(RECIPES_URL, payload)
+        self.client.force_authenticate(other)
+
+        res, primary, replica = self.capture("get", RECIPES_URL)
+
+        self.assertEqual(res.data, [])
+        self.assertEqual(primary, [])
+        self.assertNotEqual(replica, [])
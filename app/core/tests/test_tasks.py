@@ -0,0 +1,190 @@
+"""
+Tests for the database task queue.
+"""
+
+import threading
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connections, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from core import tasks
+from core.models import Tag, Task
+
+
+@tasks.task
+def create_tag(user_id, name):
+    """Create a tag, as a task with an observable effect."""
+    Tag.objects.create(user_id=user_id, name=name)
+
+
+@tasks.task
+def create_tag_and_fail(user_id, name):
+    """Create a tag, then fail."""
+    Tag.objects.create(user_id=user_id, name=name)
+    raise ValueError("Task failed")
+
+
+@tasks.task(max_attempts=1)
+def fail_once():
+    """Fail without retries."""
+    raise ValueError("Task failed")
+
+
+def create_user():
+    """Create and return a user."""
+    return get_user_model().objects.create_user(
+        email="user@example.com", password="test123"
+    )
+
+
+@override_settings(TASK_QUEUE={"RETRY_DELAY": 10, "MAX_ATTEMPTS": 3})
+class TaskQueueTests(TestCase):
+    """Test queueing and running tasks."""
+
+    def setUp(self):
+        self.user = create_user()
+
+    def test_enqueue_and_run(self):
+        """Test a queued task runs once and is removed."""
+        queued = create_tag.enqueue(self.user.id, "Dinner")
+
+        self.assertEqual(queued.name, "core.tests.test_tasks.create_tag")
+        self.assertEqual(tasks.run_batch(), 1)
+        self.assertEqual(tasks.run_batch(), 0)
+        self.assertTrue(Tag.objects.filter(name="Dinner").exists())
+        self.assertFalse(Task.objects.exists())
+
+    def test_batch_size(self):
+        """Test a batch claims at most batch_size tasks, oldest first."""
+        for name in ("First", "Second", "Third"):
+            create_tag.enqueue(self.user.id, name)
+
+        self.assertEqual(tasks.run_batch(batch_size=2), 2)
+
+        self.assertEqual(
+            list(Tag.objects.order_by("id").values_list("name", flat=True)),
+            ["First", "Second"],
+        )
+
+    def test_delay(self):
+        """Test delayed tasks are not run early."""
+        create_tag.enqueue(self.user.id, "Later", delay=60)
+
+        self.assertEqual(tasks.run_batch(), 0)
+        self.assertFalse(Tag.objects.exists())
+
+    def test_failure_retried_with_backoff(self):
+        """Test failures roll back the task's work and are retried later."""
+        queued = create_tag_and_fail.enqueue(self.user.id, "Dinner")
+        create_tag.enqueue(self.user.id, "Lunch")
+
+        start = timezone.now()
+        with self.assertLogs("core.tasks", "ERROR"):
+            self.assertEqual(tasks.run_batch(), 2)
+
+        queued.refresh_from_db()
+        self.assertEqual(queued.attempts, 1)
+        self.assertFalse(queued.failed)
+        self.assertIn("ValueError: Task failed", queued.last_error)
+        self.assertGreaterEqual(
+            queued.run_after, start + timedelta(seconds=10)
+        )
+        self.assertEqual(
+            list(Tag.objects.values_list("name", flat=True)), ["Lunch"]
+        )
+
+        Task.objects.update(run_after=start)
+        with self.assertLogs("core.tasks", "ERROR"):
+            tasks.run_batch()
+
+        queued.refresh_from_db()
+        self.assertEqual(queued.attempts, 2)
+        self.assertGreaterEqual(
+            queued.run_after, start + timedelta(seconds=20)
+        )
+
+    def test_failed_after_max_attempts(self):
+        """Test a task stops being run after its last attempt."""
+        queued = fail_once.enqueue()
+
+        with self.assertLogs("core.tasks", "ERROR"):
+            tasks.run_batch()
+        Task.objects.update(run_after=timezone.now())
+
+        self.assertEqual(tasks.run_batch(), 0)
+        queued.refresh_from_db()
+        self.assertTrue(queued.failed)
+
+    def test_unknown_task(self):
+        """Test tasks that can't be imported are recorded as failures."""
+        queued = Task.objects.create(name="core.tests.test_tasks.missing")
+
+        with self.assertLogs("core.tasks", "ERROR"):
+            tasks.run_batch()
+
+        queued.refresh_from_db()
+        self.assertEqual(queued.attempts, 1)
+        self.assertIn("ImportError", queued.last_error)
+
+
+class TaskWorkerTests(TransactionTestCase):
+    """Test workers sharing the queue.
+
+    Workers use their own database connections, so tasks must be committed
+    rather than held in a test transaction.
+    """
+
+    def setUp(self):
+        self.user = create_user()
+
+    def test_locked_tasks_skipped(self):
+        """Test a task claimed by another worker is skipped, not waited on."""
+        queued = create_tag.enqueue(self.user.id, "Dinner")
+        claimed = threading.Event()
+        release = threading.Event()
+
+        def claim():
+            try:
+                with transaction.atomic():
+                    Task.objects.select_for_update().get(id=queued.id)
+                    claimed.set()
+                    release.wait(10)
+            finally:
+                connections.close_all()
+
+        worker = threading.Thread(target=claim)
+        worker.start()
+        claimed.wait(10)
+        try:
+            self.assertEqual(tasks.run_batch(), 0)
+        finally:
+            release.set()
+            worker.join()
+
+        self.assertEqual(tasks.run_batch(), 1)
+
+    def test_run_worker_command(self):
+        """Test the command drains the queue on threads and processes."""
+        for options in ({"threads": 2}, {"processes": 2}):
+            with self.subTest(options):
+                Tag.objects.all().delete()
+                for index in range(5):
+                    create_tag.enqueue(self.user.id, f"Tag {index}")
+                out = StringIO()
+
+                call_command(
+                    "run_worker",
+                    once=True,
+                    batch_size=2,
+                    stdout=out,
+                    **options,
+                )
+
+                self.assertIn("Ran 5 tasks", out.getvalue())
+                self.assertEqual(Tag.objects.count(), 5)
+                self.assertFalse(Task.objects.exists())
@@ -0,0 +1,51 @@
+"""
+Views for core APIs.
+"""
+
+import hmac
+
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from django.views.decorators.http import require_GET
+
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core import metrics
+from core.db.backends.postgresql.base import pool_status
+
+
+class DatabaseStatsView(APIView):
+    """Connection acquire statistics of this process, for staff"""
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        """Return statistics per database alias"""
+        stats = {}
+        for alias in connections:
+            connection = connections[alias]
+            if not hasattr(connection, "stats"):
+                continue
+            stats[alias] = connection.stats.snapshot()
+            if connection.pool_options["ENABLED"]:
+                stats[alias]["pool"] = pool_status(alias)
+        return Response(stats)
+
+
+@require_GET
+def metrics_view(request):
+    """Return request metrics of this process for Prometheus"""
+    token = metrics.get_options()["TOKEN"]
+    if token:
+        sent = request.META.get("HTTP_AUTHORIZATION", "")
+        if not hmac.compare_digest(sent.encode(), f"Bearer {token}".encode()):
+            return HttpResponseForbidden()
+    elif not request.user.is_staff:
+        # without a token for scrapers, only staff sessions read metrics
+        return HttpResponseForbidden()
+    return HttpResponse(
+        metrics.registry.render(),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
@@ -0,0 +1,81 @@
+"""
+Asynchronous read views for recipe APIs.
+
+Django 3.2 has no async ORM, so the synchronous viewsets run on a bounded
+thread pool. Under an ASGI server a slow client then holds a coroutine
+instead of a worker thread, and only the database and serialization work
+occupies one of the pool's threads.
+"""
+
+import asyncio
+import functools
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import JsonResponse
+
+from core.executors import BoundedExecutor, ExecutorBusy
+from recipe import views
+
+DEFAULT_ASYNC_READS = {
+    "MAX_WORKERS": 8,
+    "MAX_PENDING": 256,
+}
+
+
+def get_options():
+    """Return the configured options merged with the defaults"""
+    options = dict(DEFAULT_ASYNC_READS)
+    options.update(getattr(settings, "RECIPE_ASYNC_READS", {}))
+    return options
+
+
+executor = BoundedExecutor("recipe-read", get_options)
+
+
+def shutdown():
+    """Stop the read pool, a new one is created on the next request"""
+    executor.shutdown()
+
+
+def _run_view(view, request, args, kwargs):
+    """Run a view and render its response on a pool thread"""
+    # pool threads never see request_started/finished, so connections are
+    # recycled here the way Django does for request threads
+    close_old_connections()
+    try:
+        response = view(request, *args, **kwargs)
+        if hasattr(response, "render"):
+            response.render()
+        return response
+    finally:
+        close_old_connections()
+
+
+def async_read_view(view):
+    """Return an async view running a synchronous view on the read pool"""
+
+    async def wrapper(request, *args, **kwargs):
+        try:
+            future = executor.submit(_run_view, view, request, args, kwargs)
+        except ExecutorBusy:
+            return JsonResponse(
+                {"detail": "Server busy, try again later."},
+                status=503,
+                headers={"Retry-After": "1"},
+            )
+        return await asyncio.wrap_future(future)
+
+    functools.update_wrapper(wrapper, view)
+    return wrapper
+
+
+recipe_list = async_read_view(
+    views.RecipeViewSet.as_view({"get": "list"}, detail=False)
+)
+recipe_detail = async_read_view(
+    views.RecipeViewSet.as_view({"get": "retrieve"}, detail=True)
+)
+tag_list = async_read_view(
+    views.TagViewSet.as_view({"get": "list"}, detail=False)
+)
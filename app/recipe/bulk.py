@@ -0,0 +1,184 @@
+"""
+Set based persistence for batches of recipes.
+"""
+
+from collections import Counter
+
+from django.db import transaction
+
+from core.models import Ingredient, Recipe, Tag
+from recipe import stats
+from recipe.cache import bump_version
+
+BATCH_SIZE = 1000
+
+# validated data key, related model, through model and its column
+RELATIONS = (
+    ("tags", Tag, Recipe.tags.through, "tag_id"),
+    ("ingredient", Ingredient, Recipe.ingredient.through, "ingredient_id"),
+)
+RELATION_KEYS = {key for key, *_ in RELATIONS}
+
+
+def _resolve_names(user, model, key, items):
+    """Return a name to object mapping for all names used by the items"""
+    names = [
+        named["name"]
+        for item in items
+        if item.get(key) is not None
+        for named in item[key]
+    ]
+    return {
+        obj.name: obj for obj in model.objects.get_or_create_many(user, names)
+    }
+
+
+def _resolve_relations(user, items):
+    """Return name to object mappings keyed by relation"""
+    return {
+        key: _resolve_names(user, model, key, items)
+        for key, model, *_ in RELATIONS
+    }
+
+
+def _related_ids(item, key, by_name):
+    """Return the distinct related ids requested by an item"""
+    return {by_name[named["name"]].id for named in item[key]}
+
+
+def create_recipes(user, items):
+    """Create recipes with their relations and return them in input order"""
+    items = [dict(item) for item in items]
+    if not items:
+        return []
+
+    with transaction.atomic():
+        resolved = _resolve_relations(user, items)
+        recipes = [
+            Recipe(
+                user=user,
+                **{k: v for k, v in item.items() if k not in RELATION_KEYS},
+            )
+            for item in items
+        ]
+        for recipe in recipes:
+            recipe.search_vector = recipe.get_search_vector()
+        Recipe.objects.bulk_create(recipes, batch_size=BATCH_SIZE)
+
+        for key, model, through, column in RELATIONS:
+            rows = [
+                through(recipe_id=recipe.id, **{column: related_id})
+                for recipe, item in zip(recipes, items)
+                if item.get(key)
+                for related_id in _related_ids(item, key, resolved[key])
+            ]
+            if rows:
+                through.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+                stats.change_usage(
+                    model, Counter(getattr(row, column) for row in rows)
+                )
+
+        # bulk writes send no model signals, so statistics and the cached
+        # responses are updated here
+        stats.apply_changes(
+            user.id,
+            [(recipe.time_minutes, recipe.price, 1) for recipe in recipes],
+        )
+
+    bump_version(user.id)
+    return recipes
+
+
+def update_recipes(user, updates):
+    """Apply (recipe, validated_data) pairs and return the recipes"""
+    if not updates:
+        return []
+
+    with transaction.atomic():
+        resolved = _resolve_relations(user, [data for _, data in updates])
+
+        fields = set()
+        wanted = {key: {} for key in RELATION_KEYS}
+        changes = []
+        for recipe, data in updates:
+            old = (recipe.time_minutes, recipe.price)
+            for attr, value in data.items():
+                if attr in RELATION_KEYS:
+                    wanted[attr][recipe.id] = _related_ids(
+                        data, attr, resolved[attr]
+                    )
+                else:
+                    setattr(recipe, attr, value)
+                    fields.add(attr)
+            new = (recipe.time_minutes, recipe.price)
+            if new != old:
+                changes += [old + (-1,), new + (1,)]
+
+        recipes = [recipe for recipe, _ in updates]
+        if fields & {"title", "description"}:
+            for recipe in recipes:
+                recipe.search_vector = recipe.get_search_vector()
+            fields.add("search_vector")
+        if fields:
+            Recipe.objects.bulk_update(
+                recipes, sorted(fields), batch_size=BATCH_SIZE
+            )
+
+        for key, model, through, column in RELATIONS:
+            if wanted[key]:
+                stats.change_usage(
+                    model, _set_related(through, column, wanted[key])
+                )
+        stats.apply_changes(user.id, changes)
+
+    bump_version(user.id)
+    return recipes
+
+
+def _set_related(through, column, wanted):
+    """Write only the through rows that differ from the wanted ids.
+
+    Returns the change in the number of recipes linked to each related id.
+    """
+    current = through.objects.filter(recipe_id__in=wanted).values_list(
+        "id", "recipe_id", column
+    )
+
+    usage = Counter()
+    stale_ids = []
+    existing = set()
+    for row_id, recipe_id, related_id in current:
+        if related_id in wanted[recipe_id]:
+            existing.add((recipe_id, related_id))
+        else:
+            stale_ids.append(row_id)
+            usage[related_id] -= 1
+
+    if stale_ids:
+        through.objects.filter(id__in=stale_ids).delete()
+    rows = [
+        through(recipe_id=recipe_id, **{column: related_id})
+        for recipe_id, related_ids in wanted.items()
+        for related_id in related_ids
+        if (recipe_id, related_id) not in existing
+    ]
+    through.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+    usage.update(getattr(row, column) for row in rows)
+    return usage
+
+
+def delete_recipes(user, ids):
+    """Delete the user's recipes with the given ids and return those ids"""
+    recipes = Recipe.objects.filter(user=user, id__in=ids)
+    with transaction.atomic():
+        # locked, so concurrent deletes take a recipe out of the rollups once
+        deleted = list(
+            recipes.select_for_update().values_list("id", flat=True)
+        )
+        # rows are deleted without loading them or sending signals, so
+        # statistics and the cached responses are updated here
+        stats.remove_recipes(user.id, deleted)
+        Recipe.objects.delete_rows(deleted)
+
+    bump_version(user.id)
+    return set(deleted)
@@ -0,0 +1,118 @@
+"""
+Per user response caching for recipe APIs.
+
+Cached responses are keyed by user and a per user version number. Any
+write to a user's recipes, tags or ingredients bumps the version, so
+stale entries are never read again and simply expire.
+"""
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import parse_etags
+
+from rest_framework import status
+from rest_framework.response import Response
+
+DEFAULT_RESPONSE_CACHE = {
+    "ENABLED": True,
+    "CACHE_ALIAS": "default",
+    "TIMEOUT": 300,
+}
+
+
+def get_options():
+    """Return the configured options merged with the defaults"""
+    options = dict(DEFAULT_RESPONSE_CACHE)
+    options.update(getattr(settings, "RECIPE_RESPONSE_CACHE", {}))
+    return options
+
+
+def _cache():
+    """Return the Django cache holding responses and versions"""
+    return caches[get_options()["CACHE_ALIAS"]]
+
+
+def _version_key(user_id):
+    """Return the cache key of a user's version counter"""
+    return f"recipe:version:{user_id}"
+
+
+def _initial_version():
+    """Return a starting version for a user without a counter"""
+    # never reuse a number that may still label cached responses after the
+    # counter itself was evicted
+    return time.time_ns() // 1000
+
+
+def get_version(user_id):
+    """Return the current data version of a user"""
+    cache = _cache()
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(user_id):
+    """Invalidate all cached responses of a user"""
+    cache = _cache()
+    key = _version_key(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, _initial_version(), None)
+
+
+def _response_tag(user_id, path):
+    """Return an identifier of the current response for a user and path"""
+    digest = hashlib.sha1(path.encode()).hexdigest()
+    return f"{user_id}-{get_version(user_id)}-{digest}"
+
+
+class CachedResponseMixin:
+    """Cache list and retrieve responses of a viewset per user.
+
+    Responses carry an ETag derived from the cache key, so clients sending
+    it back in If-None-Match get a 304 without any serialization.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self._cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def _cached_response(self, handler, request, *args, **kwargs):
+        """Return a cached response or store the one from handler"""
+        options = get_options()
+        if not options["ENABLED"]:
+            return handler(request, *args, **kwargs)
+
+        tag = _response_tag(request.user.id, request.get_full_path())
+        etag = f'"{tag}"'
+
+        if etag in parse_etags(request.META.get("HTTP_IF_NONE_MATCH", "")):
+            return Response(
+                status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag}
+            )
+
+        cache = _cache()
+        key = f"recipe:response:{tag}"
+        data = cache.get(key)
+        if data is not None:
+            response = Response(data)
+        else:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            cache.set(key, response.data, options["TIMEOUT"])
+
+        response["ETag"] = etag
+        return response
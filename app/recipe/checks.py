@@ -0,0 +1,28 @@
+"""
+System checks of the recipe settings.
+"""
+
+from django.core import checks
+
+from core.checks import is_process_local
+from recipe import cache
+
+
+@checks.register(checks.Tags.caches)
+def check_response_cache(app_configs, **kwargs):
+    """Warn when cached responses are only invalidated in one process"""
+    options = cache.get_options()
+    if not options["ENABLED"] or not is_process_local(options["CACHE_ALIAS"]):
+        return []
+    return [
+        checks.Warning(
+            "The recipe response cache uses a cache private to each "
+            "process, so a write only invalidates the responses of the "
+            "process handling it.",
+            hint=(
+                "Set CACHE_BACKEND to a shared cache, or RECIPE_RESPONSE_CACHE"
+                "=0, unless the app runs in a single process."
+            ),
+            id="recipe.W001",
+        )
+    ]
@@ -0,0 +1,62 @@
+"""
+Streaming export of a user's recipe library as NDJSON.
+
+Recipes are read through a server side cursor and serialized one chunk at
+a time, with the tags and ingredients of each chunk fetched in one query
+per relation. Memory use depends on the chunk size, not the library size.
+"""
+
+from django.db.models import Prefetch, prefetch_related_objects
+
+from rest_framework.settings import api_settings
+
+from core.models import Ingredient, Recipe, Tag
+from recipe.serializers import RecipeDetailSerializer
+
+CONTENT_TYPE = "application/x-ndjson"
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def user_recipes(user):
+    """Return the queryset of a user's recipes to export"""
+    return (
+        Recipe.objects.filter(user=user)
+        .defer("search_vector")
+        .select_related("image")
+        .order_by("-id")
+    )
+
+
+def export_recipes(queryset, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Return an iterator of NDJSON lines, one per recipe.
+
+    The database is chosen now, so a streamed response keeps reading from
+    the alias the view was routed to after the view has returned.
+    """
+    using = queryset.db
+    return _iter_lines(queryset.using(using), chunk_size, using)
+
+
+def _iter_lines(queryset, chunk_size, using):
+    """Yield NDJSON lines for the queryset, a chunk at a time"""
+    # the API's JSON renderer, so lines match its responses byte for byte
+    renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+    chunk = []
+    for recipe in queryset.iterator(chunk_size=chunk_size):
+        chunk.append(recipe)
+        if len(chunk) == chunk_size:
+            yield from _render_chunk(renderer, chunk, using)
+            chunk = []
+    if chunk:
+        yield from _render_chunk(renderer, chunk, using)
+
+
+def _render_chunk(renderer, recipes, using):
+    """Fetch the relations of a chunk and yield its lines"""
+    prefetch_related_objects(
+        recipes,
+        Prefetch("tags", queryset=Tag.objects.using(using)),
+        Prefetch("ingredient", queryset=Ingredient.objects.using(using)),
+    )
+    for item in RecipeDetailSerializer(recipes, many=True).data:
+        yield renderer.render(item) + b"\n"
@@ -0,0 +1,146 @@
+"""
+Storage and thumbnails of uploaded recipe images.
+
+Uploads are streamed to a temporary file and hashed as the chunks arrive,
+so no upload is held in memory. Files are stored under their SHA-256, and
+an image uploaded again, to any recipe, reuses the stored file. Thumbnails
+are generated by a task queued with the upload, and listings read them as
+plain columns.
+"""
+
+import hashlib
+import io
+import logging
+from functools import partial
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from core import tasks
+from core.models import Recipe, RecipeImage
+from recipe.cache import bump_version
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RECIPE_IMAGES = {
+    "MAX_BYTES": 10 * 1024 * 1024,
+    "THUMBNAIL_SIZE": 320,
+}
+# stored formats and their file extensions
+FORMATS = {
+    "JPEG": "jpg",
+    "MPO": "jpg",
+    "PNG": "png",
+    "GIF": "gif",
+    "WEBP": "webp",
+}
+THUMBNAIL_QUALITY = 85
+
+
+def get_options():
+    """Return the configured options merged with the defaults"""
+    options = dict(DEFAULT_RECIPE_IMAGES)
+    options.update(getattr(settings, "RECIPE_IMAGES", {}))
+    return options
+
+
+class HashingUploadHandler(TemporaryFileUploadHandler):
+    """Stream uploads to temporary files, hashing them on the way"""
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.sha256 = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.sha256.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        upload = super().file_complete(file_size)
+        upload.sha256 = self.sha256.hexdigest()
+        return upload
+
+
+def _digest(upload):
+    """Return the SHA-256 of an upload, hashed while received if possible"""
+    digest = getattr(upload, "sha256", None)
+    if digest is None:
+        sha256 = hashlib.sha256()
+        for chunk in upload.chunks():
+            sha256.update(chunk)
+        digest = sha256.hexdigest()
+    return digest
+
+
+def _path(digest, suffix):
+    """Return the storage path of a file named by a content hash"""
+    return f"recipes/{digest[:2]}/{digest}{suffix}"
+
+
+def store_image(upload):
+    """Return the stored image with the content of a validated upload"""
+    digest = _digest(upload)
+    image = RecipeImage.objects.filter(sha256=digest).first()
+    if image is not None:
+        return image
+
+    name = _path(digest, f".{FORMATS[upload.image.format]}")
+    # the file may remain from an upload whose transaction rolled back
+    if not default_storage.exists(name):
+        name = default_storage.save(name, upload)
+    width, height = upload.image.size
+    # uploads of the same content racing each other share one row
+    RecipeImage.objects.bulk_create(
+        [RecipeImage(sha256=digest, image=name, width=width, height=height)],
+        ignore_conflicts=True,
+    )
+    return RecipeImage.objects.get(sha256=digest)
+
+
+def schedule_thumbnail(image):
+    """Queue the thumbnail of an image lacking one"""
+    if not image.thumbnail:
+        generate_thumbnail.enqueue(image.id)
+
+
+@tasks.task
+def generate_thumbnail(image_id):
+    """Write the missing thumbnail of an image, returning whether it did"""
+    image = RecipeImage.objects.filter(id=image_id, thumbnail="").first()
+    if image is None:
+        return False
+
+    size = get_options()["THUMBNAIL_SIZE"]
+    output = io.BytesIO()
+    with image.image.open("rb") as source, Image.open(source) as picture:
+        # JPEGs are decoded at a reduced scale close to the thumbnail
+        picture.draft("RGB", (size, size))
+        picture = ImageOps.exif_transpose(picture)
+        picture.thumbnail((size, size))
+        if picture.mode != "RGB":
+            picture = picture.convert("RGB")
+        picture.save(output, "JPEG", quality=THUMBNAIL_QUALITY, optimize=True)
+    name = default_storage.save(
+        _path(image.sha256, f"-{size}.jpg"), ContentFile(output.getvalue())
+    )
+
+    if not RecipeImage.objects.filter(id=image_id, thumbnail="").update(
+        thumbnail=name
+    ):
+        # generated concurrently, the other thumbnail is kept
+        default_storage.delete(name)
+        return False
+    user_ids = (
+        Recipe.objects.filter(image_id=image_id)
+        .values_list("user_id", flat=True)
+        .distinct()
+    )
+    # tasks run in their batch's transaction, bumped before it commits a
+    # read could cache the recipes without the thumbnail
+    for user_id in user_ids:
+        transaction.on_commit(partial(bump_version, user_id))
+    return True
@@ -0,0 +1,113 @@
+"""
+Django command to benchmark serializing recipe list pages
+"""
+
+import statistics
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from rest_framework.renderers import JSONRenderer
+
+from core.models import Ingredient, Recipe, Tag
+from recipe import bulk
+from recipe.serializers import RecipeSerializer, value_fields
+
+BENCHMARK_EMAIL = "benchmark-list-serializer@example.com"
+
+
+class Command(BaseCommand):
+    """Django command comparing instance and row list serialization"""
+
+    help = (
+        "Build recipe list pages from prefetched model instances and from "
+        "rows, check both render the same JSON and report items/sec."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--page-size", type=int, default=1000)
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Keep the synthetic recipes for later runs.",
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        user, _ = get_user_model().objects.get_or_create(email=BENCHMARK_EMAIL)
+        self.seed(user, options["page_size"])
+        queryset = Recipe.objects.filter(user=user).order_by("-id")
+        page_size = options["page_size"]
+        renderer = JSONRenderer()
+
+        def instances():
+            recipes = queryset.defer(
+                "description", "search_vector"
+            ).prefetch_related("tags", "ingredient")[:page_size]
+            return renderer.render(RecipeSerializer(recipes, many=True).data)
+
+        def rows():
+            values = queryset.values(*value_fields(RecipeSerializer()))
+            return renderer.render(
+                RecipeSerializer(values[:page_size], many=True).data
+            )
+
+        try:
+            if instances() != rows():
+                raise CommandError("Row and instance JSON differ")
+            for name, build in (("instances", instances), ("rows", rows)):
+                timings = []
+                for _ in range(options["iterations"]):
+                    start = time.perf_counter()
+                    build()
+                    timings.append((time.perf_counter() - start) * 1000)
+                self.report(name, timings, page_size)
+        finally:
+            if not options["keep"]:
+                self.stdout.write("Removing synthetic recipes.....")
+                Recipe.objects.filter(user=user).delete()
+                Tag.objects.filter(user=user).delete()
+                Ingredient.objects.filter(user=user).delete()
+                user.delete()
+
+    def seed(self, user, count):
+        """Create synthetic recipes until the user has the given number"""
+        missing = count - Recipe.objects.filter(user=user).count()
+        if missing <= 0:
+            return
+        self.stdout.write(f"Seeding {missing} recipes.....")
+        bulk.create_recipes(
+            user,
+            [
+                {
+                    "title": f"Recipe {index}",
+                    "time_minutes": 10 + index % 50,
+                    "price": Decimal(index % 1000) / 10,
+                    "link": f"https://example.com/{index}",
+                    "tags": [
+                        {"name": f"Tag {(index + n) % 20}"} for n in range(3)
+                    ],
+                    "ingredient": [
+                        {"name": f"Ingredient {(index + n) % 50}"}
+                        for n in range(3)
+                    ],
+                }
+                for index in range(missing)
+            ],
+        )
+
+    def report(self, name, timings, page_size):
+        """Write throughput and latency statistics"""
+        timings.sort()
+        p50 = statistics.median(timings)
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{name}: {page_size / p50 * 1000:.0f} items/s, "
+                f"p50 {p50:.2f} ms, p95 {p95:.2f} ms per "
+                f"{page_size} item page"
+            )
+        )
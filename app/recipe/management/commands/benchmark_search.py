@@ -0,0 +1,131 @@
+"""
+Django command to benchmark recipe search against substring scans
+"""
+
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.contrib.postgres.search import SearchVector
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import F, Q
+
+from core.models import Recipe
+
+WORDS = (
+    "apple banana basil bean beef bread broccoli butter cabbage carrot "
+    "cheese cherry chicken chili chocolate cinnamon coconut cod corn cream "
+    "cucumber curry egg fennel garlic ginger grape ham honey kale lamb "
+    "leek lemon lentil lime mango maple milk mint mushroom noodle oat "
+    "olive onion orange pasta peach peanut pear pea pepper pork potato "
+    "prawn pumpkin radish rice salmon sausage sesame shrimp spinach squash "
+    "steak strawberry sugar tofu tomato tuna turkey vanilla walnut yogurt "
+    "baked braised creamy crispy fried grilled roasted smoky spicy stewed"
+).split()
+BENCHMARK_EMAIL = "benchmark-search@example.com"
+BATCH_SIZE = 10000
+
+
+class Command(BaseCommand):
+    """Django command to benchmark ranked search against icontains"""
+
+    help = "Compare ranked full text search with icontains scans."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1000000)
+        parser.add_argument("--queries", type=int, default=20)
+        parser.add_argument("--limit", type=int, default=20)
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Keep the synthetic recipes for later runs.",
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        rng = random.Random(0)
+        user, _ = get_user_model().objects.get_or_create(email=BENCHMARK_EMAIL)
+        self.seed(user, options["rows"], rng)
+
+        terms = [rng.choice(WORDS) for _ in range(options["queries"])]
+        recipes = Recipe.objects.filter(user=user)
+        limit = options["limit"]
+
+        def ranked(term):
+            query = SearchQuery(term, config=Recipe.SEARCH_CONFIG)
+            return list(
+                recipes.filter(search_vector=query)
+                .annotate(rank=SearchRank(F("search_vector"), query))
+                .order_by("-rank", "-id")
+                .values_list("id", flat=True)[:limit]
+            )
+
+        def icontains(term):
+            return list(
+                recipes.filter(
+                    Q(title__icontains=term) | Q(description__icontains=term)
+                )
+                .order_by("-id")
+                .values_list("id", flat=True)[:limit]
+            )
+
+        for name, search in (("ranked", ranked), ("icontains", icontains)):
+            timings = []
+            for term in terms:
+                start = time.perf_counter()
+                search(term)
+                timings.append((time.perf_counter() - start) * 1000)
+            self.report(name, timings)
+
+        if not options["keep"]:
+            self.stdout.write("Removing synthetic recipes.....")
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"DELETE FROM {Recipe._meta.db_table} WHERE user_id = %s",
+                    [user.id],
+                )
+            user.delete()
+
+    def seed(self, user, rows, rng):
+        """Create synthetic recipes until the user has the given number"""
+        existing = Recipe.objects.filter(user=user).count()
+        self.stdout.write(f"Seeding {max(rows - existing, 0)} recipes.....")
+        for start in range(existing, rows, BATCH_SIZE):
+            Recipe.objects.bulk_create(
+                Recipe(
+                    user=user,
+                    title=" ".join(rng.choices(WORDS, k=3)),
+                    description=" ".join(rng.choices(WORDS, k=12)),
+                    time_minutes=rng.randint(5, 180),
+                    price=Decimal(rng.randint(100, 9999)) / 100,
+                )
+                for _ in range(min(BATCH_SIZE, rows - start))
+            )
+
+        # set based, as computing vectors in the inserts is much slower
+        Recipe.objects.filter(user=user, search_vector=None).update(
+            search_vector=SearchVector(
+                "title", weight="A", config=Recipe.SEARCH_CONFIG
+            )
+            + SearchVector(
+                "description", weight="B", config=Recipe.SEARCH_CONFIG
+            )
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {Recipe._meta.db_table}")
+
+    def report(self, name, timings):
+        """Write latency statistics in milliseconds"""
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{name}: mean {statistics.mean(timings):.2f} ms, "
+                f"p50 {statistics.median(timings):.2f} ms, "
+                f"p95 {p95:.2f} ms"
+            )
+        )
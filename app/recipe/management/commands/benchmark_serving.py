@@ -0,0 +1,288 @@
+"""
+Django command to load test recipe reads under WSGI and ASGI servers
+"""
+
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+
+from core.models import Recipe, Tag
+from recipe import bulk
+
+BENCHMARK_EMAIL = "benchmark-serving@example.com"
+HOST = "127.0.0.1"
+
+# the same recipes are read in both modes, through the view for each mode
+MODES = {
+    "wsgi": "recipe:recipe-list",
+    "asgi": "recipe:async-recipe-list",
+}
+
+
+def _free_port():
+    """Return a TCP port nobody is listening on"""
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+async def _read_response(reader):
+    """Read one HTTP/1.1 response, returning (status, keep_alive)"""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("Connection closed by server")
+    status = int(status_line.split()[1])
+
+    length = None
+    keep_alive = True
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        name = name.strip().lower()
+        if name == "content-length":
+            length = int(value)
+        elif name == "connection" and value.strip().lower() == "close":
+            keep_alive = False
+
+    if length is None:
+        await reader.read()
+        keep_alive = False
+    else:
+        await reader.readexactly(length)
+    return status, keep_alive
+
+
+async def _client(port, head, deadline, delay, latencies, errors):
+    """Send requests over one keep-alive connection until the deadline"""
+    # slow clients send the request line, then the rest after a delay
+    split = head.index(b"\r\n") + 2
+    connection = None
+    while time.perf_counter() < deadline:
+        try:
+            if connection is None:
+                connection = await asyncio.open_connection(HOST, port)
+            reader, writer = connection
+            writer.write(head[:split])
+            if delay:
+                await writer.drain()
+                await asyncio.sleep(delay)
+            writer.write(head[split:])
+            await writer.drain()
+            start = time.perf_counter()
+            status, keep_alive = await _read_response(reader)
+        except (OSError, ConnectionError, asyncio.IncompleteReadError):
+            errors.append(None)
+            connection = None
+            continue
+
+        if status == 200:
+            latencies.append((time.perf_counter() - start) * 1000)
+        else:
+            errors.append(status)
+        if not keep_alive:
+            writer.close()
+            connection = None
+
+    if connection is not None:
+        connection[1].close()
+
+
+class Command(BaseCommand):
+    """Django command comparing WSGI and ASGI serving of recipe reads"""
+
+    help = (
+        "Start gunicorn and uvicorn against the configured database and "
+        "compare requests/sec and latency of recipe list reads."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--modes",
+            nargs="+",
+            choices=sorted(MODES),
+            default=["wsgi", "asgi"],
+        )
+        parser.add_argument("--recipes", type=int, default=100)
+        parser.add_argument("--concurrency", type=int, default=100)
+        parser.add_argument("--duration", type=float, default=10.0)
+        parser.add_argument(
+            "--client-delay",
+            type=float,
+            default=0.05,
+            help="Seconds a client pauses while sending each request.",
+        )
+        parser.add_argument("--workers", type=int, default=2)
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=4,
+            help="gunicorn threads and async read pool size per worker.",
+        )
+        parser.add_argument(
+            "--cache",
+            action="store_true",
+            help="Keep the response cache enabled in the servers.",
+        )
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Keep the synthetic user and recipes for later runs.",
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        user, _ = get_user_model().objects.get_or_create(email=BENCHMARK_EMAIL)
+        token, _ = Token.objects.get_or_create(user=user)
+        self.seed(user, options["recipes"])
+
+        try:
+            for mode in options["modes"]:
+                self.run_mode(mode, token.key, options)
+        finally:
+            if not options["keep"]:
+                self.stdout.write("Removing synthetic recipes.....")
+                Recipe.objects.filter(user=user).delete()
+                Tag.objects.filter(user=user).delete()
+                user.delete()
+
+    def seed(self, user, count):
+        """Create synthetic recipes until the user has the given number"""
+        missing = count - Recipe.objects.filter(user=user).count()
+        if missing <= 0:
+            return
+        self.stdout.write(f"Seeding {missing} recipes.....")
+        bulk.create_recipes(
+            user,
+            [
+                {
+                    "title": f"Recipe {index}",
+                    "time_minutes": 10 + index % 50,
+                    "price": Decimal("5.25"),
+                    "tags": [{"name": f"Tag {index % 10}"}],
+                }
+                for index in range(missing)
+            ],
+        )
+
+    def server_command(self, mode, port, options):
+        """Return the command line starting a server for the mode"""
+        if mode == "wsgi":
+            return [
+                sys.executable,
+                "-m",
+                "gunicorn",
+                "app.wsgi:application",
+                "--bind",
+                f"{HOST}:{port}",
+                "--workers",
+                str(options["workers"]),
+                "--threads",
+                str(options["threads"]),
+            ]
+        return [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.asgi:application",
+            "--host",
+            HOST,
+            "--port",
+            str(port),
+            "--workers",
+            str(options["workers"]),
+        ]
+
+    def start_server(self, mode, options):
+        """Start a server and wait until it accepts connections"""
+        port = _free_port()
+        env = dict(os.environ)
+        env["RECIPE_ASYNC_READ_WORKERS"] = str(options["threads"])
+        env["RECIPE_RESPONSE_CACHE"] = "1" if options["cache"] else "0"
+        process = subprocess.Popen(
+            self.server_command(mode, port, options),
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError(
+                    f"{mode} server exited with {process.returncode}, is "
+                    f"{'gunicorn' if mode == 'wsgi' else 'uvicorn'} installed?"
+                )
+            try:
+                socket.create_connection((HOST, port), timeout=1).close()
+                return process, port
+            except OSError:
+                time.sleep(0.2)
+        process.terminate()
+        raise CommandError(f"{mode} server did not start")
+
+    def run_mode(self, mode, token, options):
+        """Load test one server mode and report the results"""
+        process, port = self.start_server(mode, options)
+        try:
+            head = (
+                f"GET {reverse(MODES[mode])} HTTP/1.1\r\n"
+                f"Host: {HOST}:{port}\r\n"
+                f"Authorization: Token {token}\r\n"
+                "\r\n"
+            ).encode()
+            # a short run first warms up imports and connections
+            asyncio.run(self.load(port, head, options["workers"], 1, 0))
+            latencies, errors = asyncio.run(
+                self.load(
+                    port,
+                    head,
+                    options["concurrency"],
+                    options["duration"],
+                    options["client_delay"],
+                )
+            )
+        finally:
+            process.terminate()
+            process.wait()
+
+        self.report(mode, latencies, errors, options["duration"])
+
+    async def load(self, port, head, concurrency, duration, delay):
+        """Run concurrent clients for the duration"""
+        latencies = []
+        errors = []
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(
+            *(
+                _client(port, head, deadline, delay, latencies, errors)
+                for _ in range(concurrency)
+            )
+        )
+        return latencies, errors
+
+    def report(self, mode, latencies, errors, duration):
+        """Write throughput and latency statistics"""
+        if not latencies:
+            raise CommandError(f"{mode}: no successful requests")
+        latencies.sort()
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{mode}: {len(latencies) / duration:.1f} req/s, "
+                f"p50 {statistics.median(latencies):.2f} ms, "
+                f"p99 {p99:.2f} ms, {len(errors)} errors"
+            )
+        )
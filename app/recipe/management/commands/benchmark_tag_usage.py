@@ -0,0 +1,162 @@
+"""
+Django command to benchmark tag listings with usage counts
+"""
+
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+from recipe import stats
+
+BENCHMARK_EMAIL = "benchmark-tag-usage@example.com"
+TAGS_URL = reverse("recipe:tag-list")
+
+
+class Command(BaseCommand):
+    """Django command timing tag listings of a user with many tags"""
+
+    help = (
+        "Seed a user owning many tags used by many recipes, then time tag "
+        "listings by name and by usage, assigned only listings and the "
+        "equivalent query counting recipes per tag on the fly."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tags", type=int, default=10000)
+        parser.add_argument("--recipes", type=int, default=10000)
+        parser.add_argument("--tags-per-recipe", type=int, default=5)
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Keep the synthetic data for later runs.",
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        user, _ = get_user_model().objects.get_or_create(email=BENCHMARK_EMAIL)
+        self.seed(user, options)
+        client = APIClient()
+        client.force_authenticate(user)
+        tags = Tag.objects.filter(user=user)
+
+        def annotated():
+            return list(
+                tags.annotate(count=Count("recipe"))
+                .order_by("-count", "-name")
+                .values("id", "name", "count")
+            )
+
+        def counter():
+            return list(
+                tags.order_by("-recipe_count", "-name").values(
+                    "id", "name", "recipe_count"
+                )
+            )
+
+        cases = [
+            ("query counting recipes", annotated),
+            ("query reading counters", counter),
+        ] + [
+            (
+                f"GET tags {params or 'by name'}",
+                lambda params=params: client.get(TAGS_URL, params),
+            )
+            for params in (
+                {},
+                {"ordering": "-recipe_count"},
+                {"assigned_only": 1},
+                {"ordering": "-recipe_count", "page_size": 20},
+            )
+        ]
+        try:
+            with override_settings(
+                ALLOWED_HOSTS=["testserver"],
+                DEBUG=False,
+                RECIPE_RESPONSE_CACHE={"ENABLED": False},
+            ):
+                for name, work in cases:
+                    work()
+                    timings = []
+                    for _ in range(options["iterations"]):
+                        start = time.perf_counter()
+                        work()
+                        timings.append((time.perf_counter() - start) * 1000)
+                    self.report(name, sorted(timings))
+        finally:
+            if not options["keep"]:
+                self.stdout.write("Removing synthetic data.....")
+                Recipe.objects.filter(user=user).delete()
+                tags.delete()
+                user.delete()
+
+    def seed(self, user, options):
+        """Create the synthetic tags and recipes unless they exist"""
+        tags = Tag.objects.filter(user=user)
+        recipes = Recipe.objects.filter(user=user)
+        if (
+            tags.count() == options["tags"]
+            and recipes.count() == options["recipes"]
+        ):
+            return
+        self.stdout.write(
+            f"Seeding {options['tags']} tags and {options['recipes']} "
+            "recipes....."
+        )
+        through = Recipe.tags.through._meta.db_table
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {through} WHERE recipe_id IN "
+                f"(SELECT id FROM {Recipe._meta.db_table} WHERE user_id = %s)",
+                [user.id],
+            )
+            for model in (Recipe, Tag):
+                cursor.execute(
+                    f"DELETE FROM {model._meta.db_table} WHERE user_id = %s",
+                    [user.id],
+                )
+            cursor.execute(
+                f"INSERT INTO {Tag._meta.db_table} "
+                "(user_id, name, recipe_count) "
+                "SELECT %s, 'Tag ' || n, 0 FROM generate_series(1, %s) n",
+                [user.id, options["tags"]],
+            )
+            cursor.execute(
+                f"INSERT INTO {Recipe._meta.db_table} "
+                "(user_id, title, description, time_minutes, price, link) "
+                "SELECT %s, 'Recipe ' || n, '', 5 + n %% 120, "
+                "(100 + n %% 9900) / 100.0, '' FROM generate_series(1, %s) n",
+                [user.id, options["recipes"]],
+            )
+            # skewed usage, most recipes share the first tags
+            cursor.execute(
+                f"INSERT INTO {through} (recipe_id, tag_id) "
+                "SELECT DISTINCT r.id, t.id "
+                f"FROM {Recipe._meta.db_table} r "
+                "CROSS JOIN generate_series(1, %s) k "
+                f"JOIN {Tag._meta.db_table} t ON t.user_id = r.user_id "
+                "AND t.name = 'Tag ' || "
+                "(1 + floor(%s * power(random(), 3))::integer) "
+                "WHERE r.user_id = %s",
+                [options["tags_per_recipe"], options["tags"], user.id],
+            )
+            stats.rebuild([user.id])
+            for model in (Recipe, Tag):
+                cursor.execute(f"ANALYZE {model._meta.db_table}")
+
+    def report(self, name, timings):
+        """Write latency statistics"""
+        p50 = statistics.median(timings)
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        self.stdout.write(
+            self.style.SUCCESS(f"{name}: p50 {p50:.2f} ms, p95 {p95:.2f} ms")
+        )
@@ -0,0 +1,58 @@
+"""
+Django command to export a user's recipes as NDJSON
+"""
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe import export
+
+
+class Command(BaseCommand):
+    """Django command writing a user's recipe library as NDJSON"""
+
+    help = (
+        "Stream all recipes of a user, with tags and ingredients, as one "
+        "JSON object per line."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("email")
+        parser.add_argument(
+            "--output",
+            default="-",
+            help="File to write to, defaults to stdout.",
+        )
+        parser.add_argument(
+            "--chunk-size", type=int, default=export.DEFAULT_CHUNK_SIZE
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        try:
+            user = get_user_model().objects.get(email=options["email"])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No user with email {options['email']}")
+
+        lines = export.export_recipes(
+            export.user_recipes(user), options["chunk_size"]
+        )
+        if options["output"] == "-":
+            for line in lines:
+                self.stdout.write(line.decode(), ending="")
+        else:
+            with open(options["output"], "wb") as output:
+                count = self._write(output, lines)
+            self.stderr.write(
+                self.style.SUCCESS(
+                    f"Exported {count} recipes to {options['output']}"
+                )
+            )
+
+    def _write(self, output, lines):
+        """Write lines to a binary file, returning their count"""
+        count = 0
+        for line in lines:
+            output.write(line)
+            count += 1
+        return count
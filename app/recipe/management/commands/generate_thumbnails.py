@@ -0,0 +1,38 @@
+"""
+Django command to generate missing recipe image thumbnails
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.models import RecipeImage
+from recipe import images
+
+
+class Command(BaseCommand):
+    """Django command writing missing thumbnails"""
+
+    help = (
+        "Generate the thumbnails of recipe images that have none, such as "
+        "those of images stored before thumbnails were queued or whose "
+        "task failed."
+    )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        start = time.perf_counter()
+        generated = 0
+        ids = RecipeImage.objects.filter(thumbnail="").values_list(
+            "id", flat=True
+        )
+        for image_id in ids.order_by("id").iterator():
+            if images.generate_thumbnail(image_id):
+                generated += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Generated {generated} thumbnails in "
+                f"{time.perf_counter() - start:.2f} s"
+            )
+        )
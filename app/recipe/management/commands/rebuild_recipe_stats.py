@@ -0,0 +1,59 @@
+"""
+Django command to rebuild the recipe statistics rollups
+"""
+
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipe import stats
+from recipe.cache import bump_version
+
+
+class Command(BaseCommand):
+    """Django command recomputing recipe statistics from the recipes"""
+
+    help = (
+        "Recompute the statistics rollups and tag and ingredient usage "
+        "counts, for all users or one, a batch of users per transaction. "
+        "Run it after migrating existing data and after changing the "
+        "price buckets."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--email", help="Only rebuild this user.")
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        users = get_user_model().objects.order_by("id")
+        if options["email"]:
+            users = users.filter(email=options["email"])
+            if not users.exists():
+                raise CommandError(f"No user with email {options['email']}")
+
+        batch_size = options["batch_size"]
+        start = time.perf_counter()
+        rebuilt = 0
+        last_id = 0
+        while True:
+            batch = users.filter(id__gt=last_id).values_list("id", flat=True)
+            ids = list(batch[:batch_size])
+            if not ids:
+                break
+            with transaction.atomic():
+                stats.rebuild(ids)
+            for user_id in ids:
+                bump_version(user_id)
+            rebuilt += len(ids)
+            last_id = ids[-1]
+            self.stdout.write(f"{rebuilt} users rebuilt.....")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rebuilt statistics of {rebuilt} users in "
+                f"{time.perf_counter() - start:.2f} s"
+            )
+        )
@@ -0,0 +1,45 @@
+"""
+Pagination for recipe APIs.
+"""
+
+from rest_framework.pagination import CursorPagination
+
+
+class OptionalCursorPagination(CursorPagination):
+    """Keyset pagination used only when the client asks for it.
+
+    Sending ``page_size`` or ``cursor`` switches a listing to cursor pages,
+    otherwise the full collection is returned as before.
+    """
+
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Paginate only if a cursor or page size was requested"""
+        params = request.query_params
+        if (
+            self.cursor_query_param not in params
+            and self.page_size_query_param not in params
+        ):
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_ordering(self, request, queryset, view):
+        """Follow the ordering the view sorted its queryset by"""
+        if hasattr(view, "get_ordering"):
+            return tuple(view.get_ordering())
+        return super().get_ordering(request, queryset, view)
+
+
+class RecipeCursorPagination(OptionalCursorPagination):
+    """Cursor pagination over the newest or best matching recipes first"""
+
+    ordering = "-id"
+
+
+class NameCursorPagination(OptionalCursorPagination):
+    """Cursor pagination over tags or ingredients in the requested order"""
+
+    ordering = "-name"
@@ -2,12 +2,192 @@
 Serilizers for recipe API
 """
 
+from django.core.files.storage import default_storage
+from django.db import transaction
+
 from rest_framework import serializers
 
-from core.models import Recipe, Tag
+from core.metrics import TimedSerializerMixin
+from core.models import Ingredient, Recipe, Tag
+from recipe import images
+
+
+def _column(field):
+    """Return the .values() lookup of a field's source"""
+    return "__".join(field.source_attrs)
+
+
+def value_fields(serializer):
+    """Return the columns a ValuesListSerializer child reads from rows"""
+    return [
+        _column(field)
+        for field in serializer._readable_fields
+        if not isinstance(field, serializers.ListSerializer)
+    ]
+
+
+def nested_fields(serializer):
+    """Return (relation, nested columns) of a serializer's relations"""
+    return [
+        (
+            field.source,
+            [_column(child) for child in field.child._readable_fields],
+        )
+        for field in serializer._readable_fields
+        if isinstance(field, serializers.ListSerializer)
+    ]
+
+
+def _accessor(source, convert):
+    """Return a function reading and converting one column of a row"""
+
+    def get(row):
+        value = row[source]
+        return None if value is None else convert(value)
+
+    return get
+
+
+class ValuesListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    """List serializer for rows of a ``.values()`` queryset.
+
+    Rows get the child serializer's representation through accessors
+    compiled once per list, and nested many to many serializers are filled
+    from one query per relation, so no model instances are built. Lists of
+    model instances take the usual path.
+    """
+
+    def to_representation(self, data):
+        rows = list(data)
+        if not rows or not isinstance(rows[0], dict):
+            return super().to_representation(rows)
+
+        ids = [row["id"] for row in rows]
+        accessors = []
+        for field in self.child._readable_fields:
+            if isinstance(field, serializers.ListSerializer):
+                related = self._related(field, ids)
+                accessors.append(
+                    (
+                        field.field_name,
+                        lambda row, r=related: r.get(row["id"], []),
+                    )
+                )
+            else:
+                accessors.append(
+                    (
+                        field.field_name,
+                        _accessor(_column(field), field.to_representation),
+                    )
+                )
+        return [{name: get(row) for name, get in accessors} for row in rows]
+
+    def _related(self, field, ids):
+        """Return representations of a relation's objects by row id"""
+        relation = self.child.Meta.model._meta.get_field(field.source)
+        lookup = relation.related_query_name()
+        nested = [
+            (nested_field.field_name, nested_field.to_representation)
+            for nested_field in field.child._readable_fields
+        ]
+        # the same join and filter as prefetch_related, so rows arrive in
+        # the same order as in the instance path
+        rows = relation.related_model.objects.filter(
+            **{f"{lookup}__in": ids}
+        ).values_list(
+            lookup,
+            *(
+                nested_field.source
+                for nested_field in field.child._readable_fields
+            ),
+        )
+        related = {}
+        for row_id, *values in rows:
+            related.setdefault(row_id, []).append(
+                {
+                    name: None if value is None else convert(value)
+                    for (name, convert), value in zip(nested, values)
+                }
+            )
+        return related
+
+
+class StoredFileField(serializers.ReadOnlyField):
+    """URL of a stored file, read from a file field or its name"""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("allow_null", True)
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        # storage URLs do not depend on the request, so cached responses
+        # can be shared by every host name
+        name = getattr(value, "name", value)
+        return default_storage.url(name) if name else None
+
+
+class SparseFieldsMixin:
+    """Serializer rendering only the fields a client asked for.
+
+    ``fields`` names the fields to render, ``expand`` adds nested
+    relations. Without ``fields`` every plain field is rendered, and
+    without either all relations are as well.
+    """
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is None and expand is None:
+            return
+
+        nested = {
+            name
+            for name, field in self.fields.items()
+            if isinstance(field, serializers.ListSerializer)
+        }
+        errors = {}
+        unknown = set(fields or ()) - set(self.fields)
+        if unknown:
+            errors["fields"] = f"Unknown fields {', '.join(sorted(unknown))}."
+        unknown = set(expand or ()) - nested
+        if unknown:
+            errors["expand"] = (
+                f"Unknown relations {', '.join(sorted(unknown))}."
+            )
+        if errors:
+            raise serializers.ValidationError(errors)
+
+        keep = set(fields) if fields is not None else set(self.fields) - nested
+        keep.update(expand or ())
+        for name in set(self.fields) - keep:
+            self.fields.pop(name)
+
+
+class RecipeImageField(serializers.ImageField):
+    """Image upload, read back as the URL of the stored image"""
+
+    def to_representation(self, value):
+        return default_storage.url(value.image.name)
+
 
+class UserNamedSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """Base serializer for objects named uniquely per user"""
 
-class TagSerializer(serializers.ModelSerializer):
+    def validate_name(self, value):
+        """Check the user has no other object with the same name"""
+
+        if self.instance is not None:
+            model = self.Meta.model
+            duplicate = model.objects.filter(
+                user=self.instance.user, name=value
+            ).exclude(id=self.instance.id)
+            if duplicate.exists():
+                raise serializers.ValidationError(
+                    f"{model._meta.verbose_name.capitalize()} already exists"
+                )
+        return value
+
+
+class TagSerializer(UserNamedSerializer):
     """Serializer for Tags"""
 
     class Meta:
@@ -16,48 +196,91 @@ class TagSerializer(serializers.ModelSerializer):
         read_only_fields = ["id"]
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class IngredientSerializer(UserNamedSerializer):
+    """Serializer for Ingredients"""
+
+    class Meta:
+        model = Ingredient
+        fields = ["id", "name"]
+        read_only_fields = ["id"]
+
+
+class TagUsageSerializer(TagSerializer):
+    """Serializer for tag listings, with the number of recipes using them"""
+
+    class Meta(TagSerializer.Meta):
+        fields = TagSerializer.Meta.fields + ["recipe_count"]
+
+
+class IngredientUsageSerializer(IngredientSerializer):
+    """Serializer for ingredient listings, with the number of recipes"""
+
+    class Meta(IngredientSerializer.Meta):
+        fields = IngredientSerializer.Meta.fields + ["recipe_count"]
+
+
+class RecipeSerializer(
+    SparseFieldsMixin, TimedSerializerMixin, serializers.ModelSerializer
+):
     """Serializer for recipe"""
 
     tags = TagSerializer(many=True, required=False)
+    ingredients = IngredientSerializer(
+        many=True, required=False, source="ingredient"
+    )
+    image = StoredFileField(source="image.image")
+    thumbnail = StoredFileField(source="image.thumbnail")
 
     class Meta:
         model = Recipe
-        fields = ("id", "title", "time_minutes", "price", "link", "tags")
+        fields = (
+            "id",
+            "title",
+            "time_minutes",
+            "price",
+            "link",
+            "tags",
+            "ingredients",
+            "image",
+            "thumbnail",
+        )
         read_only_fields = ["id"]
+        list_serializer_class = ValuesListSerializer
 
-    def _get_or_create_tags(self, tags, recipe):
-        """Handling getting of creaing tags as needed"""
+    def _get_or_create_named(self, model, items):
+        """Return tags or ingredients for the items, creating missing ones"""
 
         auth_user = self.context["request"].user
-        for tag in tags:
-
-            # will only create a new tag if does not already exist
-            tag_obj, created = Tag.objects.get_or_create(
-                user=auth_user,
-                **tag,  # same as name=tag["name"]
-            )
-            # will save all tags to recipe
-            recipe.tags.add(tag_obj)
-        return recipe
+        return model.objects.get_or_create_many(
+            auth_user, [item["name"] for item in items]
+        )
 
     def create(self, validated_data):
         """create a recipe"""
 
         tags = validated_data.pop("tags", [])
+        ingredients = validated_data.pop("ingredient", [])
         recipe = Recipe.objects.create(**validated_data)
 
-        self._get_or_create_tags(tags, recipe)
+        recipe.tags.add(*self._get_or_create_named(Tag, tags))
+        recipe.ingredient.add(
+            *self._get_or_create_named(Ingredient, ingredients)
+        )
 
         return recipe
 
     def update(self, instance, validated_data):
         """Update a recipe"""
         tags = validated_data.pop("tags", None)
+        ingredients = validated_data.pop("ingredient", None)
 
+        # only the difference to the current relations is written
         if tags is not None:
-            instance.tags.clear()
-            self._get_or_create_tags(tags, instance)
+            instance.tags.set(self._get_or_create_named(Tag, tags))
+        if ingredients is not None:
+            instance.ingredient.set(
+                self._get_or_create_named(Ingredient, ingredients)
+            )
 
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
@@ -71,3 +294,36 @@ class RecipeDetailSerializer(RecipeSerializer):
 
     class Meta(RecipeSerializer.Meta):
         fields = RecipeSerializer.Meta.fields + ("description",)
+
+
+class RecipeImageSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """Serializer for uploading an image to a recipe"""
+
+    image = RecipeImageField()
+    thumbnail = StoredFileField(source="image.thumbnail")
+
+    class Meta:
+        model = Recipe
+        fields = ["id", "image", "thumbnail"]
+        read_only_fields = ["id"]
+
+    def validate_image(self, value):
+        """Check the upload's size and format"""
+        max_bytes = images.get_options()["MAX_BYTES"]
+        if value.size > max_bytes:
+            raise serializers.ValidationError(
+                f"Images may be at most {max_bytes} bytes."
+            )
+        if value.image.format not in images.FORMATS:
+            raise serializers.ValidationError(
+                f"Unsupported image format {value.image.format}."
+            )
+        return value
+
+    def update(self, instance, validated_data):
+        """Store the image, once per content, and link it to the recipe"""
+        with transaction.atomic():
+            instance.image = images.store_image(validated_data["image"])
+            instance.save(update_fields=["image"])
+            images.schedule_thumbnail(instance.image)
+        return instance
@@ -0,0 +1,120 @@
+"""
+Signal handlers for the recipe app.
+"""
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from core.models import Ingredient, Recipe, Tag
+from recipe import stats
+from recipe.cache import bump_version
+
+# named model and through column of each recipe relation's through model
+STATS_RELATIONS = {
+    through: (model, column) for model, through, column in stats.RELATIONS
+}
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_owner_responses(sender, instance, using, **kwargs):
+    """Invalidate cached responses of the owner of a changed object"""
+    _bump_on_commit(instance.user_id, using)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredient.through)
+def invalidate_relation_responses(sender, instance, action, using, **kwargs):
+    """Invalidate cached responses when recipe relations change"""
+    if action.startswith("post_"):
+        _bump_on_commit(instance.user_id, using)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def start_user_version(sender, instance, created, using, **kwargs):
+    """Start a new user with a fresh version, even if the id was reused"""
+    if created:
+        _bump_on_commit(instance.id, using)
+
+
+def _bump_on_commit(user_id, using):
+    """Bump a user's version once the change is visible to other reads"""
+    # bumped inside the transaction, a concurrent read could cache the
+    # old rows under the new version
+    transaction.on_commit(lambda: bump_version(user_id), using=using)
+
+
+@receiver(pre_save, sender=Recipe)
+def remember_stats_values(sender, instance, update_fields, using, **kwargs):
+    """Keep the stored time and price of a recipe about to be updated"""
+    instance._stats_values = None
+    if instance._state.adding or (
+        update_fields is not None
+        and {"time_minutes", "price"}.isdisjoint(update_fields)
+    ):
+        return
+    # locked until the save commits, so concurrent updates of the recipe
+    # each move the rollups from the values the other one wrote
+    instance._stats_values = (
+        Recipe.objects.using(using)
+        .select_for_update()
+        .filter(pk=instance.pk)
+        .values_list("time_minutes", "price")
+        .first()
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_stats(sender, instance, created, using, **kwargs):
+    """Apply a saved recipe to its owner's statistics"""
+    values = (instance.time_minutes, instance.price)
+    old = getattr(instance, "_stats_values", None)
+    if created:
+        stats.apply_changes(instance.user_id, [values + (1,)], using)
+    elif old is not None and old != values:
+        stats.apply_changes(
+            instance.user_id, [old + (-1,), values + (1,)], using
+        )
+    instance._stats_values = None
+
+
+@receiver(pre_delete, sender=Recipe)
+def remove_recipe_stats(sender, instance, using, **kwargs):
+    """Take a recipe out of the statistics while its rows still exist"""
+    stats.remove_recipe(instance, using)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredient.through)
+def update_usage_counts(
+    sender, instance, action, reverse, pk_set, using, **kwargs
+):
+    """Keep the recipe_count of tags and ingredients in step with links"""
+    model, column = STATS_RELATIONS[sender]
+    if action == "post_add" and pk_set:
+        if reverse:
+            stats.change_usage(model, {instance.pk: len(pk_set)}, using)
+        else:
+            stats.change_usage(model, dict.fromkeys(pk_set, 1), using)
+    elif action in ("pre_remove", "pre_clear"):
+        # counted from the links, as removing a missing one is a no-op
+        own, other = (
+            (column, "recipe_id") if reverse else ("recipe_id", column)
+        )
+        where, params = f"{own} = %s", [instance.pk]
+        if action == "pre_remove":
+            where += f" AND {other} = ANY(%s)"
+            params.append(list(pk_set))
+        stats.unlink_usage(model, sender, column, where, params, using)
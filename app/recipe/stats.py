@@ -0,0 +1,250 @@
+"""
+Per user recipe statistics served from rollup tables.
+
+Every recipe write applies its change to the owner's running totals, a
+histogram of preparation times and counts per price bucket, and to the
+recipe_count of the tags and ingredients it links. Signals do this for
+single object writes, bulk writes call the same functions as they send no
+signals. Reading statistics then takes a few indexed queries however many
+recipes a user has. rebuild() recomputes the rollups from the recipes, for
+backfills and after PRICE_BUCKETS changes.
+"""
+
+import statistics
+from decimal import Decimal
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core.models import (
+    Ingredient,
+    Recipe,
+    RecipePriceCount,
+    RecipeStats,
+    RecipeTimeCount,
+    Tag,
+)
+
+# lower bounds of the price buckets, prices below the first are bucket 0
+PRICE_BUCKETS = tuple(
+    Decimal(edge) for edge in ("0", "5", "10", "20", "50", "100")
+)
+TOP_COUNT = 10
+CENTS = Decimal("0.01")
+
+# named model, through model and its column for each recipe relation
+RELATIONS = (
+    (Tag, Recipe.tags.through, "tag_id"),
+    (Ingredient, Recipe.ingredient.through, "ingredient_id"),
+)
+
+_STATS = RecipeStats._meta.db_table
+_TIMES = RecipeTimeCount._meta.db_table
+_PRICES = RecipePriceCount._meta.db_table
+_RECIPES = Recipe._meta.db_table
+
+
+def _apply_sql(source):
+    """Return a statement adding the rows of source to a user's rollups"""
+    # rows are grouped by key, as an upsert may touch each row only once
+    return (
+        f"WITH changes (time_minutes, price, sign) AS ({source}), "
+        f"totals AS (INSERT INTO {_STATS} AS stats "
+        "(user_id, recipe_count, time_minutes_total, price_total) "
+        "SELECT %(user)s, sum(sign), sum(sign * time_minutes), "
+        "sum(sign * price) FROM changes HAVING count(*) > 0 "
+        "ON CONFLICT (user_id) DO UPDATE SET "
+        "recipe_count = stats.recipe_count + excluded.recipe_count, "
+        "time_minutes_total = "
+        "stats.time_minutes_total + excluded.time_minutes_total, "
+        "price_total = stats.price_total + excluded.price_total), "
+        f"times AS (INSERT INTO {_TIMES} AS times "
+        "(user_id, time_minutes, recipe_count) "
+        "SELECT %(user)s, time_minutes, sum(sign) FROM changes "
+        "GROUP BY time_minutes "
+        "ON CONFLICT (user_id, time_minutes) DO UPDATE SET "
+        "recipe_count = times.recipe_count + excluded.recipe_count) "
+        f"INSERT INTO {_PRICES} AS prices (user_id, bucket, recipe_count) "
+        "SELECT %(user)s, width_bucket(price, %(buckets)s::numeric[]), "
+        "sum(sign) FROM changes GROUP BY 2 "
+        "ON CONFLICT (user_id, bucket) DO UPDATE SET "
+        "recipe_count = prices.recipe_count + excluded.recipe_count"
+    )
+
+
+def apply_query(user_id, source, params=None, using=DEFAULT_DB_ALIAS):
+    """Apply the (time_minutes, price, sign) rows a query selects"""
+    params = dict(params or {}, user=user_id, buckets=list(PRICE_BUCKETS))
+    with connections[using].cursor() as cursor:
+        cursor.execute(_apply_sql(source), params)
+
+
+def apply_changes(user_id, changes, using=DEFAULT_DB_ALIAS):
+    """Apply (time_minutes, price, sign) tuples to a user's rollups"""
+    changes = list(changes)
+    if not changes:
+        return
+    times, prices, signs = zip(*changes)
+    apply_query(
+        user_id,
+        "SELECT * FROM unnest(%(times)s::integer[], "
+        "%(prices)s::numeric[], %(signs)s::integer[])",
+        {"times": list(times), "prices": list(prices), "signs": list(signs)},
+        using,
+    )
+
+
+def change_usage(model, deltas, using=DEFAULT_DB_ALIAS):
+    """Add {id: delta} to the recipe_count of tags or ingredients"""
+    deltas = {pk: delta for pk, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {model._meta.db_table} named "
+            "SET recipe_count = named.recipe_count + usage.delta "
+            "FROM unnest(%s::bigint[], %s::integer[]) AS usage (id, delta) "
+            "WHERE named.id = usage.id",
+            [list(deltas), list(deltas.values())],
+        )
+
+
+def unlink_usage(model, through, column, where, params, using):
+    """Subtract the through rows matching where from recipe_count"""
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {model._meta.db_table} named "
+            "SET recipe_count = named.recipe_count - linked.recipe_count "
+            f"FROM (SELECT {column} AS id, count(*) AS recipe_count "
+            f"FROM {through._meta.db_table} WHERE {where} GROUP BY 1) linked "
+            "WHERE named.id = linked.id",
+            params,
+        )
+
+
+def remove_recipes(user_id, ids, using=DEFAULT_DB_ALIAS):
+    """Take a user's recipes about to be deleted out of the rollups"""
+    ids = list(ids)
+    if not ids:
+        return
+    apply_query(
+        user_id,
+        f"SELECT time_minutes, price, -1 FROM {_RECIPES} "
+        "WHERE id = ANY(%(recipes)s)",
+        {"recipes": ids},
+        using,
+    )
+    for model, through, column in RELATIONS:
+        unlink_usage(
+            model, through, column, "recipe_id = ANY(%s)", [ids], using
+        )
+
+
+def remove_recipe(recipe, using=DEFAULT_DB_ALIAS):
+    """Take a recipe about to be deleted out of the rollups"""
+    remove_recipes(recipe.user_id, [recipe.id], using)
+
+
+def rebuild(user_ids, using=DEFAULT_DB_ALIAS):
+    """Recompute the rollups of the given users from their recipes"""
+    params = {"users": list(user_ids), "buckets": list(PRICE_BUCKETS)}
+    statements = [
+        f"DELETE FROM {table} WHERE user_id = ANY(%(users)s)"
+        for table in (_STATS, _TIMES, _PRICES)
+    ] + [
+        f"INSERT INTO {_STATS} "
+        "(user_id, recipe_count, time_minutes_total, price_total) "
+        "SELECT user_id, count(*), sum(time_minutes), sum(price) "
+        f"FROM {_RECIPES} WHERE user_id = ANY(%(users)s) GROUP BY user_id",
+        f"INSERT INTO {_TIMES} (user_id, time_minutes, recipe_count) "
+        f"SELECT user_id, time_minutes, count(*) FROM {_RECIPES} "
+        "WHERE user_id = ANY(%(users)s) GROUP BY 1, 2",
+        f"INSERT INTO {_PRICES} (user_id, bucket, recipe_count) "
+        "SELECT user_id, width_bucket(price, %(buckets)s::numeric[]), "
+        f"count(*) FROM {_RECIPES} WHERE user_id = ANY(%(users)s) "
+        "GROUP BY 1, 2",
+    ]
+    for model, through, column in RELATIONS:
+        table = model._meta.db_table
+        # only rows whose count is off are written
+        statements.append(
+            f"UPDATE {table} named SET recipe_count = usage.recipe_count "
+            f"FROM (SELECT counted.id, count(link.{column}) AS recipe_count "
+            f"FROM {table} counted "
+            f"LEFT JOIN {through._meta.db_table} link "
+            f"ON link.{column} = counted.id "
+            "WHERE counted.user_id = ANY(%(users)s) "
+            "GROUP BY counted.id) usage "
+            "WHERE named.id = usage.id "
+            "AND named.recipe_count <> usage.recipe_count"
+        )
+    with connections[using].cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql, params)
+
+
+def _median(times):
+    """Return the median of a sorted (value, count) histogram"""
+    total = sum(count for _, count in times)
+    middle = []
+    seen = 0
+    for value, count in times:
+        # the one or two middle positions, counting from zero
+        for position in {(total - 1) // 2, total // 2}:
+            if seen <= position < seen + count:
+                middle.append(value)
+        seen += count
+    return statistics.mean(middle) if middle else None
+
+
+def _money(value):
+    """Return a decimal amount as a string with cents"""
+    return str(value.quantize(CENTS))
+
+
+def _top(model, user, top):
+    """Return the user's most used tags or ingredients"""
+    return list(
+        model.objects.filter(user=user, recipe_count__gt=0)
+        .order_by("-recipe_count", "name")
+        .values("id", "name", "recipe_count")[:top]
+    )
+
+
+def user_stats(user, top=TOP_COUNT):
+    """Return the recipe statistics of a user"""
+    totals = RecipeStats.objects.filter(user=user).first()
+    count = totals.recipe_count if totals else 0
+    times = list(
+        RecipeTimeCount.objects.filter(user=user, recipe_count__gt=0)
+        .order_by("time_minutes")
+        .values_list("time_minutes", "recipe_count")
+    )
+    buckets = dict(
+        RecipePriceCount.objects.filter(user=user).values_list(
+            "bucket", "recipe_count"
+        )
+    )
+    bounds = (None,) + PRICE_BUCKETS + (None,)
+
+    return {
+        "recipe_count": count,
+        "time_minutes": {
+            "average": (
+                round(totals.time_minutes_total / count, 2) if count else None
+            ),
+            "median": _median(times),
+        },
+        "price": {
+            "average": (_money(totals.price_total / count) if count else None),
+            "distribution": [
+                {
+                    "min": _money(low) if low is not None else None,
+                    "max": _money(high) if high is not None else None,
+                    "recipe_count": buckets.get(index, 0),
+                }
+                for index, (low, high) in enumerate(zip(bounds, bounds[1:]))
+            ],
+        },
+        "top_tags": _top(Tag, user, top),
+        "top_ingredients": _top(Ingredient, user, top),
+    }
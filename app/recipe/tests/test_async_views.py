@@ -0,0 +1,126 @@
+"""
+Tests for the async recipe read views.
+"""
+
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import (
+    Recipe,
+    Tag,
+)
+from recipe import async_views
+from user.authentication import token_cache
+
+
+ASYNC_RECIPES_URL = reverse("recipe:async-recipe-list")
+ASYNC_TAGS_URL = reverse("recipe:async-tag-list")
+RECIPES_URL = reverse("recipe:recipe-list")
+
+
+def async_detail_url(recipe_id):
+    """Create and return an async recipe detail URL."""
+    return reverse("recipe:async-recipe-detail", args=[recipe_id])
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe."""
+    defaults = {
+        "title": "Sample recipe title",
+        "time_minutes": 22,
+        "price": Decimal("5.25"),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class AsyncReadViewTests(TransactionTestCase):
+    """Test reads served from the bounded thread pool.
+
+    Pool threads use their own database connections, so the data must be
+    committed rather than held in a test transaction.
+    """
+
+    def setUp(self):
+        cache.clear()
+        token_cache.local.clear()
+        async_views.shutdown()
+        self.user = get_user_model().objects.create_user(
+            email="user@example.com", password="test123"
+        )
+        token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+    def tearDown(self):
+        async_views.shutdown()
+
+    def test_auth_required(self):
+        """Test auth is required for async reads."""
+        res = APIClient().get(ASYNC_RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_list_matches_sync_view(self):
+        """Test the async list returns the same data as the sync list."""
+        recipe = create_recipe(self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name="Vegan"))
+        create_recipe(self.user, title="Second")
+
+        res = self.client.get(ASYNC_RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json(), self.client.get(RECIPES_URL).json())
+
+    def test_detail_limited_to_user(self):
+        """Test the async detail view only serves the user's recipes."""
+        recipe = create_recipe(self.user, description="Mine")
+        other = get_user_model().objects.create_user(
+            email="other@example.com", password="test123"
+        )
+        other_recipe = create_recipe(other)
+
+        res = self.client.get(async_detail_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()["description"], "Mine")
+
+        res = self.client.get(async_detail_url(other_recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_tag_list(self):
+        """Test listing tags through the async view."""
+        Tag.objects.create(user=self.user, name="Dessert")
+
+        res = self.client.get(ASYNC_TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([tag["name"] for tag in res.json()], ["Dessert"])
+
+    def test_writes_not_allowed(self):
+        """Test the async views only serve reads."""
+        payload = {"title": "New", "time_minutes": 5, "price": "1.00"}
+
+        res = self.client.post(ASYNC_RECIPES_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+        self.assertFalse(Recipe.objects.exists())
+
+    @override_settings(RECIPE_ASYNC_READS={"MAX_PENDING": 0})
+    def test_busy_pool_rejected(self):
+        """Test requests beyond the pending limit get a 503."""
+        async_views.shutdown()
+
+        res = self.client.get(ASYNC_RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res["Retry-After"], "1")
@@ -0,0 +1,191 @@
+"""
+Tests for the ingredients API.
+"""
+
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.test import TestCase
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Ingredient,
+    Recipe,
+)
+
+from recipe.serializers import IngredientUsageSerializer
+
+
+INGREDIENTS_URL = reverse("recipe:ingredient-list")
+
+
+def detail_url(ingredient_id):
+    """Create and return an ingredient detail url."""
+    return reverse("recipe:ingredient-detail", args=[ingredient_id])
+
+
+def create_recipe(user, *ingredients):
+    """Create and return a recipe using the given ingredients."""
+    recipe = Recipe.objects.create(
+        user=user, title="Sample recipe", time_minutes=5, price=Decimal("4.50")
+    )
+    recipe.ingredient.add(*ingredients)
+    return recipe
+
+
+def create_user(email="user@example.com", password="testpass123"):
+    """Create and return a user."""
+    return get_user_model().objects.create_user(email=email, password=password)
+
+
+class PublicIngredientsApiTests(TestCase):
+    """Test unauthenticated API requests."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_auth_required(self):
+        """Test auth is required for retrieving ingredients."""
+        res = self.client.get(INGREDIENTS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateIngredientsApiTests(TestCase):
+    """Test authenticated API requests."""
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_retrieve_ingredients(self):
+        """Test retrieving a list of ingredients."""
+        Ingredient.objects.create(user=self.user, name="Kale")
+        Ingredient.objects.create(user=self.user, name="Salt")
+
+        res = self.client.get(INGREDIENTS_URL)
+
+        ingredients = Ingredient.objects.all().order_by("-name")
+        serializer = IngredientUsageSerializer(ingredients, many=True)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, serializer.data)
+
+    def test_ingredients_limited_to_user(self):
+        """Test list of ingredients is limited to authenticated user."""
+        user2 = create_user(email="user2@example.com")
+        Ingredient.objects.create(user=user2, name="Vinegar")
+        ingredient = Ingredient.objects.create(user=self.user, name="Pepper")
+
+        res = self.client.get(INGREDIENTS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 1)
+        self.assertEqual(res.data[0]["name"], ingredient.name)
+        self.assertEqual(res.data[0]["id"], ingredient.id)
+
+    def test_update_ingredient(self):
+        """Updating an ingredient"""
+
+        ingredient = Ingredient.objects.create(user=self.user, name="Cilantro")
+        payload = {"name": "Coriander"}
+
+        res = self.client.patch(detail_url(ingredient.id), payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        ingredient.refresh_from_db()
+        self.assertEqual(ingredient.name, payload["name"])
+
+    def test_update_ingredient_duplicate_name_error(self):
+        """Test renaming an ingredient to an existing name is rejected."""
+        Ingredient.objects.create(user=self.user, name="Kale")
+        ingredient = Ingredient.objects.create(user=self.user, name="Cilantro")
+
+        res = self.client.patch(detail_url(ingredient.id), {"name": "Kale"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        ingredient.refresh_from_db()
+        self.assertEqual(ingredient.name, "Cilantro")
+
+    def test_delete_ingredient(self):
+        """Delete an ingredient"""
+
+        ingredient = Ingredient.objects.create(user=self.user, name="Lettuce")
+        res = self.client.delete(detail_url(ingredient.id))
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Ingredient.objects.filter(id=ingredient.id).exists())
+
+    def test_ingredients_paginated_by_cursor(self):
+        """Test listing ingredients page by page with a cursor."""
+        for name in ["Apple", "Banana", "Cherry"]:
+            Ingredient.objects.create(user=self.user, name=name)
+
+        res = self.client.get(INGREDIENTS_URL, {"page_size": 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        names = [ingredient["name"] for ingredient in res.data["results"]]
+        self.assertEqual(names, ["Cherry", "Banana"])
+
+        res = self.client.get(res.data["next"])
+
+        names = [ingredient["name"] for ingredient in res.data["results"]]
+        self.assertEqual(names, ["Apple"])
+        self.assertIsNone(res.data["next"])
+
+    def test_recipe_count(self):
+        """Test listed ingredients include the number of recipes using them."""
+        used = Ingredient.objects.create(user=self.user, name="Used")
+        unused = Ingredient.objects.create(user=self.user, name="Unused")
+        create_recipe(self.user, used)
+        create_recipe(self.user, used)
+
+        res = self.client.get(INGREDIENTS_URL)
+
+        counts = {item["id"]: item["recipe_count"] for item in res.data}
+        self.assertEqual(counts, {used.id: 2, unused.id: 0})
+
+    def test_filter_assigned_only(self):
+        """Test listing only ingredients assigned to recipes."""
+        used = Ingredient.objects.create(user=self.user, name="Used")
+        Ingredient.objects.create(user=self.user, name="Unused")
+        create_recipe(self.user, used)
+        create_recipe(self.user, used)
+
+        res = self.client.get(INGREDIENTS_URL, {"assigned_only": 1})
+
+        self.assertEqual([item["id"] for item in res.data], [used.id])
+
+    def test_order_by_recipe_count(self):
+        """Test the most used ingredients come first, ties by name."""
+        a, b, c = (
+            Ingredient.objects.create(user=self.user, name=name)
+            for name in ["Apple", "Banana", "Cherry"]
+        )
+        create_recipe(self.user, a, b)
+        create_recipe(self.user, b)
+        create_recipe(self.user, c)
+
+        res = self.client.get(INGREDIENTS_URL, {"ordering": "-recipe_count"})
+
+        names = [item["name"] for item in res.data]
+        self.assertEqual(names, ["Banana", "Cherry", "Apple"])
+
+        res = self.client.get(
+            INGREDIENTS_URL, {"ordering": "-recipe_count", "page_size": 2}
+        )
+        names = [item["name"] for item in res.data["results"]]
+        res = self.client.get(res.data["next"])
+        names += [item["name"] for item in res.data["results"]]
+        self.assertEqual(names, ["Banana", "Cherry", "Apple"])
+
+    def test_invalid_list_parameters(self):
+        """Test unknown orderings and assigned_only values are rejected."""
+        for params in ({"ordering": "user"}, {"assigned_only": "yes"}):
+            with self.subTest(params):
+                res = self.client.get(INGREDIENTS_URL, params)
+
+                self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -2,26 +2,39 @@
 Tests for recipe APIs.
 """
 
+import hashlib
+import io
+import os
+import shutil
+import tempfile
 from decimal import Decimal
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.management import call_command
+from django.test import TestCase, override_settings
 from django.urls import reverse
 
 from rest_framework import status
 from rest_framework.test import APIClient
+from PIL import Image
 
 from core.models import (
+    Ingredient,
     Recipe,
+    RecipeImage,
     Tag,
+    Task,
 )
 
+from core import tasks
+from recipe import images
+from recipe.cache import get_version
 from recipe.serializers import (
     RecipeSerializer,
     RecipeDetailSerializer,
 )
 
-
 RECIPES_URL = reverse("recipe:recipe-list")
 
 
@@ -55,6 +68,21 @@ def create_user(**params):
     return get_user_model().objects.create_user(**params)
 
 
+def image_file(size=(800, 600), color=(200, 80, 40), format="JPEG"):
+    """Create and return an image file for uploading."""
+    output = io.BytesIO()
+    Image.new("RGB", size, color).save(output, format)
+    output.name = f"image.{format.lower()}"
+    output.seek(0)
+    return output
+
+
+def media_path(url):
+    """Return the path of a stored file from its URL."""
+    name = url.split(settings.MEDIA_URL, 1)[1]
+    return os.path.join(settings.MEDIA_ROOT, name)
+
+
 class PublicRecipeAPITests(TestCase):
     """Test unauthenticated API requests."""
 
@@ -288,3 +316,411 @@ class PrivateRecipeApiTests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(recipe.tags.count(), 0)
+
+    def test_update_recipe_keeps_unchanged_tags(self):
+        """Test updating tags only writes the difference."""
+        tag_keep = Tag.objects.create(user=self.user, name="Keep")
+        tag_drop = Tag.objects.create(user=self.user, name="Drop")
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(tag_keep, tag_drop)
+        RecipeTag = Recipe.tags.through
+        kept_row = RecipeTag.objects.get(recipe=recipe, tag=tag_keep)
+
+        payload = {"tags": [{"name": "Keep"}, {"name": "Added"}]}
+        url = detail_url(recipe.id)
+        res = self.client.patch(url, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(RecipeTag.objects.filter(id=kept_row.id).exists())
+        names = set(recipe.tags.values_list("name", flat=True))
+        self.assertEqual(names, {"Keep", "Added"})
+
+    def test_create_recipe_with_duplicate_tag_names(self):
+        """Test repeated tag names in a payload create one tag."""
+        payload = {
+            "title": "Pancakes",
+            "time_minutes": 15,
+            "price": Decimal("1.50"),
+            "tags": [{"name": "Breakfast"}, {"name": "Breakfast"}],
+        }
+        res = self.client.post(RECIPES_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data["id"])
+        self.assertEqual(recipe.tags.count(), 1)
+        self.assertEqual(
+            Tag.objects.filter(user=self.user, name="Breakfast").count(), 1
+        )
+
+    def test_create_recipe_with_new_ingredients(self):
+        """Test creating a recipe with new ingredients."""
+        payload = {
+            "title": "Cauliflower Tacos",
+            "time_minutes": 60,
+            "price": Decimal("4.30"),
+            "ingredients": [{"name": "Cauliflower"}, {"name": "Salt"}],
+        }
+        res = self.client.post(RECIPES_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data["id"])
+        self.assertEqual(recipe.ingredient.count(), 2)
+        for ingredient in payload["ingredients"]:
+            exists = recipe.ingredient.filter(
+                name=ingredient["name"],
+                user=self.user,
+            ).exists()
+            self.assertTrue(exists)
+
+    def test_create_recipe_with_existing_ingredient(self):
+        """Test creating a recipe reuses an existing ingredient."""
+        ingredient = Ingredient.objects.create(user=self.user, name="Lemon")
+        payload = {
+            "title": "Vietnamese Soup",
+            "time_minutes": 25,
+            "price": "2.55",
+            "ingredients": [{"name": "Lemon"}, {"name": "Fish Sauce"}],
+        }
+        res = self.client.post(RECIPES_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data["id"])
+        self.assertIn(ingredient, recipe.ingredient.all())
+        self.assertEqual(
+            Ingredient.objects.filter(user=self.user, name="Lemon").count(), 1
+        )
+
+    def test_update_recipe_assign_ingredient(self):
+        """Test replacing the ingredients of a recipe."""
+        recipe = create_recipe(user=self.user)
+        recipe.ingredient.add(
+            Ingredient.objects.create(user=self.user, name="Pepper")
+        )
+
+        payload = {"ingredients": [{"name": "Chili"}]}
+        url = detail_url(recipe.id)
+        res = self.client.patch(url, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            list(recipe.ingredient.values_list("name", flat=True)), ["Chili"]
+        )
+
+    def test_clear_recipe_ingredients(self):
+        """Test clearing a recipe's ingredients."""
+        recipe = create_recipe(user=self.user)
+        recipe.ingredient.add(
+            Ingredient.objects.create(user=self.user, name="Garlic")
+        )
+
+        payload = {"ingredients": []}
+        url = detail_url(recipe.id)
+        res = self.client.patch(url, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(recipe.ingredient.count(), 0)
+
+    def test_list_paginated_by_cursor(self):
+        """Test listing recipes page by page with a cursor."""
+        recipes = [create_recipe(user=self.user) for _ in range(5)]
+
+        res = self.client.get(RECIPES_URL, {"page_size": 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        ids = [recipe["id"] for recipe in res.data["results"]]
+        self.assertEqual(ids, [recipes[4].id, recipes[3].id])
+        self.assertIsNone(res.data["previous"])
+
+        seen = list(ids)
+        next_url = res.data["next"]
+        while next_url:
+            res = self.client.get(next_url)
+            seen.extend(recipe["id"] for recipe in res.data["results"])
+            next_url = res.data["next"]
+
+        self.assertEqual(seen, [recipe.id for recipe in reversed(recipes)])
+
+    def test_list_not_paginated_by_default(self):
+        """Test recipes are returned as a plain list without a page size."""
+        create_recipe(user=self.user)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsInstance(res.data, list)
+
+    def test_search_recipes_ranked(self):
+        """Test searching ranks title matches above description matches."""
+        in_description = create_recipe(
+            user=self.user,
+            title="Weeknight dinner",
+            description="Creamy chicken curry with rice",
+        )
+        in_title = create_recipe(
+            user=self.user,
+            title="Chicken curry",
+            description="A family favourite",
+        )
+        create_recipe(user=self.user, title="Porridge", description="Oats")
+
+        res = self.client.get(RECIPES_URL, {"search": "chicken curries"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        ids = [recipe["id"] for recipe in res.data]
+        self.assertEqual(ids, [in_title.id, in_description.id])
+
+    def test_search_paginated_by_rank(self):
+        """Test cursor pages of a search keep the best matches first."""
+        in_title = [
+            create_recipe(user=self.user, title="Chicken curry")
+            for _ in range(3)
+        ]
+        in_description = [
+            create_recipe(
+                user=self.user,
+                title="Weeknight dinner",
+                description="Creamy chicken curry with rice",
+            )
+            for _ in range(3)
+        ]
+        expected = [
+            recipe.id
+            for recipes in (in_title, in_description)
+            for recipe in reversed(recipes)
+        ]
+
+        params = {"search": "chicken curry", "page_size": 2}
+        res = self.client.get(RECIPES_URL, params)
+        seen = [recipe["id"] for recipe in res.data["results"]]
+        while res.data["next"]:
+            res = self.client.get(res.data["next"])
+            seen.extend(recipe["id"] for recipe in res.data["results"])
+
+        self.assertEqual(seen, expected)
+
+    def test_search_uses_updated_text(self):
+        """Test the search index follows recipe updates."""
+        recipe = create_recipe(user=self.user, title="Plain toast")
+
+        payload = {"title": "Banana bread"}
+        self.client.patch(detail_url(recipe.id), payload)
+        res = self.client.get(RECIPES_URL, {"search": "banana"})
+
+        self.assertEqual([r["id"] for r in res.data], [recipe.id])
+        res = self.client.get(RECIPES_URL, {"search": "toast"})
+        self.assertEqual(res.data, [])
+
+    def test_filter_by_tags_any(self):
+        """Test filtering recipes having any of the tags."""
+        r1 = create_recipe(user=self.user, title="Thai Vegetable Curry")
+        r2 = create_recipe(user=self.user, title="Aubergine with Tahini")
+        r3 = create_recipe(user=self.user, title="Fish and chips")
+        tag1 = Tag.objects.create(user=self.user, name="Vegan")
+        tag2 = Tag.objects.create(user=self.user, name="Vegetarian")
+        r1.tags.add(tag1)
+        r2.tags.add(tag1, tag2)
+
+        params = {"tags": f"{tag1.id},{tag2.id}"}
+        res = self.client.get(RECIPES_URL, params)
+
+        ids = [recipe["id"] for recipe in res.data]
+        self.assertEqual(ids, [r2.id, r1.id])
+        self.assertNotIn(r3.id, ids)
+
+    def test_filter_by_tags_all(self):
+        """Test filtering recipes having all of the tags."""
+        r1 = create_recipe(user=self.user, title="Thai Vegetable Curry")
+        r2 = create_recipe(user=self.user, title="Aubergine with Tahini")
+        tag1 = Tag.objects.create(user=self.user, name="Vegan")
+        tag2 = Tag.objects.create(user=self.user, name="Vegetarian")
+        r1.tags.add(tag1)
+        r2.tags.add(tag1, tag2)
+
+        params = {"tags": f"{tag1.id},{tag2.id}", "tags_match": "all"}
+        res = self.client.get(RECIPES_URL, params)
+
+        self.assertEqual([recipe["id"] for recipe in res.data], [r2.id])
+
+    def test_filter_by_ingredients_all(self):
+        """Test filtering recipes having all of the ingredients."""
+        r1 = create_recipe(user=self.user, title="Posh Beans on Toast")
+        r2 = create_recipe(user=self.user, title="Chicken Cacciatore")
+        in1 = Ingredient.objects.create(user=self.user, name="Feta Cheese")
+        in2 = Ingredient.objects.create(user=self.user, name="Chicken")
+        r1.ingredient.add(in1, in2)
+        r2.ingredient.add(in2)
+
+        params = {
+            "ingredients": f"{in1.id},{in2.id}",
+            "ingredients_match": "all",
+        }
+        res = self.client.get(RECIPES_URL, params)
+
+        self.assertEqual([recipe["id"] for recipe in res.data], [r1.id])
+
+        res = self.client.get(RECIPES_URL, {"ingredients": f"{in2.id}"})
+
+        self.assertEqual([recipe["id"] for recipe in res.data], [r2.id, r1.id])
+
+    def test_filter_invalid_ids_error(self):
+        """Test filtering with malformed ids returns an error."""
+        res = self.client.get(RECIPES_URL, {"tags": "1,abc"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(RECIPES_URL, {"tags": "1", "tags_match": "x"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class MediaRootMixin:
+    """Store uploads in a temporary directory removed after each test."""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.client = APIClient()
+        self.user = create_user(email="user@example.com", password="test123")
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(user=self.user)
+
+
+class ImageUploadTests(MediaRootMixin, TestCase):
+    """Tests for the image upload API."""
+
+    def upload(self, recipe, image):
+        """Upload an image to a recipe, returning the response."""
+        return self.client.post(
+            image_upload_url(recipe.id), {"image": image}, format="multipart"
+        )
+
+    def test_upload_image(self):
+        """Test uploading an image stores it and queues a thumbnail."""
+        image = image_file()
+
+        res = self.upload(self.recipe, image)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsNone(res.data["thumbnail"])
+        stored = RecipeImage.objects.get()
+        queued = Task.objects.get()
+        self.assertEqual(queued.name, images.generate_thumbnail.task_name)
+        self.assertEqual(queued.args, [stored.id])
+        self.assertEqual(
+            stored.sha256, hashlib.sha256(image.getvalue()).hexdigest()
+        )
+        self.assertEqual((stored.width, stored.height), (800, 600))
+        self.assertTrue(os.path.exists(media_path(res.data["image"])))
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image, stored)
+
+    def test_upload_same_content_stored_once(self):
+        """Test an image uploaded twice is stored once."""
+        other = create_recipe(user=self.user)
+
+        res1 = self.upload(self.recipe, image_file())
+        res2 = self.upload(other, image_file())
+
+        self.assertEqual(res1.data["image"], res2.data["image"])
+        self.assertEqual(RecipeImage.objects.count(), 1)
+        self.assertEqual(
+            len(os.listdir(os.path.dirname(media_path(res1.data["image"])))),
+            1,
+        )
+
+    def test_thumbnail_in_list(self):
+        """Test listings reference the generated thumbnail."""
+        self.upload(self.recipe, image_file(size=(1600, 400)))
+        stored = RecipeImage.objects.get()
+
+        self.assertTrue(images.generate_thumbnail(stored.id))
+        res = self.client.get(RECIPES_URL)
+
+        stored.refresh_from_db()
+        self.assertEqual(res.data[0]["image"], stored.image.url)
+        self.assertEqual(res.data[0]["thumbnail"], stored.thumbnail.url)
+        with Image.open(media_path(res.data[0]["thumbnail"])) as thumbnail:
+            self.assertEqual(thumbnail.size, (320, 80))
+        self.assertEqual(
+            self.client.get(detail_url(self.recipe.id)).data["thumbnail"],
+            stored.thumbnail.url,
+        )
+        self.assertFalse(images.generate_thumbnail(stored.id))
+
+    def test_thumbnail_skips_upload(self):
+        """Test content with a thumbnail is not queued again."""
+        self.upload(self.recipe, image_file())
+        images.generate_thumbnail(RecipeImage.objects.get().id)
+
+        Task.objects.all().delete()
+
+        res = self.upload(create_recipe(user=self.user), image_file())
+
+        self.assertIsNotNone(res.data["thumbnail"])
+        self.assertFalse(Task.objects.exists())
+
+    def test_upload_image_bad_request(self):
+        """Test uploading an invalid image."""
+        res = self.upload(self.recipe, io.BytesIO(b"notanimage"))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(RecipeImage.objects.exists())
+
+    @override_settings(RECIPE_IMAGES={"MAX_BYTES": 100})
+    def test_upload_image_too_large(self):
+        """Test images over the size limit are rejected."""
+        res = self.upload(self.recipe, image_file())
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_upload_other_users_recipe(self):
+        """Test images can't be uploaded to another user's recipe."""
+        other = create_user(email="other@example.com", password="test123")
+        recipe = create_recipe(user=other)
+
+        res = self.upload(recipe, image_file())
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_thumbnail_generated_by_task(self):
+        """Test the queued task writes the thumbnail after the upload."""
+        self.upload(self.recipe, image_file(format="PNG"))
+
+        self.assertEqual(tasks.run_batch(), 1)
+
+        res = self.client.get(detail_url(self.recipe.id))
+        self.assertTrue(res.data["thumbnail"].endswith("-320.jpg"))
+        self.assertTrue(os.path.exists(media_path(res.data["thumbnail"])))
+        self.assertFalse(Task.objects.exists())
+
+    @override_settings(RECIPE_RESPONSE_CACHE={"ENABLED": True})
+    def test_thumbnail_invalidates_on_commit(self):
+        """Test cached recipes are refreshed once the thumbnail commits."""
+        self.upload(self.recipe, image_file())
+        res = self.client.get(detail_url(self.recipe.id))
+        self.assertIsNone(res.data["thumbnail"])
+        version = get_version(self.user.id)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            tasks.run_batch()
+
+        self.assertEqual(get_version(self.user.id), version)
+        for callback in callbacks:
+            callback()
+        res = self.client.get(detail_url(self.recipe.id))
+        self.assertIsNotNone(res.data["thumbnail"])
+
+    def test_generate_thumbnails_command(self):
+        """Test the command generates missing thumbnails."""
+        self.upload(self.recipe, image_file())
+        self.upload(create_recipe(user=self.user), image_file(color=(0,) * 3))
+        out = io.StringIO()
+
+        call_command("generate_thumbnails", stdout=out)
+
+        self.assertIn("Generated 2 thumbnails", out.getvalue())
+        self.assertFalse(RecipeImage.objects.filter(thumbnail="").exists())
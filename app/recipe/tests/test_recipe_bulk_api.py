@@ -0,0 +1,239 @@
+"""
+Tests for the bulk recipe API.
+"""
+
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Ingredient,
+    Recipe,
+    Tag,
+)
+
+
+BULK_URL = reverse("recipe:recipe-bulk")
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe."""
+    defaults = {
+        "title": "Sample recipe title",
+        "time_minutes": 22,
+        "price": Decimal("5.25"),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+def recipe_payload(index, tags=()):
+    """Return a payload for a new recipe."""
+    return {
+        "title": f"Recipe {index}",
+        "time_minutes": 10 + index,
+        "price": "2.50",
+        "tags": [{"name": name} for name in tags],
+    }
+
+
+class PublicRecipeBulkApiTests(TestCase):
+    """Test unauthenticated bulk requests."""
+
+    def test_auth_required(self):
+        """Test auth is required to call the bulk API."""
+        res = APIClient().post(BULK_URL, [], format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateRecipeBulkApiTests(TestCase):
+    """Test authenticated bulk requests."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="user@example.com", password="test123"
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_create(self):
+        """Test creating many recipes with shared tags."""
+        Tag.objects.create(user=self.user, name="Dinner")
+        payload = [
+            recipe_payload(index, tags=["Dinner", f"Tag {index % 2}"])
+            for index in range(4)
+        ]
+
+        res = self.client.post(BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        ids = [result["id"] for result in res.data["results"]]
+        recipes = Recipe.objects.filter(user=self.user).in_bulk(ids)
+        for index, pk in enumerate(ids):
+            recipe = recipes[pk]
+            self.assertEqual(recipe.title, f"Recipe {index}")
+            self.assertEqual(
+                set(recipe.tags.values_list("name", flat=True)),
+                {"Dinner", f"Tag {index % 2}"},
+            )
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 3)
+
+    def test_bulk_create_query_count_constant(self):
+        """Test bulk create cost does not grow with the batch size."""
+        for size in (2, 50):
+            payload = [
+                recipe_payload(index, tags=[f"Tag {index}"])
+                for index in range(size)
+            ]
+
+            # savepoint, tag lookup, tag insert, new tag lookup,
+            # recipe insert, through row insert, tag usage update,
+            # statistics update, savepoint release
+            with self.assertNumQueries(9):
+                res = self.client.post(BULK_URL, payload, format="json")
+
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_bulk_create_reports_item_errors(self):
+        """Test invalid items are reported and valid ones saved."""
+        payload = [recipe_payload(0), {"title": "No time"}, recipe_payload(2)]
+
+        res = self.client.post(BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        results = res.data["results"]
+        self.assertEqual(
+            [result["status"] for result in results],
+            ["created", "error", "created"],
+        )
+        self.assertIn("time_minutes", results[1]["errors"])
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 2)
+
+    def test_bulk_create_requires_list(self):
+        """Test a payload which is not a list is rejected."""
+        res = self.client.post(BULK_URL, recipe_payload(0), format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_update(self):
+        """Test partially updating many recipes."""
+        tag_keep = Tag.objects.create(user=self.user, name="Keep")
+        first = create_recipe(self.user, title="First")
+        first.tags.add(tag_keep)
+        second = create_recipe(self.user, title="Second")
+        other = create_recipe(
+            get_user_model().objects.create_user(
+                email="other@example.com", password="test123"
+            )
+        )
+        payload = [
+            {"id": first.id, "tags": [{"name": "New"}]},
+            {"id": second.id, "title": "Renamed"},
+            {"id": other.id, "title": "Stolen"},
+        ]
+
+        res = self.client.patch(BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(
+            [result["status"] for result in res.data["results"]],
+            ["updated", "updated", "error"],
+        )
+        first.refresh_from_db()
+        second.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(first.title, "First")
+        self.assertEqual(
+            list(first.tags.values_list("name", flat=True)), ["New"]
+        )
+        self.assertEqual(second.title, "Renamed")
+        self.assertNotEqual(other.title, "Stolen")
+
+    def test_bulk_ingredients(self):
+        """Test creating and updating ingredients of many recipes."""
+        Ingredient.objects.create(user=self.user, name="Salt")
+        payload = [
+            dict(recipe_payload(0), ingredients=[{"name": "Salt"}]),
+            dict(recipe_payload(1), ingredients=[{"name": "Flour"}]),
+        ]
+
+        res = self.client.post(BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        first_id, second_id = [r["id"] for r in res.data["results"]]
+        self.assertEqual(Ingredient.objects.filter(user=self.user).count(), 2)
+
+        payload = [{"id": first_id, "ingredients": [{"name": "Flour"}]}]
+        res = self.client.patch(BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        for recipe_id in (first_id, second_id):
+            recipe = Recipe.objects.get(id=recipe_id)
+            self.assertEqual(
+                list(recipe.ingredient.values_list("name", flat=True)),
+                ["Flour"],
+            )
+
+    def test_bulk_delete(self):
+        """Test deleting many recipes by id."""
+        recipes = [create_recipe(self.user) for _ in range(3)]
+        payload = [recipes[0].id, recipes[1].id, 0]
+
+        res = self.client.delete(BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(
+            [result["status"] for result in res.data["results"]],
+            ["deleted", "deleted", "error"],
+        )
+        remaining = Recipe.objects.filter(user=self.user)
+        self.assertEqual(list(remaining), [recipes[2]])
+
+    def test_bulk_delete_queries_constant(self):
+        """Test bulk deletes run the same queries for any recipe count."""
+        tag = Tag.objects.create(user=self.user, name="Dinner")
+        ingredient = Ingredient.objects.create(user=self.user, name="Salt")
+        counts = []
+        for size in (1, 10):
+            recipes = [create_recipe(self.user) for _ in range(size)]
+            for recipe in recipes:
+                recipe.tags.add(tag)
+                recipe.ingredient.add(ingredient)
+            payload = [recipe.id for recipe in recipes]
+
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.delete(BULK_URL, payload, format="json")
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            counts.append(len(queries))
+
+        self.assertEqual(counts[0], counts[1])
+        self.assertFalse(Recipe.objects.exists())
+        tag.refresh_from_db()
+        self.assertEqual(tag.recipe_count, 0)
+
+    def test_bulk_delete_invalid_items(self):
+        """Test items that are not ids get their own errors."""
+        recipe = create_recipe(self.user)
+        payload = [recipe.id, {"id": recipe.id}, [recipe.id], "1", True]
+
+        res = self.client.delete(BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        results = res.data["results"]
+        self.assertEqual(results[0], {"id": recipe.id, "status": "deleted"})
+        for result in results[1:]:
+            self.assertEqual(result["status"], "error")
+            self.assertEqual(
+                result["errors"], {"detail": "Expected a recipe id."}
+            )
+        self.assertFalse(Recipe.objects.filter(user=self.user).exists())
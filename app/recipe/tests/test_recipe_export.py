@@ -0,0 +1,168 @@
+"""
+Tests for the streaming recipe export.
+"""
+
+import json
+import os
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, RecipeImage, Tag
+from recipe import export
+from recipe.serializers import RecipeDetailSerializer
+
+EXPORT_URL = reverse("recipe:recipe-export")
+
+
+def create_recipe(user, index):
+    """Create and return a recipe with a tag and an ingredient."""
+    recipe = Recipe.objects.create(
+        user=user,
+        title=f"Recipe {index}",
+        time_minutes=10,
+        price=Decimal("5.25"),
+        description="Sample description",
+    )
+    recipe.tags.add(Tag.objects.create(user=user, name=f"Tag {index}"))
+    recipe.ingredient.add(
+        Ingredient.objects.create(user=user, name=f"Ingredient {index}")
+    )
+    return recipe
+
+
+def parse(content):
+    """Return the objects of NDJSON content."""
+    return [json.loads(line) for line in content.decode().splitlines()]
+
+
+class RecipeExportApiTests(TestCase):
+    """Test the export endpoint."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="user@example.com", password="test123"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_auth_required(self):
+        """Test exporting requires authentication."""
+        res = APIClient().get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_export_streams_user_recipes(self):
+        """Test the export holds every recipe of the user as NDJSON."""
+        recipes = [create_recipe(self.user, i) for i in range(3)]
+        other = get_user_model().objects.create_user(
+            email="other@example.com", password="test123"
+        )
+        create_recipe(other, 99)
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        self.assertEqual(res["Content-Type"], export.CONTENT_TYPE)
+        expected = RecipeDetailSerializer(recipes[::-1], many=True).data
+        self.assertEqual(
+            parse(b"".join(res.streaming_content)),
+            json.loads(json.dumps(expected)),
+        )
+
+    def test_queries_per_chunk(self):
+        """Test relations are fetched once per chunk, not per recipe."""
+        for i in range(5):
+            create_recipe(self.user, i)
+
+        with patch(
+            "recipe.views.RecipeViewSet.export_chunk_size", 2
+        ), CaptureQueriesContext(connection) as queries:
+            res = self.client.get(EXPORT_URL)
+            lines = parse(b"".join(res.streaming_content))
+
+        self.assertEqual(len(lines), 5)
+        # one cursor over the recipes, then tags and ingredients per chunk
+        self.assertEqual(len(queries), 1 + 2 * 3)
+
+    def test_images_joined(self):
+        """Test recipe images are read with the recipes."""
+        for i in range(5):
+            recipe = create_recipe(self.user, i)
+            recipe.image = RecipeImage.objects.create(
+                sha256=f"{i:064x}",
+                image=f"recipes/00/{i:064x}.jpg",
+                width=800,
+                height=600,
+            )
+            recipe.save()
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(EXPORT_URL)
+            lines = parse(b"".join(res.streaming_content))
+
+        # images are joined to the recipe cursor, relations fetched once
+        self.assertEqual(len(queries), 1 + 2)
+        self.assertTrue(all(line["image"] for line in lines))
+
+
+class ExportRecipesCommandTests(TestCase):
+    """Test the export_recipes command."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="user@example.com", password="test123"
+        )
+
+    def test_export_to_file(self):
+        """Test recipes are written to the output file."""
+        for i in range(3):
+            create_recipe(self.user, i)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "recipes.ndjson")
+            call_command(
+                "export_recipes",
+                "user@example.com",
+                output=path,
+                chunk_size=2,
+                stderr=StringIO(),
+            )
+            with open(path, "rb") as output:
+                lines = parse(output.read())
+
+        self.assertEqual(
+            [line["title"] for line in lines],
+            ["Recipe 2", "Recipe 1", "Recipe 0"],
+        )
+        self.assertEqual(lines[0]["tags"][0]["name"], "Tag 2")
+        self.assertEqual(lines[0]["ingredients"][0]["name"], "Ingredient 2")
+
+    def test_export_to_stdout(self):
+        """Test recipes are written to stdout by default."""
+        create_recipe(self.user, 0)
+        out = StringIO()
+
+        call_command("export_recipes", "user@example.com", stdout=out)
+
+        self.assertEqual(
+            parse(out.getvalue().encode())[0]["id"], Recipe.objects.get().id
+        )
+
+    def test_unknown_user(self):
+        """Test an unknown email is an error."""
+        with self.assertRaises(CommandError):
+            call_command("export_recipes", "nobody@example.com")
@@ -0,0 +1,286 @@
+"""
+Query count regression tests for recipe APIs.
+"""
+
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Ingredient,
+    Recipe,
+    Tag,
+)
+
+RECIPES_URL = reverse("recipe:recipe-list")
+
+
+def detail_url(recipe_id):
+    """Create and return a recipe detail URL."""
+    return reverse("recipe:recipe-detail", args=[recipe_id])
+
+
+def create_recipe_with_tags(user, index, tag_count=3):
+    """Create and return a sample recipe with its own tags."""
+    recipe = Recipe.objects.create(
+        user=user,
+        title=f"Recipe {index}",
+        time_minutes=10,
+        price=Decimal("5.25"),
+        description="Sample description",
+    )
+    for tag_index in range(tag_count):
+        tag = Tag.objects.create(user=user, name=f"Tag {index}-{tag_index}")
+        recipe.tags.add(tag)
+    return recipe
+
+
+class RecipeQueryCountTests(TestCase):
+    """Test the number of SQL queries is independent of result size."""
+
+    # recipe rows + one prefetch each for all tags and ingredients
+    LIST_QUERIES = 3
+    DETAIL_QUERIES = 3
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="user@example.com", password="test123"
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_list_query_count_constant(self):
+        """Test listing recipes uses a fixed number of queries."""
+        for size in (1, 10):
+            with self.captureOnCommitCallbacks(execute=True):
+                Recipe.objects.all().delete()
+                Tag.objects.all().delete()
+                for index in range(size):
+                    create_recipe_with_tags(self.user, index)
+
+            with self.assertNumQueries(self.LIST_QUERIES):
+                res = self.client.get(RECIPES_URL)
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(res.data), size)
+
+    def test_detail_query_count_constant(self):
+        """Test retrieving a recipe uses a fixed number of queries."""
+        for tag_count in (1, 20):
+            recipe = create_recipe_with_tags(
+                self.user, tag_count, tag_count=tag_count
+            )
+
+            with self.assertNumQueries(self.DETAIL_QUERIES):
+                res = self.client.get(detail_url(recipe.id))
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(res.data["tags"]), tag_count)
+
+    def test_list_defers_description(self):
+        """Test the description column is not loaded for list."""
+        create_recipe_with_tags(self.user, 0)
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        recipe_sql = ctx.captured_queries[0]["sql"]
+        self.assertIn('"core_recipe"."title"', recipe_sql)
+        self.assertNotIn('"core_recipe"."description"', recipe_sql)
+
+    def test_create_with_tags_query_count_constant(self):
+        """Test creating a recipe with many tags uses fixed queries."""
+        Tag.objects.create(user=self.user, name="Existing")
+        for tag_count in (2, 30):
+            tags = [{"name": "Existing"}] + [
+                {"name": f"New {tag_count}-{index}"}
+                for index in range(tag_count - 1)
+            ]
+            payload = {
+                "title": "Sample recipe",
+                "time_minutes": 30,
+                "price": Decimal("5.99"),
+                "tags": tags,
+            }
+
+            # recipe insert, statistics update, tag lookup, tag insert,
+            # lookup of new tags, existing through rows, through row
+            # insert, tag usage update, tags and ingredients in response
+            with self.assertNumQueries(10):
+                res = self.client.post(RECIPES_URL, payload, format="json")
+
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            recipe = Recipe.objects.get(id=res.data["id"])
+            self.assertEqual(recipe.tags.count(), tag_count)
+
+    def test_create_with_ingredients_query_count_constant(self):
+        """Test creating a recipe with many ingredients uses fixed queries."""
+        Ingredient.objects.create(user=self.user, name="Salt")
+        for ingredient_count in (2, 50):
+            ingredients = [{"name": "Salt"}] + [
+                {"name": f"New {ingredient_count}-{index}"}
+                for index in range(ingredient_count - 1)
+            ]
+            payload = {
+                "title": "Sample recipe",
+                "time_minutes": 30,
+                "price": Decimal("5.99"),
+                "ingredients": ingredients,
+            }
+
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.post(RECIPES_URL, payload, format="json")
+
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            recipe = Recipe.objects.get(id=res.data["id"])
+            self.assertEqual(recipe.ingredient.count(), ingredient_count)
+            if ingredient_count == 2:
+                expected = len(ctx.captured_queries)
+            else:
+                self.assertEqual(len(ctx.captured_queries), expected)
+
+    def test_update_ingredients_query_count_constant(self):
+        """Test replacing many ingredients uses fixed queries."""
+        recipe = Recipe.objects.create(
+            user=self.user,
+            title="Sample recipe",
+            time_minutes=10,
+            price=Decimal("5.25"),
+        )
+        recipe.ingredient.add(
+            *[
+                Ingredient.objects.create(user=self.user, name=f"Old {index}")
+                for index in range(10)
+            ]
+        )
+        counts = []
+        for ingredient_count in (2, 50):
+            payload = {
+                "ingredients": [
+                    {"name": f"New {ingredient_count}-{index}"}
+                    for index in range(ingredient_count)
+                ]
+            }
+
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.patch(
+                    detail_url(recipe.id), payload, format="json"
+                )
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(res.data["ingredients"]), ingredient_count)
+            counts.append(len(ctx.captured_queries))
+
+        self.assertEqual(counts[0], counts[1])
+
+
+class SparseFieldsTests(TestCase):
+    """Test requested fields limit responses and the SQL behind them."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="user@example.com", password="test123"
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe_with_tags(self.user, 0)
+        self.recipe.ingredient.add(
+            Ingredient.objects.create(user=self.user, name="Salt")
+        )
+
+    def test_list_fields(self):
+        """Test only the requested columns are selected and rendered."""
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(RECIPES_URL, {"fields": "id,title"})
+
+        self.assertEqual(
+            res.data, [{"id": self.recipe.id, "title": "Recipe 0"}]
+        )
+        self.assertEqual(len(ctx.captured_queries), 1)
+        recipe_sql = ctx.captured_queries[0]["sql"]
+        self.assertNotIn('"core_recipe"."price"', recipe_sql)
+        self.assertNotIn("core_recipeimage", recipe_sql)
+
+    def test_list_expand(self):
+        """Test expand adds only the named relations."""
+        with self.assertNumQueries(2):
+            res = self.client.get(
+                RECIPES_URL, {"fields": "title", "expand": "ingredients"}
+            )
+
+        salt = self.recipe.ingredient.get()
+        self.assertEqual(
+            res.data,
+            [
+                {
+                    "title": "Recipe 0",
+                    "ingredients": [{"id": salt.id, "name": "Salt"}],
+                }
+            ],
+        )
+
+        res = self.client.get(RECIPES_URL, {"expand": "tags"})
+
+        self.assertIn("price", res.data[0])
+        self.assertEqual(len(res.data[0]["tags"]), 3)
+        self.assertNotIn("ingredients", res.data[0])
+
+    def test_list_fields_paginated(self):
+        """Test cursor pages work without the id in the response."""
+        create_recipe_with_tags(self.user, 1)
+
+        res = self.client.get(RECIPES_URL, {"fields": "title", "page_size": 1})
+        titles = [recipe["title"] for recipe in res.data["results"]]
+        res = self.client.get(res.data["next"])
+        titles += [recipe["title"] for recipe in res.data["results"]]
+
+        self.assertEqual(titles, ["Recipe 1", "Recipe 0"])
+
+    def test_detail_fields(self):
+        """Test a recipe is loaded with only the requested columns."""
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(
+                detail_url(self.recipe.id), {"fields": "description,tags"}
+            )
+
+        self.assertEqual(set(res.data), {"description", "tags"})
+        self.assertEqual(len(res.data["tags"]), 3)
+        # the recipe and its tags, no ingredients
+        self.assertEqual(len(ctx.captured_queries), 2)
+        recipe_sql = ctx.captured_queries[0]["sql"]
+        self.assertNotIn('"core_recipe"."title"', recipe_sql)
+        self.assertNotIn('"core_recipe"."search_vector"', recipe_sql)
+
+    def test_detail_related_fields_only(self):
+        """Test requesting only relations loads no other recipe columns."""
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(
+                detail_url(self.recipe.id), {"fields": "tags"}
+            )
+
+        self.assertEqual(set(res.data), {"tags"})
+        self.assertEqual(len(res.data["tags"]), 3)
+        recipe_sql = ctx.captured_queries[0]["sql"]
+        self.assertIn('"core_recipe"."id"', recipe_sql)
+        self.assertNotIn('"core_recipe"."title"', recipe_sql)
+        self.assertNotIn('"core_recipe"."search_vector"', recipe_sql)
+
+    def test_unknown_fields_error(self):
+        """Test unknown fields and relations are rejected."""
+        for params in (
+            {"fields": "id,secret"},
+            {"expand": "title"},
+            {"fields": "description"},
+        ):
+            with self.subTest(params):
+                res = self.client.get(RECIPES_URL, params)
+
+                self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
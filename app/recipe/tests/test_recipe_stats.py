@@ -0,0 +1,430 @@
+"""
+Tests for the recipe statistics API and its rollups.
+"""
+
+import os
+import shutil
+import statistics
+import tempfile
+import threading
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Ingredient,
+    Recipe,
+    RecipePriceCount,
+    RecipeStats,
+    RecipeTimeCount,
+    Tag,
+)
+from recipe import stats
+
+STATS_URL = reverse("recipe:recipe-stats")
+RECIPES_URL = reverse("recipe:recipe-list")
+BULK_URL = reverse("recipe:recipe-bulk")
+
+
+def detail_url(recipe_id):
+    """Create and return a recipe detail URL."""
+    return reverse("recipe:recipe-detail", args=[recipe_id])
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe."""
+    defaults = {
+        "title": "Sample recipe title",
+        "time_minutes": 22,
+        "price": Decimal("5.25"),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+def rollups(user):
+    """Return the stored rollups of a user in a comparable form"""
+    totals = RecipeStats.objects.filter(user=user, recipe_count__gt=0)
+    return {
+        "totals": list(
+            totals.values_list(
+                "recipe_count", "time_minutes_total", "price_total"
+            )
+        ),
+        "times": sorted(
+            RecipeTimeCount.objects.filter(
+                user=user, recipe_count__gt=0
+            ).values_list("time_minutes", "recipe_count")
+        ),
+        "prices": sorted(
+            RecipePriceCount.objects.filter(
+                user=user, recipe_count__gt=0
+            ).values_list("bucket", "recipe_count")
+        ),
+        "tags": sorted(
+            Tag.objects.filter(user=user).values_list("id", "recipe_count")
+        ),
+        "ingredients": sorted(
+            Ingredient.objects.filter(user=user).values_list(
+                "id", "recipe_count"
+            )
+        ),
+    }
+
+
+class MedianTests(SimpleTestCase):
+    """Test medians computed from time histograms."""
+
+    def test_matches_statistics_median(self):
+        """Test the histogram median equals the median of the values."""
+        for values in ([5], [5, 10], [1, 2, 2, 9], [3, 3, 3, 4, 8, 8, 20]):
+            with self.subTest(values):
+                histogram = sorted(
+                    (value, values.count(value)) for value in set(values)
+                )
+                self.assertEqual(
+                    stats._median(histogram), statistics.median(values)
+                )
+
+    def test_no_recipes(self):
+        """Test there is no median without recipes."""
+        self.assertIsNone(stats._median([]))
+
+
+class PublicRecipeStatsApiTests(TestCase):
+    """Test unauthenticated statistics requests."""
+
+    def test_auth_required(self):
+        """Test auth is required to read statistics."""
+        res = APIClient().get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateRecipeStatsApiTests(TestCase):
+    """Test authenticated statistics requests."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="user@example.com", password="test123"
+        )
+        self.client.force_authenticate(self.user)
+
+    def assertRollupsCurrent(self):
+        """Assert the rollups equal those rebuilt from the recipes."""
+        kept = rollups(self.user)
+        stats.rebuild([self.user.id])
+        self.assertEqual(kept, rollups(self.user))
+
+    def test_no_recipes(self):
+        """Test statistics of a user without recipes."""
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["recipe_count"], 0)
+        self.assertEqual(
+            res.data["time_minutes"], {"average": None, "median": None}
+        )
+        self.assertIsNone(res.data["price"]["average"])
+        self.assertEqual(
+            {
+                bucket["recipe_count"]
+                for bucket in res.data["price"]["distribution"]
+            },
+            {0},
+        )
+        self.assertEqual(res.data["top_tags"], [])
+
+    def test_statistics(self):
+        """Test counts, averages, medians, buckets and top usage."""
+        dinner = Tag.objects.create(user=self.user, name="Dinner")
+        quick = Tag.objects.create(user=self.user, name="Quick")
+        Tag.objects.create(user=self.user, name="Unused")
+        salt = Ingredient.objects.create(user=self.user, name="Salt")
+        for minutes, price, tags in (
+            (10, "1.00", [dinner, quick]),
+            (20, "7.50", [dinner]),
+            (30, "7.50", [dinner]),
+            (45, "120.00", [quick]),
+        ):
+            recipe = create_recipe(
+                self.user, time_minutes=minutes, price=Decimal(price)
+            )
+            recipe.tags.add(*tags)
+            recipe.ingredient.add(salt)
+        other = get_user_model().objects.create_user(
+            email="other@example.com", password="test123"
+        )
+        create_recipe(other, time_minutes=500, price=Decimal("999.99"))
+
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.data["recipe_count"], 4)
+        self.assertEqual(
+            res.data["time_minutes"], {"average": 26.25, "median": 25}
+        )
+        self.assertEqual(res.data["price"]["average"], "34.00")
+        self.assertEqual(
+            [
+                (bucket["min"], bucket["max"], bucket["recipe_count"])
+                for bucket in res.data["price"]["distribution"]
+            ],
+            [
+                (None, "0.00", 0),
+                ("0.00", "5.00", 1),
+                ("5.00", "10.00", 2),
+                ("10.00", "20.00", 0),
+                ("20.00", "50.00", 0),
+                ("50.00", "100.00", 0),
+                ("100.00", None, 1),
+            ],
+        )
+        self.assertEqual(
+            res.data["top_tags"],
+            [
+                {"id": dinner.id, "name": "Dinner", "recipe_count": 3},
+                {"id": quick.id, "name": "Quick", "recipe_count": 2},
+            ],
+        )
+        self.assertEqual(
+            res.data["top_ingredients"],
+            [{"id": salt.id, "name": "Salt", "recipe_count": 4}],
+        )
+
+    @override_settings(RECIPE_RESPONSE_CACHE={"ENABLED": False})
+    def test_queries_do_not_grow_with_recipes(self):
+        """Test statistics are read with a fixed number of queries."""
+        for index in range(20):
+            recipe = create_recipe(self.user, time_minutes=index)
+            recipe.tags.add(
+                Tag.objects.create(user=self.user, name=f"Tag {index}")
+            )
+
+        with self.assertNumQueries(5):
+            self.client.get(STATS_URL)
+
+    def test_api_writes_keep_rollups(self):
+        """Test creating, updating and deleting through the API."""
+        payload = {
+            "title": "Soup",
+            "time_minutes": 30,
+            "price": "4.00",
+            "tags": [{"name": "Dinner"}, {"name": "Quick"}],
+            "ingredient": [{"name": "Water"}],
+        }
+        res = self.client.post(RECIPES_URL, payload, format="json")
+        recipe_id = res.data["id"]
+        create_recipe(self.user, time_minutes=30)
+        self.assertRollupsCurrent()
+
+        self.client.patch(
+            detail_url(recipe_id),
+            {"time_minutes": 40, "price": "60.00"},
+            format="json",
+        )
+        self.assertRollupsCurrent()
+
+        self.client.patch(
+            detail_url(recipe_id),
+            {"tags": [{"name": "Quick"}, {"name": "Slow"}]},
+            format="json",
+        )
+        self.assertRollupsCurrent()
+
+        self.client.delete(detail_url(recipe_id))
+        self.assertRollupsCurrent()
+        self.assertEqual(
+            RecipeStats.objects.get(user=self.user).recipe_count, 1
+        )
+
+    def test_relation_changes_keep_usage(self):
+        """Test adding, removing and clearing links from both sides."""
+        recipe = create_recipe(self.user)
+        other = create_recipe(self.user)
+        tag = Tag.objects.create(user=self.user, name="Dinner")
+        unused = Tag.objects.create(user=self.user, name="Unused")
+
+        recipe.tags.add(tag, unused)
+        recipe.tags.add(tag)
+        recipe.tags.remove(unused)
+        recipe.tags.remove(unused)
+        self.assertRollupsCurrent()
+
+        tag.recipe_set.add(other)
+        self.assertRollupsCurrent()
+        tag.recipe_set.remove(recipe)
+        self.assertRollupsCurrent()
+        other.tags.clear()
+        self.assertRollupsCurrent()
+        tag.refresh_from_db()
+        self.assertEqual(tag.recipe_count, 0)
+
+    def test_save_without_changes(self):
+        """Test saving an unchanged recipe leaves the rollups alone."""
+        recipe = create_recipe(self.user)
+        recipe.title = "Renamed"
+
+        with self.assertNumQueries(2):
+            recipe.save()
+        self.assertRollupsCurrent()
+
+    def test_bulk_writes_keep_rollups(self):
+        """Test the bulk API, which sends no signals, keeps rollups."""
+        payload = [
+            {
+                "title": f"Recipe {index}",
+                "time_minutes": 10 + index,
+                "price": "2.50",
+                "tags": [{"name": "Dinner"}, {"name": f"Tag {index}"}],
+            }
+            for index in range(3)
+        ]
+        self.client.post(BULK_URL, payload, format="json")
+        ids = list(
+            Recipe.objects.filter(user=self.user).values_list("id", flat=True)
+        )
+        self.assertRollupsCurrent()
+
+        self.client.patch(
+            BULK_URL,
+            [
+                {"id": ids[0], "price": "25.00", "tags": [{"name": "New"}]},
+                {"id": ids[1], "title": "Renamed"},
+            ],
+            format="json",
+        )
+        self.assertRollupsCurrent()
+
+        self.client.delete(BULK_URL, ids[:2], format="json")
+        self.assertRollupsCurrent()
+        self.assertEqual(
+            RecipeStats.objects.get(user=self.user).recipe_count, 1
+        )
+
+    def test_import_keeps_rollups(self):
+        """Test imported recipes are counted."""
+        Tag.objects.create(user=self.user, name="Dinner")
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, "recipes.csv")
+        with open(path, "w", encoding="utf-8") as output:
+            output.write(
+                "title,time_minutes,price,tags,ingredients\n"
+                "Pasta,20,5.50,Dinner;Quick,Flour\n"
+                "Soup,30,4.00,Dinner,Water\n"
+            )
+
+        call_command(
+            "import_recipes", path, email=self.user.email, stdout=StringIO()
+        )
+
+        self.assertRollupsCurrent()
+        self.assertEqual(
+            Tag.objects.get(user=self.user, name="Dinner").recipe_count, 2
+        )
+
+    def test_delete_user(self):
+        """Test users with recipes can be deleted."""
+        recipe = create_recipe(self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name="Dinner"))
+
+        self.user.delete()
+
+        connection.check_constraints()
+        self.assertFalse(RecipeStats.objects.exists())
+        self.assertFalse(RecipeTimeCount.objects.exists())
+
+    def test_delete_user_queries_constant(self):
+        """Test deleting a user runs the same queries for any recipe count."""
+        counts = []
+        for size in (1, 10):
+            user = get_user_model().objects.create_user(
+                email=f"user{size}@example.com", password="test123"
+            )
+            tag = Tag.objects.create(user=user, name="Dinner")
+            for _ in range(size):
+                create_recipe(user).tags.add(tag)
+
+            with CaptureQueriesContext(connection) as queries:
+                user.delete()
+
+            counts.append(len(queries))
+
+        self.assertEqual(counts[0], counts[1])
+        connection.check_constraints()
+
+    def test_rebuild_command(self):
+        """Test the rebuild command repairs lost rollups."""
+        recipe = create_recipe(self.user, price=Decimal("12.00"))
+        recipe.tags.add(Tag.objects.create(user=self.user, name="Dinner"))
+        expected = self.client.get(STATS_URL).data
+        RecipeStats.objects.all().delete()
+        RecipePriceCount.objects.all().delete()
+        Tag.objects.update(recipe_count=0)
+
+        out = StringIO()
+        call_command("rebuild_recipe_stats", stdout=out)
+
+        self.assertIn("Rebuilt statistics of 1 users", out.getvalue())
+        self.assertEqual(self.client.get(STATS_URL).data, expected)
+
+
+class ConcurrentRecipeStatsTests(TransactionTestCase):
+    """Test concurrent writes keep the rollups.
+
+    Each writer uses its own database connection, so writes must be
+    committed rather than held in a test transaction.
+    """
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="user@example.com", password="test123"
+        )
+
+    def test_concurrent_updates(self):
+        """Test an update waits for one in progress to read old values."""
+        recipe = create_recipe(self.user)
+        saved = threading.Event()
+        release = threading.Event()
+
+        def update(price, hold):
+            try:
+                with transaction.atomic():
+                    copy = Recipe.objects.get(id=recipe.id)
+                    copy.price = Decimal(price)
+                    copy.save()
+                    if hold:
+                        saved.set()
+                        release.wait(10)
+            finally:
+                connections.close_all()
+
+        first = threading.Thread(target=update, args=("60.00", True))
+        first.start()
+        saved.wait(10)
+        second = threading.Thread(target=update, args=("30.00", False))
+        second.start()
+        # the second update reaches its read before the first commits
+        second.join(0.5)
+        release.set()
+        first.join()
+        second.join()
+
+        kept = rollups(self.user)
+        stats.rebuild([self.user.id])
+        self.assertEqual(kept, rollups(self.user))
@@ -0,0 +1,195 @@
+"""
+Tests for cached recipe and tag responses.
+"""
+
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Recipe,
+    Tag,
+)
+from recipe.cache import get_version
+from recipe.checks import check_response_cache
+
+RECIPES_URL = reverse("recipe:recipe-list")
+TAGS_URL = reverse("recipe:tag-list")
+
+
+def detail_url(recipe_id):
+    """Create and return a recipe detail URL."""
+    return reverse("recipe:recipe-detail", args=[recipe_id])
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe."""
+    defaults = {
+        "title": "Sample recipe title",
+        "time_minutes": 22,
+        "price": Decimal("5.25"),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+@override_settings(RECIPE_RESPONSE_CACHE={"ENABLED": True})
+class ResponseCacheTests(TestCase):
+    """Test responses are cached until the user's data changes."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="user@example.com", password="test123"
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_list_served_from_cache(self):
+        """Test a repeated list request runs no queries."""
+        create_recipe(self.user)
+        first = self.client.get(RECIPES_URL)
+
+        with self.assertNumQueries(0):
+            second = self.client.get(RECIPES_URL)
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data, first.data)
+
+    def test_recipe_write_invalidates(self):
+        """Test creating a recipe through the API refreshes the list."""
+        self.client.get(RECIPES_URL)
+
+        payload = {"title": "New", "time_minutes": 5, "price": "1.00"}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(RECIPES_URL, payload)
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual([recipe["title"] for recipe in res.data], ["New"])
+
+    def test_tag_rename_invalidates_recipes(self):
+        """Test renaming a tag refreshes recipes using it."""
+        recipe = create_recipe(self.user)
+        tag = Tag.objects.create(user=self.user, name="Old")
+        recipe.tags.add(tag)
+        self.client.get(detail_url(recipe.id))
+
+        tag.name = "New"
+        with self.captureOnCommitCallbacks(execute=True):
+            tag.save()
+        res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res.data["tags"][0]["name"], "New")
+
+    def test_relation_change_invalidates(self):
+        """Test adding a tag to a recipe refreshes the tag list."""
+        recipe = create_recipe(self.user)
+        tag = Tag.objects.create(user=self.user, name="Lunch")
+        self.client.get(detail_url(recipe.id))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.tags.add(tag)
+        res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(len(res.data["tags"]), 1)
+
+    def test_invalidated_on_commit(self):
+        """Test writes invalidate only once their transaction commits."""
+        recipe = create_recipe(self.user)
+        tag = Tag.objects.create(user=self.user, name="Lunch")
+        version = get_version(self.user.id)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            recipe.tags.add(tag)
+            tag.name = "Dinner"
+            tag.save()
+            recipe.delete()
+
+        self.assertEqual(get_version(self.user.id), version)
+        for callback in callbacks:
+            callback()
+        self.assertGreater(get_version(self.user.id), version)
+
+    def test_bulk_write_invalidates(self):
+        """Test the bulk endpoint refreshes cached lists."""
+        self.client.get(RECIPES_URL)
+
+        payload = [{"title": "Bulk", "time_minutes": 5, "price": "1.00"}]
+        self.client.post(reverse("recipe:recipe-bulk"), payload, format="json")
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(len(res.data), 1)
+
+    def test_cache_separated_per_user(self):
+        """Test users never see each other's cached responses."""
+        create_recipe(self.user)
+        self.client.get(RECIPES_URL)
+
+        other = get_user_model().objects.create_user(
+            email="other@example.com", password="test123"
+        )
+        self.client.force_authenticate(other)
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.data, [])
+
+    def test_etag_not_modified(self):
+        """Test a matching If-None-Match returns 304 without queries."""
+        Tag.objects.create(user=self.user, name="Vegan")
+        res = self.client.get(TAGS_URL)
+        etag = res["ETag"]
+
+        with self.assertNumQueries(0):
+            res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Tag.objects.create(user=self.user, name="Dessert")
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res["ETag"], etag)
+
+    @override_settings(RECIPE_RESPONSE_CACHE={"ENABLED": False})
+    def test_cache_disabled(self):
+        """Test responses are computed every time when disabled."""
+        create_recipe(self.user)
+        self.client.get(RECIPES_URL)
+
+        with self.assertNumQueries(3):
+            res = self.client.get(RECIPES_URL)
+
+        self.assertNotIn("ETag", res)
+
+
+class ResponseCacheCheckTests(SimpleTestCase):
+    """Test the system check of the response cache settings."""
+
+    def test_local_cache_warned(self):
+        """Test enabling the cache on a per process backend warns."""
+        with override_settings(RECIPE_RESPONSE_CACHE={"ENABLED": True}):
+            errors = check_response_cache(None)
+
+        self.assertEqual([error.id for error in errors], ["recipe.W001"])
+
+    def test_shared_or_disabled_cache_accepted(self):
+        """Test shared or disabled caches pass."""
+        shared = {
+            "default": {
+                "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+                "LOCATION": "recipe_cache",
+            }
+        }
+        for options in (
+            {"RECIPE_RESPONSE_CACHE": {"ENABLED": False}},
+            {"RECIPE_RESPONSE_CACHE": {"ENABLED": True}, "CACHES": shared},
+        ):
+            with self.subTest(options), override_settings(**options):
+                self.assertEqual(check_response_cache(None), [])
@@ -2,7 +2,11 @@
 Tests for the tags API.
 """
 
+from decimal import Decimal
+from io import StringIO
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.urls import reverse
 from django.test import TestCase
 
@@ -11,10 +15,10 @@ from rest_framework.test import APIClient
 
 from core.models import (
     Tag,
+    Recipe,
 )
 
-from recipe.serializers import TagSerializer
-
+from recipe.serializers import TagUsageSerializer
 
 TAGS_URL = reverse("recipe:tag-list")
 
@@ -24,6 +28,15 @@ def detail_url(tag_id):
     return reverse("recipe:tag-detail", args=[tag_id])
 
 
+def create_recipe(user, *tags):
+    """Create and return a recipe using the given tags."""
+    recipe = Recipe.objects.create(
+        user=user, title="Sample recipe", time_minutes=5, price=Decimal("4.50")
+    )
+    recipe.tags.add(*tags)
+    return recipe
+
+
 def create_user(email="user@example.com", password="testpass123"):
     """Create and return a user."""
     return get_user_model().objects.create_user(email=email, password=password)
@@ -58,7 +71,7 @@ class PrivateTagsApiTests(TestCase):
         res = self.client.get(TAGS_URL)
 
         tags = Tag.objects.all().order_by("-name")
-        serializer = TagSerializer(tags, many=True)
+        serializer = TagUsageSerializer(tags, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data, serializer.data)
 
@@ -87,6 +100,17 @@ class PrivateTagsApiTests(TestCase):
         tag.refresh_from_db()
         self.assertEqual(tag.name, payload["name"])
 
+    def test_update_tag_duplicate_name_error(self):
+        """Test renaming a tag to an existing name returns an error."""
+        Tag.objects.create(user=self.user, name="Vegan")
+        tag = Tag.objects.create(user=self.user, name="Vegetarian")
+
+        res = self.client.patch(detail_url(tag.id), {"name": "Vegan"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, "Vegetarian")
+
     def test_delete_tag(self):
         """Delete a tag"""
 
@@ -95,3 +119,95 @@ class PrivateTagsApiTests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
         self.assertFalse(Tag.objects.filter(id=tag.id).exists())
+
+    def test_tags_paginated_by_cursor(self):
+        """Test listing tags page by page with a cursor."""
+        for name in ["Apple", "Banana", "Cherry"]:
+            Tag.objects.create(user=self.user, name=name)
+
+        res = self.client.get(TAGS_URL, {"page_size": 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        names = [tag["name"] for tag in res.data["results"]]
+        self.assertEqual(names, ["Cherry", "Banana"])
+
+        res = self.client.get(res.data["next"])
+
+        names = [tag["name"] for tag in res.data["results"]]
+        self.assertEqual(names, ["Apple"])
+        self.assertIsNone(res.data["next"])
+
+    def test_recipe_count(self):
+        """Test listed tags include the number of recipes using them."""
+        used = Tag.objects.create(user=self.user, name="Used")
+        unused = Tag.objects.create(user=self.user, name="Unused")
+        create_recipe(self.user, used)
+        create_recipe(self.user, used)
+
+        res = self.client.get(TAGS_URL)
+
+        counts = {item["id"]: item["recipe_count"] for item in res.data}
+        self.assertEqual(counts, {used.id: 2, unused.id: 0})
+
+    def test_filter_assigned_only(self):
+        """Test listing only tags assigned to recipes."""
+        used = Tag.objects.create(user=self.user, name="Used")
+        Tag.objects.create(user=self.user, name="Unused")
+        create_recipe(self.user, used)
+        create_recipe(self.user, used)
+
+        res = self.client.get(TAGS_URL, {"assigned_only": 1})
+
+        self.assertEqual([item["id"] for item in res.data], [used.id])
+
+    def test_order_by_recipe_count(self):
+        """Test the most used tags come first, ties by name."""
+        a, b, c = (
+            Tag.objects.create(user=self.user, name=name)
+            for name in ["Apple", "Banana", "Cherry"]
+        )
+        create_recipe(self.user, a, b)
+        create_recipe(self.user, b)
+        create_recipe(self.user, c)
+
+        res = self.client.get(TAGS_URL, {"ordering": "-recipe_count"})
+
+        names = [item["name"] for item in res.data]
+        self.assertEqual(names, ["Banana", "Cherry", "Apple"])
+
+        res = self.client.get(
+            TAGS_URL, {"ordering": "-recipe_count", "page_size": 2}
+        )
+        names = [item["name"] for item in res.data["results"]]
+        res = self.client.get(res.data["next"])
+        names += [item["name"] for item in res.data["results"]]
+        self.assertEqual(names, ["Banana", "Cherry", "Apple"])
+
+    def test_invalid_list_parameters(self):
+        """Test unknown orderings and assigned_only values are rejected."""
+        for params in ({"ordering": "user"}, {"assigned_only": "yes"}):
+            with self.subTest(params):
+                res = self.client.get(TAGS_URL, params)
+
+                self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BenchmarkTagUsageTests(TestCase):
+    """Test the tag usage benchmark command."""
+
+    def test_reports_and_cleans_up(self):
+        """Test each listing is timed and the synthetic data removed."""
+        out = StringIO()
+
+        call_command(
+            "benchmark_tag_usage",
+            tags=20,
+            recipes=10,
+            iterations=1,
+            stdout=out,
+        )
+
+        self.assertIn("query reading counters: p50", out.getvalue())
+        self.assertIn("GET tags by name: p50", out.getvalue())
+        self.assertFalse(Tag.objects.exists())
+        self.assertFalse(get_user_model().objects.exists())
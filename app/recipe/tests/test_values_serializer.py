@@ -0,0 +1,117 @@
+"""
+Tests for serializing recipe lists from rows.
+"""
+
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+from recipe.serializers import RecipeSerializer, value_fields
+
+RECIPES_URL = reverse("recipe:recipe-list")
+
+
+def render(data):
+    """Return the JSON bytes of serialized data."""
+    return JSONRenderer().render(data)
+
+
+@override_settings(RECIPE_RESPONSE_CACHE={"ENABLED": False})
+class ValuesListSerializerTests(TestCase):
+    """Test the row path renders the same JSON as the instance path."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="user@example.com", password="test123"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ("Vegan", "Dinner", 'Ünïcode "quoted"')
+        ]
+        ingredients = [
+            Ingredient.objects.create(user=self.user, name=name)
+            for name in ("Salt", "Kale")
+        ]
+        for index in range(12):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f"Recipe {index} – ☃",
+                time_minutes=index,
+                price=Decimal(index * 7) / 4,
+                link="" if index % 2 else f"https://example.com/{index}",
+                description="Not listed",
+            )
+            recipe.tags.set(tags[: index % 4])
+            start = index % 3
+            recipe.ingredient.set(ingredients[start:])
+
+    def instance_json(self, queryset):
+        """Return the JSON of the instance path for a queryset."""
+        recipes = queryset.prefetch_related("tags", "ingredient")
+        return render(RecipeSerializer(recipes, many=True).data)
+
+    def test_rows_match_instances(self):
+        """Test serializing rows gives byte identical JSON."""
+        queryset = Recipe.objects.filter(user=self.user).order_by("-id")
+        rows = queryset.values(*value_fields(RecipeSerializer()))
+
+        self.assertEqual(
+            render(RecipeSerializer(rows, many=True).data),
+            self.instance_json(queryset),
+        )
+
+    def test_list_response_matches_instances(self):
+        """Test list responses are unchanged, with and without pages."""
+        queryset = Recipe.objects.filter(user=self.user).order_by("-id")
+        expected = self.instance_json(queryset)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.content, expected)
+
+        res = self.client.get(RECIPES_URL, {"page_size": 5})
+
+        self.assertEqual(
+            render(res.data["results"]), self.instance_json(queryset[:5])
+        )
+        res = self.client.get(res.data["next"])
+        self.assertEqual(
+            render(res.data["results"]), self.instance_json(queryset[5:10])
+        )
+
+    def test_filtered_list_matches_instances(self):
+        """Test filtered and searched lists are unchanged."""
+        tag = Tag.objects.get(name="Dinner")
+        queryset = Recipe.objects.filter(user=self.user, tags=tag)
+
+        res = self.client.get(RECIPES_URL, {"tags": tag.id})
+
+        self.assertEqual(
+            res.content, self.instance_json(queryset.order_by("-id"))
+        )
+
+        res = self.client.get(RECIPES_URL, {"search": "recipe"})
+
+        self.assertEqual(len(res.data), 12)
+
+    def test_instances_use_field_path(self):
+        """Test lists of model instances are still serialized."""
+        recipe = Recipe.objects.filter(user=self.user).first()
+
+        data = RecipeSerializer([recipe], many=True).data
+
+        self.assertEqual(data[0]["id"], recipe.id)
+
+    def test_empty_list(self):
+        """Test an empty queryset serializes to an empty list."""
+        rows = Recipe.objects.none().values("id")
+
+        self.assertEqual(RecipeSerializer(rows, many=True).data, [])
@@ -9,12 +9,27 @@ from django.urls import (
 
 from rest_framework.routers import DefaultRouter
 
-from recipe import views
+from recipe import async_views, views
 
 router = DefaultRouter()
 router.register("recipe", views.RecipeViewSet)
 router.register("tags", views.TagViewSet)
+router.register("ingredients", views.IngredientViewSet)
 
 app_name = "recipe"
 
-urlpatterns = [path("", include(router.urls))]
+urlpatterns = [
+    # reads served from the bounded thread pool, for ASGI deployments
+    path(
+        "async/recipe/",
+        async_views.recipe_list,
+        name="async-recipe-list",
+    ),
+    path(
+        "async/recipe/<int:pk>/",
+        async_views.recipe_detail,
+        name="async-recipe-detail",
+    ),
+    path("async/tags/", async_views.tag_list, name="async-tag-list"),
+    path("", include(router.urls)),
+]
@@ -2,52 +2,392 @@
 Views for recipe APIS
 """
 
-from rest_framework import viewsets, mixins
-from rest_framework.authentication import TokenAuthentication
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import Count, F, FloatField, Prefetch
+from django.db.models.functions import Cast
+from django.http import StreamingHttpResponse
+
+from rest_framework import viewsets, mixins, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.serializers import as_serializer_error
+
+from core.db.replicas import ReplicaReadMixin
+from core.models import Ingredient, Recipe, Tag
+from recipe import bulk, export, images, serializers, stats
+from recipe.cache import CachedResponseMixin
+from recipe.pagination import NameCursorPagination, RecipeCursorPagination
+from user.authentication import CachedTokenAuthentication
+
+_NOT_FOUND = {"detail": "Not found."}
 
-from core.models import Recipe, Tag
-from recipe import serializers
 
+def _is_id(value):
+    """Return whether a JSON value can be a recipe id."""
+    # JSON booleans are parsed as ints
+    return isinstance(value, int) and not isinstance(value, bool)
 
-class RecipeViewSet(viewsets.ModelViewSet):
+
+class RecipeViewSet(
+    ReplicaReadMixin, CachedResponseMixin, viewsets.ModelViewSet
+):
     """ "View for manage recipe APIS."""
 
     serializer_class = serializers.RecipeDetailSerializer
     queryset = Recipe.objects.all()
+    pagination_class = RecipeCursorPagination
+    bulk_max_items = 10000
+    export_chunk_size = export.DEFAULT_CHUNK_SIZE
 
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
         """Retrieve Recipes for authenticated user."""
-        return self.queryset.filter(user=self.request.user).order_by("-id")
+        queryset = self.queryset.filter(user=self.request.user)
+
+        if self.action == "list":
+            queryset = self._filter_list(queryset)
+            # rows are serialized straight from the selected columns,
+            # relations are fetched by the list serializer, and only for
+            # the requested fields; the cursor position needs the sort keys
+            columns = serializers.value_fields(self.get_serializer())
+            keys = [field.lstrip("-") for field in self.get_ordering()]
+            return queryset.values(*dict.fromkeys([*keys, *columns]))
+
+        if self.action == "retrieve":
+            return self._select_requested(queryset)
+        return (
+            queryset.defer("search_vector")
+            .select_related("image")
+            .order_by("-id")
+        )
+
+    def _select_requested(self, queryset):
+        """Load only the columns and relations the response renders."""
+        serializer = self.get_serializer()
+        columns = serializers.value_fields(serializer)
+        joined = {
+            column.split("__")[0] for column in columns if "__" in column
+        }
+        # one query per relation instead of one per recipe
+        relations = []
+        for source, nested in serializers.nested_fields(serializer):
+            model = Recipe._meta.get_field(source).related_model
+            relations.append(
+                Prefetch(source, queryset=model.objects.only(*nested))
+            )
+        # with no columns named, only() would load every column
+        return (
+            queryset.select_related(*joined)
+            .only("id", *columns, *joined)
+            .prefetch_related(*relations)
+        )
+
+    def _filter_list(self, queryset):
+        """Apply the list filters and ordering."""
+        params = self.request.query_params
+        for param, through, field in (
+            ("tags", Recipe.tags.through, "tag_id"),
+            ("ingredients", Recipe.ingredient.through, "ingredient_id"),
+        ):
+            if params.get(param):
+                queryset = self._filter_related(
+                    queryset,
+                    through,
+                    field,
+                    self._params_to_ints(param),
+                    self._match_mode(f"{param}_match"),
+                )
+
+        search = params.get("search")
+        if search:
+            queryset = self._search(queryset, search)
+        return queryset.order_by(*self.get_ordering())
+
+    def get_ordering(self):
+        """Return the fields listings are sorted by."""
+        if self.action == "list" and self.request.query_params.get("search"):
+            return ("-rank", "-id")
+        return ("-id",)
+
+    def get_serializer(self, *args, **kwargs):
+        """Pass the requested fields to the serializers of reads."""
+        if self.action in ("list", "retrieve"):
+            for param in ("fields", "expand"):
+                kwargs.setdefault(param, self._params_to_names(param))
+        return super().get_serializer(*args, **kwargs)
+
+    def _params_to_names(self, param):
+        """Convert a comma separated list of names, if given."""
+        value = self.request.query_params.get(param)
+        if value is None:
+            return None
+        return [name.strip() for name in value.split(",") if name.strip()]
+
+    def _params_to_ints(self, param):
+        """Convert a comma separated list of ids to integers."""
+        try:
+            return {
+                int(value)
+                for value in self.request.query_params[param].split(",")
+            }
+        except ValueError:
+            raise ValidationError({param: "Expected comma separated ids."})
+
+    def _match_mode(self, param):
+        """Return whether any or all of the given ids must match."""
+        mode = self.request.query_params.get(param, "any")
+        if mode not in ("any", "all"):
+            raise ValidationError({param: "Expected 'any' or 'all'."})
+        return mode
+
+    def _filter_related(self, queryset, through, field, ids, match):
+        """Filter recipes linked to any or all of the ids.
+
+        Both modes use a single subquery on the through table, so all-of
+        does not turn into one join per id.
+        """
+        rows = through.objects.filter(**{f"{field}__in": ids})
+        if match == "all":
+            rows = (
+                rows.values("recipe_id")
+                .annotate(matched=Count(field))
+                .filter(matched=len(ids))
+            )
+        return queryset.filter(id__in=rows.values("recipe_id"))
+
+    def _search(self, queryset, terms):
+        """Filter recipes by full text search, best matches first."""
+        query = SearchQuery(
+            terms, search_type="websearch", config=Recipe.SEARCH_CONFIG
+        )
+        # read back as a double, so cursor positions compare exactly
+        rank = Cast(SearchRank(F("search_vector"), query), FloatField())
+        return queryset.filter(search_vector=query).annotate(rank=rank)
 
     def get_serializer_class(self):
         """Retrieve serializers class for request"""
 
         if self.action == "list":
             return serializers.RecipeSerializer
+        if self.action == "upload_image":
+            return serializers.RecipeImageSerializer
         return self.serializer_class
 
+    def initialize_request(self, request, *args, **kwargs):
+        """Stream uploaded images to disk, hashing them as they arrive."""
+        request = super().initialize_request(request, *args, **kwargs)
+        if self.action == "upload_image":
+            request._request.upload_handlers = [
+                images.HashingUploadHandler(request._request)
+            ]
+        return request
+
     def perform_create(self, serializer):
         """Set user for new recipe"""
         serializer.save(user=self.request.user)
 
+    @action(methods=["POST", "PATCH", "DELETE"], detail=False, url_path="bulk")
+    def bulk(self, request):
+        """Create, update or delete a batch of recipes in one transaction."""
+        items = request.data
+        if not isinstance(items, list):
+            raise ValidationError({"detail": "Expected a list of items."})
+        if len(items) > self.bulk_max_items:
+            raise ValidationError(
+                {"detail": f"At most {self.bulk_max_items} items allowed."}
+            )
+
+        if request.method == "POST":
+            results = self._bulk_create(items)
+            success_status = status.HTTP_201_CREATED
+        elif request.method == "PATCH":
+            results = self._bulk_update(items)
+            success_status = status.HTTP_200_OK
+        else:
+            results = self._bulk_delete(items)
+            success_status = status.HTTP_200_OK
+
+        failed = sum(1 for result in results if result["status"] == "error")
+        if not failed:
+            response_status = success_status
+        elif failed == len(results):
+            response_status = status.HTTP_400_BAD_REQUEST
+        else:
+            response_status = status.HTTP_207_MULTI_STATUS
+        return Response({"results": results}, status=response_status)
+
+    @action(
+        methods=["POST"],
+        detail=True,
+        url_path="upload-image",
+        parser_classes=[MultiPartParser],
+    )
+    def upload_image(self, request, pk=None):
+        """Upload an image to a recipe, its thumbnail follows later."""
+        serializer = self.get_serializer(self.get_object(), data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_200_OK)
 
-class TagViewSet(
+    @action(methods=["GET"], detail=False, url_path="export")
+    def export(self, request):
+        """Stream all of the user's recipes as NDJSON."""
+        lines = export.export_recipes(
+            export.user_recipes(request.user), self.export_chunk_size
+        )
+        response = StreamingHttpResponse(
+            lines, content_type=export.CONTENT_TYPE
+        )
+        response["Content-Disposition"] = (
+            'attachment; filename="recipes.ndjson"'
+        )
+        return response
+
+    @action(methods=["GET"], detail=False, url_path="stats", url_name="stats")
+    def statistics(self, request):
+        """Return statistics of the user's recipes from the rollups."""
+        return self._cached_response(
+            lambda request: Response(stats.user_stats(request.user)), request
+        )
+
+    def _bulk_validate(self, item, serializer):
+        """Validate one item, returning (validated_data, errors)"""
+        try:
+            return serializer.run_validation(item), None
+        except ValidationError as exc:
+            return None, as_serializer_error(exc)
+
+    def _bulk_create(self, items):
+        """Validate and create recipes, returning per item results"""
+        # a single serializer is reused so fields are only built once
+        serializer = self.get_serializer()
+        results = []
+        valid = []
+        for item in items:
+            data, errors = self._bulk_validate(item, serializer)
+            if errors is None:
+                valid.append(data)
+                results.append({"status": "created"})
+            else:
+                results.append({"status": "error", "errors": errors})
+
+        recipes = iter(bulk.create_recipes(self.request.user, valid))
+        for result in results:
+            if result["status"] == "created":
+                result["id"] = next(recipes).id
+        return results
+
+    def _bulk_update(self, items):
+        """Validate and partially update recipes by id"""
+        ids = [item.get("id") for item in items if isinstance(item, dict)]
+        instances = (
+            self.get_queryset()
+            .filter(id__in=[pk for pk in ids if isinstance(pk, int)])
+            .in_bulk()
+        )
+
+        serializer = self.get_serializer(partial=True)
+        results = []
+        updates = []
+        for item in items:
+            pk = item.get("id") if isinstance(item, dict) else None
+            instance = instances.get(pk) if isinstance(pk, int) else None
+            if instance is None:
+                results.append(
+                    {"id": pk, "status": "error", "errors": _NOT_FOUND}
+                )
+                continue
+
+            data, errors = self._bulk_validate(item, serializer)
+            if errors is None:
+                updates.append((instance, data))
+                results.append({"id": pk, "status": "updated"})
+            else:
+                results.append({"id": pk, "status": "error", "errors": errors})
+
+        bulk.update_recipes(self.request.user, updates)
+        return results
+
+    def _bulk_delete(self, ids):
+        """Delete recipes by id"""
+        deleted = bulk.delete_recipes(
+            self.request.user, [pk for pk in ids if _is_id(pk)]
+        )
+        results = []
+        for pk in ids:
+            if not _is_id(pk):
+                errors = {"detail": "Expected a recipe id."}
+            elif pk not in deleted:
+                errors = _NOT_FOUND
+            else:
+                results.append({"id": pk, "status": "deleted"})
+                continue
+            results.append({"id": pk, "status": "error", "errors": errors})
+        return results
+
+
+class BaseRecipeAttrViewSet(
+    ReplicaReadMixin,
+    CachedResponseMixin,
     mixins.DestroyModelMixin,
     mixins.UpdateModelMixin,
     mixins.ListModelMixin,
     viewsets.GenericViewSet,
 ):
-    """Manage tags in the database."""
+    """Base viewset for recipe attributes."""
 
-    serializer_class = serializers.TagSerializer
-    queryset = Tag.objects.all()
-    authentication_classes = [TokenAuthentication]
+    pagination_class = NameCursorPagination
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    # values of the ordering parameter and the fields they sort by
+    orderings = {
+        "-name": ("-name",),
+        "name": ("name",),
+        "-recipe_count": ("-recipe_count", "-name"),
+        "recipe_count": ("recipe_count", "name"),
+    }
 
     def get_queryset(self):
         """Filter queryset to authenticated user."""
-        return self.queryset.filter(user=self.request.user).order_by("-name")
+        queryset = self.queryset.filter(user=self.request.user)
+        if self.action == "list" and self._assigned_only():
+            # the counter column avoids joining the recipe through table
+            queryset = queryset.filter(recipe_count__gt=0)
+        return queryset.order_by(*self.get_ordering())
+
+    def get_ordering(self):
+        """Return the fields listings are sorted by."""
+        if self.action != "list":
+            return self.orderings["-name"]
+        ordering = self.request.query_params.get("ordering", "-name")
+        if ordering not in self.orderings:
+            raise ValidationError(
+                {"ordering": f"Expected one of {', '.join(self.orderings)}."}
+            )
+        return self.orderings[ordering]
+
+    def _assigned_only(self):
+        """Return whether only objects used by recipes are listed."""
+        value = self.request.query_params.get("assigned_only", "0")
+        if value not in ("0", "1"):
+            raise ValidationError({"assigned_only": "Expected 0 or 1."})
+        return value == "1"
+
+
+class TagViewSet(BaseRecipeAttrViewSet):
+    """Manage tags in the database."""
+
+    serializer_class = serializers.TagUsageSerializer
+    queryset = Tag.objects.all()
+
+
+class IngredientViewSet(BaseRecipeAttrViewSet):
+    """Manage ingredients in the database."""
+
+    serializer_class = serializers.IngredientUsageSerializer
+    queryset = Ingredient.objects.all()
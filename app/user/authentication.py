@@ -0,0 +1,211 @@
+"""
+Authentication for the API.
+"""
+
+import datetime
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+DEFAULT_TOKEN_AUTH_CACHE = {
+    "MAX_SIZE": 10000,
+    "TTL": 60,
+    "CACHE_ALIAS": None,
+}
+
+DEFAULT_TOKEN_EXPIRY = {
+    "TTL": 7 * 24 * 60 * 60,
+    "REFRESH_INTERVAL": 60 * 60,
+    "PURGE_BATCH_SIZE": 1000,
+}
+
+
+def get_expiry_options():
+    """Return the configured token expiry merged with the defaults"""
+    options = dict(DEFAULT_TOKEN_EXPIRY)
+    options.update(getattr(settings, "TOKEN_EXPIRY", {}))
+    return options
+
+
+def expiry_cutoff(now=None):
+    """Return the time before which tokens were last used to be expired"""
+    now = now or timezone.now()
+    return now - datetime.timedelta(seconds=get_expiry_options()["TTL"])
+
+
+def is_expired(token, now=None):
+    """Return whether a token was not used within the TTL"""
+    return token.created < expiry_cutoff(now)
+
+
+def refresh_token(token, now=None):
+    """Slide a token's expiry forward, writing at most once per interval.
+
+    The token's ``created`` time records its last refresh, so a token
+    expires TTL seconds after it was last used rather than issued.
+    """
+    now = now or timezone.now()
+    interval = datetime.timedelta(
+        seconds=get_expiry_options()["REFRESH_INTERVAL"]
+    )
+    if now - token.created < interval:
+        return False
+    Token.objects.filter(key=token.key).update(created=now)
+    token.created = now
+    return True
+
+
+def issue_token(user):
+    """Return the user's token, replacing it if it expired"""
+    # locked, so concurrent logins wait for a replaced token and return it
+    # rather than replacing it again
+    with transaction.atomic():
+        token, created = Token.objects.select_for_update().get_or_create(
+            user=user
+        )
+        if created:
+            return token
+        if is_expired(token):
+            token.delete()
+            return Token.objects.create(user=user)
+        refresh_token(token)
+        return token
+
+
+class LRUCache:
+    """Thread safe in-process LRU cache with expiring entries"""
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, ttl):
+        """Return the value for key or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if time.monotonic() - stored_at >= ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, max_size):
+        """Store a value, evicting the least recently used entries"""
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        """Remove a key if present"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Remove all entries"""
+        with self._lock:
+            self._entries.clear()
+
+
+class TokenCache:
+    """Two level token cache: per process LRU then an optional shared cache.
+
+    Invalidation reaches the local cache of the current process and the
+    shared cache. Other processes drop their local entries after ``TTL``
+    seconds, so keep it short when running several workers.
+    """
+
+    key_prefix = "auth:token:"
+
+    def __init__(self):
+        self.local = LRUCache()
+
+    @property
+    def options(self):
+        """Return the configured options merged with the defaults"""
+        options = dict(DEFAULT_TOKEN_AUTH_CACHE)
+        options.update(getattr(settings, "TOKEN_AUTH_CACHE", {}))
+        return options
+
+    def _shared(self):
+        """Return the shared Django cache or None if not configured"""
+        alias = self.options["CACHE_ALIAS"]
+        return caches[alias] if alias else None
+
+    def get(self, key):
+        """Return the cached token for key or None"""
+        options = self.options
+        # pickled so every request gets its own user instance
+        data = self.local.get(key, options["TTL"])
+        if data is not None:
+            return pickle.loads(data)
+
+        shared = self._shared()
+        token = shared.get(self.key_prefix + key) if shared else None
+        if token is not None:
+            self.local.set(key, pickle.dumps(token), options["MAX_SIZE"])
+        return token
+
+    def set(self, key, token):
+        """Cache a token with its user"""
+        options = self.options
+        self.local.set(key, pickle.dumps(token), options["MAX_SIZE"])
+        shared = self._shared()
+        if shared is not None:
+            shared.set(self.key_prefix + key, token, options["TTL"])
+
+    def delete(self, key):
+        """Forget a token"""
+        self.local.delete(key)
+        shared = self._shared()
+        if shared is not None:
+            shared.delete(self.key_prefix + key)
+
+    def delete_for_user(self, user_id):
+        """Forget all tokens of a user"""
+        for key in Token.objects.filter(user_id=user_id).values_list(
+            "key", flat=True
+        ):
+            self.delete(key)
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication resolving tokens from a cache.
+
+    Only successful lookups are cached; unknown tokens and inactive users
+    always go to the database. Tokens unused for longer than the TTL are
+    deleted and rejected.
+    """
+
+    def authenticate_credentials(self, key):
+        token = token_cache.get(key)
+        cached = token is not None
+        if not cached:
+            user, token = super().authenticate_credentials(key)
+
+        now = timezone.now()
+        if is_expired(token, now):
+            Token.objects.filter(key=key).delete()
+            token_cache.delete(key)
+            raise AuthenticationFailed("Token has expired.")
+
+        if refresh_token(token, now) or not cached:
+            token_cache.set(key, token)
+        return (token.user, token)
@@ -0,0 +1,111 @@
+"""
+Django command to benchmark logins with each password hasher strategy
+"""
+
+import os
+import statistics
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import authenticate, get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test.utils import override_settings
+
+BENCHMARK_EMAIL = "benchmark-hashers@example.com"
+PASSWORD = "benchmark-password-123"
+
+
+class Command(BaseCommand):
+    """Django command reporting logins/sec per core for each hasher"""
+
+    help = (
+        "Authenticate a user hashed with each strategy from concurrent "
+        "threads and report logins/sec, per core and latency."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--strategies",
+            nargs="+",
+            choices=sorted(settings.PASSWORD_HASHER_CHOICES),
+            default=sorted(settings.PASSWORD_HASHER_CHOICES),
+        )
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Concurrent login threads, defaults to the core count.",
+        )
+        parser.add_argument("--duration", type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        cores = os.cpu_count() or 1
+        self.stdout.write(
+            f"{cores} cores, {options['threads']} threads, hashing pool of "
+            f"{settings.PASSWORD_HASHING['MAX_WORKERS']} workers"
+        )
+        user, _ = get_user_model().objects.get_or_create(email=BENCHMARK_EMAIL)
+        try:
+            for strategy in options["strategies"]:
+                hasher = settings.PASSWORD_HASHER_CHOICES[strategy]
+                hashers = [hasher] + [
+                    other
+                    for other in settings.PASSWORD_HASHERS
+                    if other != hasher
+                ]
+                # the strategy must be preferred, or logins would rehash
+                with override_settings(PASSWORD_HASHERS=hashers):
+                    user.set_password(PASSWORD)
+                    user.save(update_fields=["password"])
+                    timings = self.run_logins(
+                        options["threads"], options["duration"]
+                    )
+                self.report(strategy, timings, options["duration"], cores)
+        finally:
+            user.delete()
+
+    def run_logins(self, threads, duration):
+        """Authenticate from concurrent threads, returning latencies"""
+        timings = []
+        lock = threading.Lock()
+        deadline = time.perf_counter() + duration
+
+        def login():
+            local = []
+            try:
+                while time.perf_counter() < deadline:
+                    start = time.perf_counter()
+                    user = authenticate(
+                        email=BENCHMARK_EMAIL, password=PASSWORD
+                    )
+                    if user is None:
+                        raise RuntimeError("Benchmark login failed")
+                    local.append((time.perf_counter() - start) * 1000)
+            finally:
+                connections.close_all()
+                with lock:
+                    timings.extend(local)
+
+        workers = [threading.Thread(target=login) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return timings
+
+    def report(self, strategy, timings, duration, cores):
+        """Write throughput and latency statistics"""
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        rate = len(timings) / duration
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{strategy}: {rate:.1f} logins/s, "
+                f"{rate / cores:.1f} logins/s/core, "
+                f"p50 {statistics.median(timings):.2f} ms, "
+                f"p95 {p95:.2f} ms"
+            )
+        )
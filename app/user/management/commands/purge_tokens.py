@@ -0,0 +1,68 @@
+"""
+Django command to delete expired auth tokens in batches
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from user.authentication import expiry_cutoff, get_expiry_options
+
+# the oldest tokens are found through authtoken_token_created_idx, and each
+# batch is its own short transaction so logins are never blocked for long
+PURGE_SQL = (
+    "DELETE FROM authtoken_token WHERE key IN ("
+    "SELECT key FROM authtoken_token WHERE created < %s "
+    "ORDER BY created LIMIT %s FOR UPDATE SKIP LOCKED)"
+)
+
+
+def purge_expired_tokens(batch_size, sleep=0, cutoff=None):
+    """Delete expired tokens batch by batch, yielding each batch's count"""
+    cutoff = cutoff or expiry_cutoff()
+    while True:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(PURGE_SQL, [cutoff, batch_size])
+            deleted = cursor.rowcount
+        if deleted:
+            yield deleted
+        if deleted < batch_size:
+            return
+        if sleep:
+            time.sleep(sleep)
+
+
+class Command(BaseCommand):
+    """Django command to purge tokens unused for longer than the TTL"""
+
+    help = "Delete expired auth tokens in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=get_expiry_options()["PURGE_BATCH_SIZE"],
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=0,
+            help="Seconds to pause between batches.",
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        total = 0
+        start = time.perf_counter()
+        for deleted in purge_expired_tokens(
+            options["batch_size"], options["sleep"]
+        ):
+            total += deleted
+            self.stdout.write(f"Deleted {deleted} tokens")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Purged {total} expired tokens in "
+                f"{time.perf_counter() - start:.2f} s"
+            )
+        )
@@ -0,0 +1,28 @@
+"""
+Signal handlers for the user app.
+"""
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from rest_framework.authtoken.models import Token
+
+from user.authentication import token_cache
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    """Drop a deleted token from the authentication cache"""
+    token_cache.delete(instance.key)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def forget_changed_user_tokens(sender, instance, created, **kwargs):
+    """Drop cached tokens of a saved user.
+
+    This covers deactivation and password changes, and keeps the cached
+    user in line with every other change of the profile.
+    """
+    if not created:
+        token_cache.delete_for_user(instance.id)
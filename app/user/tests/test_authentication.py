@@ -0,0 +1,135 @@
+"""
+Tests for the cached token authentication.
+"""
+
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from user.authentication import LRUCache, token_cache
+
+
+ME_URL = reverse("user:me")
+
+
+def create_user(**params):
+    """Create and return a new user"""
+    return get_user_model().objects.create_user(**params)
+
+
+class LRUCacheTests(SimpleTestCase):
+    """Test the in-process LRU cache"""
+
+    def test_least_recently_used_evicted(self):
+        """Test the oldest unused entry is evicted when full"""
+        lru = LRUCache()
+        lru.set("a", 1, max_size=2)
+        lru.set("b", 2, max_size=2)
+        lru.get("a", ttl=60)
+        lru.set("c", 3, max_size=2)
+
+        self.assertEqual(lru.get("a", ttl=60), 1)
+        self.assertIsNone(lru.get("b", ttl=60))
+        self.assertEqual(lru.get("c", ttl=60), 3)
+
+    @patch("user.authentication.time.monotonic")
+    def test_entries_expire(self, patched_monotonic):
+        """Test entries older than the TTL are not returned"""
+        lru = LRUCache()
+        patched_monotonic.return_value = 100
+        lru.set("a", 1, max_size=2)
+
+        patched_monotonic.return_value = 159
+        self.assertEqual(lru.get("a", ttl=60), 1)
+        patched_monotonic.return_value = 160
+        self.assertIsNone(lru.get("a", ttl=60))
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test token lookups are cached and invalidated"""
+
+    def setUp(self):
+        token_cache.local.clear()
+        self.user = create_user(
+            email="testuser@example.com",
+            password="test-user-password",
+            name="Test name",
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def test_token_lookup_cached(self):
+        """Test a repeated request does not query the token again"""
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["email"], self.user.email)
+
+    def test_invalid_token_rejected(self):
+        """Test an unknown token is rejected"""
+        self.client.credentials(HTTP_AUTHORIZATION="Token invalid")
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_token_rejected(self):
+        """Test deleting a token removes it from the cache"""
+        self.client.get(ME_URL)
+
+        self.token.delete()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        """Test deactivating a user removes their tokens from the cache"""
+        self.client.get(ME_URL)
+
+        self.user.is_active = False
+        self.user.save()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_invalidates_cache(self):
+        """Test changing the password reloads the user"""
+        self.client.get(ME_URL)
+
+        self.user.set_password("new-password-123")
+        self.user.save()
+
+        with self.assertNumQueries(1):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @override_settings(TOKEN_AUTH_CACHE={"CACHE_ALIAS": "default"})
+    def test_shared_cache_used(self):
+        """Test tokens are shared through the configured Django cache"""
+        cache.clear()
+        self.client.get(ME_URL)
+        token_cache.local.clear()
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        self.token.delete()
+        token_cache.local.clear()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,89 @@
+"""
+Tests for password hashing strategies.
+"""
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import get_hasher, make_password
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import hashers
+
+
+TOKEN_URL = reverse("user:token")
+CHOICES = settings.PASSWORD_HASHER_CHOICES
+
+
+def create_user(**params):
+    """Create and return a new user"""
+    return get_user_model().objects.create_user(**params)
+
+
+class HasherStrategyTests(TestCase):
+    """Test new passwords use the configured hasher."""
+
+    def setUp(self):
+        hashers.executor.shutdown()
+
+    def tearDown(self):
+        hashers.executor.shutdown()
+
+    def test_argon2_default(self):
+        """Test passwords are hashed with tuned argon2 by default."""
+        user = create_user(email="user@example.com", password="test123")
+
+        self.assertTrue(user.password.startswith("argon2$argon2id$"))
+        self.assertIn("m=19456,t=2,p=1", user.password)
+
+    @override_settings(
+        PASSWORD_HASHERS=[CHOICES["bcrypt"], CHOICES["pbkdf2"]],
+        PASSWORD_HASHING={"BCRYPT_ROUNDS": 4},
+    )
+    def test_bcrypt_strategy(self):
+        """Test bcrypt is used with the configured rounds."""
+        user = create_user(email="user@example.com", password="test123")
+
+        self.assertTrue(user.password.startswith("bcrypt_sha256$$2b$04$"))
+        self.assertTrue(user.check_password("test123"))
+
+    def test_pbkdf2_rehashed_on_login(self):
+        """Test a PBKDF2 password is upgraded when the user logs in."""
+        user = create_user(email="user@example.com")
+        user.password = make_password("test123", hasher="pbkdf2_sha256")
+        user.save()
+
+        res = APIClient().post(
+            TOKEN_URL, {"email": "user@example.com", "password": "test123"}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith("argon2$"))
+        self.assertTrue(user.check_password("test123"))
+
+    @override_settings(PASSWORD_HASHING={"ARGON2_TIME_COST": 3})
+    def test_cost_change_rehashed_on_login(self):
+        """Test raising the argon2 cost upgrades hashes on login."""
+        with override_settings(PASSWORD_HASHING={"ARGON2_TIME_COST": 2}):
+            user = create_user(email="user@example.com", password="test123")
+
+        self.assertTrue(get_hasher("argon2").must_update(user.password))
+        self.assertTrue(user.check_password("test123"))
+        self.assertIn("t=3", user.password)
+
+    @override_settings(PASSWORD_HASHING={"MAX_PENDING": 0})
+    def test_busy_hashing_pool_rejected(self):
+        """Test logins beyond the hashing backlog get a 503."""
+        with override_settings(PASSWORD_HASHING={}):
+            create_user(email="user@example.com", password="test123")
+        hashers.executor.shutdown()
+
+        res = APIClient().post(
+            TOKEN_URL, {"email": "user@example.com", "password": "test123"}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
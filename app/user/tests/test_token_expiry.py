@@ -0,0 +1,179 @@
+"""
+Tests for expiring auth tokens.
+"""
+
+import threading
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connections, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from user.authentication import issue_token, token_cache
+
+TOKEN_URL = reverse("user:token")
+ME_URL = reverse("user:me")
+EXPIRY = {"TTL": 3600, "REFRESH_INTERVAL": 60, "PURGE_BATCH_SIZE": 2}
+
+
+def create_user(email="user@example.com", **params):
+    """Create and return a new user"""
+    return get_user_model().objects.create_user(
+        email=email, password="test123", **params
+    )
+
+
+def age_token(token, seconds):
+    """Move a token's last refresh into the past"""
+    created = timezone.now() - timedelta(seconds=seconds)
+    Token.objects.filter(key=token.key).update(created=created)
+    return created
+
+
+@override_settings(TOKEN_EXPIRY=EXPIRY)
+class TokenExpiryTests(TestCase):
+    """Test tokens expire after the TTL and slide when used"""
+
+    def setUp(self):
+        token_cache.local.clear()
+        self.user = create_user()
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def test_expired_token_rejected_and_deleted(self):
+        """Test a token unused for longer than the TTL is rejected"""
+        age_token(self.token, 3601)
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertFalse(Token.objects.filter(key=self.token.key).exists())
+
+    def test_cached_token_expires(self):
+        """Test a cached token is rejected once it expires"""
+        self.client.get(ME_URL)
+        cached = token_cache.get(self.token.key)
+        cached.created = age_token(self.token, 3601)
+        token_cache.set(self.token.key, cached)
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_use_slides_expiry(self):
+        """Test using a token past the interval refreshes it"""
+        old = age_token(self.token, 3000)
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.token.refresh_from_db()
+        self.assertGreater(self.token.created, old)
+
+    def test_recent_use_not_written(self):
+        """Test a token used within the interval is not updated"""
+        created = age_token(self.token, 30)
+
+        self.client.get(ME_URL)
+
+        self.token.refresh_from_db()
+        self.assertEqual(self.token.created, created)
+
+    def test_login_replaces_expired_token(self):
+        """Test logging in issues a new token when the old one expired"""
+        age_token(self.token, 3601)
+
+        res = APIClient().post(
+            TOKEN_URL, {"email": "user@example.com", "password": "test123"}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res.data["token"], self.token.key)
+        self.assertTrue(Token.objects.filter(key=res.data["token"]).exists())
+
+    def test_login_refreshes_valid_token(self):
+        """Test logging in returns and refreshes an unexpired token"""
+        old = age_token(self.token, 3000)
+
+        res = APIClient().post(
+            TOKEN_URL, {"email": "user@example.com", "password": "test123"}
+        )
+
+        self.assertEqual(res.data["token"], self.token.key)
+        self.token.refresh_from_db()
+        self.assertGreater(self.token.created, old)
+
+
+@override_settings(TOKEN_EXPIRY=EXPIRY)
+class ConcurrentLoginTests(TransactionTestCase):
+    """Test logins racing to replace an expired token.
+
+    Each login uses its own database connection, so writes must be
+    committed rather than held in a test transaction.
+    """
+
+    def test_expired_token_replaced_once(self):
+        """Test a login waiting on a replacement returns the new token"""
+        user = create_user()
+        age_token(Token.objects.create(user=user), 3601)
+        issued = threading.Event()
+        release = threading.Event()
+        keys = []
+
+        def login(hold):
+            try:
+                with transaction.atomic():
+                    keys.append(issue_token(user).key)
+                    if hold:
+                        issued.set()
+                        release.wait(10)
+            finally:
+                connections.close_all()
+
+        first = threading.Thread(target=login, args=(True,))
+        first.start()
+        issued.wait(10)
+        second = threading.Thread(target=login, args=(False,))
+        second.start()
+        # the second login reaches the token before the first commits
+        second.join(0.5)
+        release.set()
+        first.join()
+        second.join()
+
+        self.assertEqual(len(keys), 2)
+        self.assertEqual(keys[0], keys[1])
+        self.assertEqual(Token.objects.get(user=user).key, keys[0])
+
+
+@override_settings(TOKEN_EXPIRY=EXPIRY)
+class PurgeTokensTests(TestCase):
+    """Test the purge_tokens command"""
+
+    def test_only_expired_tokens_purged(self):
+        """Test expired tokens are deleted in batches, others are kept"""
+        expired = []
+        for i in range(5):
+            token = Token.objects.create(user=create_user(f"old{i}@ex.com"))
+            age_token(token, 3601)
+            expired.append(token.key)
+        kept = Token.objects.create(user=create_user())
+        out = StringIO()
+
+        call_command("purge_tokens", stdout=out)
+
+        self.assertEqual(
+            list(Token.objects.values_list("key", flat=True)), [kept.key]
+        )
+        self.assertEqual(out.getvalue().count("Deleted 2 tokens"), 2)
+        self.assertIn("Deleted 1 tokens", out.getvalue())
+        self.assertIn("Purged 5 expired tokens", out.getvalue())
@@ -2,12 +2,16 @@
 Views for the User API.
 """
 
-from rest_framework import generics, authentication, permissions
+from rest_framework import generics, permissions
+from rest_framework.response import Response
+from .authentication import CachedTokenAuthentication, issue_token
 from .serializers import UserSerializer, AuthTokenSerializer
 from rest_framework.settings import api_settings
 
 from rest_framework.authtoken.views import ObtainAuthToken
 
+from core.db.replicas import ReplicaReadMixin
+
 
 class CreateUserView(generics.CreateAPIView):
     """Create a new user"""
@@ -21,12 +25,18 @@ class CreateTokenView(ObtainAuthToken):
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
 
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        token = issue_token(serializer.validated_data["user"])
+        return Response({"token": token.key})
+
 
-class ManageUserView(generics.RetrieveUpdateAPIView):
+class ManageUserView(ReplicaReadMixin, generics.RetrieveUpdateAPIView):
     """Manage User View"""
 
     serializer_class = UserSerializer
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permissions_classes = [permissions.IsAuthenticated]
 
     def get_object(self):